@@ -0,0 +1,108 @@
+# Login throughput benchmark.
+#
+#   python -m bench.bench_login --url http://localhost:8000 --requests 200 --concurrency 20
+#       registers a throwaway user against a running API and fires concurrent logins,
+#       while probing /health to show how much the event loop stalls under the burst.
+#
+#   python -m bench.bench_login --local --requests 200 --concurrency 20
+#       no server: drives password_service directly and measures event-loop lag.
+#
+# Compare runs with different BCRYPT_ROUNDS / PASSWORD_HASH_WORKERS settings.
+import argparse
+import asyncio
+import statistics
+import time
+import uuid
+import httpx
+
+def _summary(name, latencies, elapsed):
+    latencies = sorted(latencies)
+    if not latencies:
+        print(f"{name}: no samples")
+        return
+    p95 = latencies[int(len(latencies) * 0.95) - 1] if len(latencies) >= 20 else latencies[-1]
+    print(f"{name}: n={len(latencies)} throughput={len(latencies) / elapsed:.1f}/s "
+          f"p50={statistics.median(latencies) * 1000:.1f}ms p95={p95 * 1000:.1f}ms max={latencies[-1] * 1000:.1f}ms")
+
+async def _probe(fetch, stop, interval=0.05):
+    lags = []
+    while not stop.is_set():
+        started = time.perf_counter()
+        await fetch()
+        lags.append(time.perf_counter() - started)
+        await asyncio.sleep(interval)
+    return lags
+
+async def _burst(call, total, concurrency):
+    slots = asyncio.Semaphore(concurrency)
+    latencies, failures = [], 0
+
+    async def one():
+        nonlocal failures
+        async with slots:
+            started = time.perf_counter()
+            ok = await call()
+            if ok:
+                latencies.append(time.perf_counter() - started)
+            else:
+                failures += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(total)))
+    return latencies, failures, time.perf_counter() - started
+
+async def bench_http(args):
+    username, password = f"bench_{uuid.uuid4().hex[:8]}", "bench-password"
+    async with httpx.AsyncClient(base_url=args.url, timeout=60) as client:
+        resp = await client.post("/api/v1/auth/register", json={"username": username, "password": password, "role": "user"})
+        resp.raise_for_status()
+
+        async def login():
+            r = await client.post("/api/v1/auth/login", data={"username": username, "password": password})
+            return r.status_code == 200
+
+        async def health():
+            await client.get("/health")
+
+        stop = asyncio.Event()
+        probe = asyncio.create_task(_probe(health, stop))
+        latencies, failures, elapsed = await _burst(login, args.requests, args.concurrency)
+        stop.set()
+        _summary("login", latencies, elapsed)
+        _summary("/health during burst", await probe, elapsed)
+        print(f"failed logins (incl. 503 queue-full): {failures}")
+
+async def bench_local(args):
+    from fastapi import HTTPException
+    from src.services.password_service import hash_password, verify_password, password_stats
+    hashed = await hash_password("bench-password")
+
+    async def login():
+        try:
+            valid, _ = await verify_password("bench-password", hashed)
+        except HTTPException:   # queue full -> 503
+            return False
+        return valid
+
+    async def tick():
+        await asyncio.sleep(0)
+
+    stop = asyncio.Event()
+    probe = asyncio.create_task(_probe(tick, stop, interval=0.01))
+    latencies, failures, elapsed = await _burst(login, args.requests, args.concurrency)
+    stop.set()
+    _summary("verify", latencies, elapsed)
+    _summary("event-loop lag", await probe, elapsed)
+    print(f"rejected: {failures} | {password_stats()}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Login throughput benchmark")
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--local", action="store_true", help="Benchmark password_service in-process, no server")
+    args = parser.parse_args()
+    asyncio.run(bench_local(args) if args.local else bench_http(args))
+
+if __name__ == "__main__":
+    main()
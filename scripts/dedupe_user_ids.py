@@ -0,0 +1,38 @@
+# One-off migration: give every user that shares a user_id with an older account a fresh id.
+#
+#   python -m scripts.dedupe_user_ids --dry-run
+#       lists the accounts that would be moved, changes nothing.
+#
+#   python -m scripts.dedupe_user_ids
+#       reassigns them (their tokens stop working, so they log in again), then builds the indexes
+#       the API skipped at startup, including users.user_id_unique.
+#
+# Uses MONGODB_URI / MONGO_DB_NAME from the environment, like the API.
+import argparse
+import asyncio
+from src.api.dependencies.database import get_db, close_db, ensure_indexes
+from src.services.id_service import dedupe_user_ids
+
+async def run(dry_run):
+    db = await get_db()
+    try:
+        moved = await dedupe_user_ids(db, dry_run=dry_run)
+        for old_id, new_id, _id in moved:
+            print(f"{old_id} -> {new_id or '(new id)'}  user document {_id}")
+        print(f"{len(moved)} user(s) {'would be reassigned' if dry_run else 'reassigned'}")
+        if not dry_run:
+            failed = await ensure_indexes(db)
+            print(f"Index builds failed: {failed}" if failed else "All indexes built")
+            return 1 if failed else 0
+        return 0
+    finally:
+        await close_db()
+
+def main():
+    parser = argparse.ArgumentParser(description="Reassign duplicate user_ids left by the old allocator")
+    parser.add_argument("--dry-run", action="store_true", help="only list the users that would be moved")
+    args = parser.parse_args()
+    raise SystemExit(asyncio.run(run(args.dry_run)))
+
+if __name__ == "__main__":
+    main()
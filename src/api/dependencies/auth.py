@@ -3,19 +3,26 @@ from jose import jwt, JWTError               # Import JWT handling functions (en
 from datetime import datetime, timedelta ,timezone    #  For setting token expiration times
 from fastapi import Depends                       # For dependency 
 from fastapi.security import OAuth2PasswordBearer  # OAuth2 scheme (Bearer token in Authorization header)
-from passlib.context import CryptContext                 # Import CryptContext from passlib for password hashing and verification
 from src.api.dependencies.database import get_db                     # Custom function to get MongoDB connection
 from dotenv import load_dotenv,find_dotenv      # Load environment variables from .env file
-from src.utils.errors import  unauthorized # import error helpers
+from src.utils.errors import  unauthorized, forbid_error # import error helpers
 from src.schemas.user import UserSchema
 from src.utils.logger import logger   
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+from src.utils.context import user_id_var
+from src.utils.cache import TTLCache
+from src.services.password_service import verify_password   # bcrypt runs in a bounded thread pool
 # Define OAuth2 authentication scheme
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login")
 load_dotenv(find_dotenv())   
 SECRET_KEY = os.environ.get("JWT_SECRET_KEY")   # Get secret key for JWT signing from environment
 ALGORITHM = os.environ.get("JWT_ALGORITHM")     # Get algorithm for JWT from environment
 ACCESS_TOKEN_EXPIRE_MINUTES = 60
+USER_CACHE_MAX_ENTRIES = int(os.environ.get("USER_CACHE_MAX_ENTRIES", 10000))   # Principals kept in process
+USER_CACHE_TTL_SECONDS = float(os.environ.get("USER_CACHE_TTL_SECONDS", 30))    # Bounds staleness across workers
+AUTH_TRUST_TOKEN_CLAIMS = os.environ.get("AUTH_TRUST_TOKEN_CLAIMS", "false").lower() == "true"   # No DB read at all
+
+# user_id -> principal (UserSchema without the password hash); an entry only serves tokens of the same version
+user_cache = TTLCache(USER_CACHE_MAX_ENTRIES, USER_CACHE_TTL_SECONDS)
 
 def create_access_token(data: dict, expires_delta: timedelta=None):
                             # Copy the input data so we don’t modify the original
@@ -24,6 +31,7 @@ def create_access_token(data: dict, expires_delta: timedelta=None):
     "sub": data.get("username"),   
     "user_id": data.get("user_id"),
     "role": data.get("role"),
+    "ver": data.get("token_version", 0),
     "exp": expire
 }
     return jwt.encode(payload, SECRET_KEY, algorithm=ALGORITHM)
@@ -37,9 +45,15 @@ async def authenticate_user(db,username: str, password: str):
     
     user_doc = UserSchema(**user)   # Convert dict -> Pydantic schema
 
-    if not pwd_context.verify(password, user_doc.hashed_password):
-        logger.warning(f"Authentication failed: user password '{password}' not found in DB")
+    valid, new_hash = await verify_password(password, user_doc.hashed_password)
+    if not valid:
+        logger.warning(f"Authentication failed: wrong password for user '{username}'")
         raise unauthorized("Incorrect username or password")
+    if new_hash:
+        # Stored hash uses an outdated cost factor; swap it while we have the plaintext
+        await db["users"].update_one({"user_id": user_doc.user_id, "hashed_password": user_doc.hashed_password},
+                                     {"$set": {"hashed_password": new_hash}})
+        logger.info(f"Password hash upgraded for user '{username}'")
     return user_doc
 
 # Extracts and verifies user info from token for protected routes
@@ -49,11 +63,40 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db=Depends(get_d
         user_id = payload.get("user_id")
         if not user_id:
             raise unauthorized("Invalid token: missing user_id")
+        user_id_var.set(user_id)   # every log line for the rest of this request carries the user id
+
+        version = payload.get("ver", 0)
+
+        if AUTH_TRUST_TOKEN_CLAIMS:
+            # Signed claims are authoritative; role changes take effect when the token expires
+            return UserSchema(user_id=user_id, username=payload.get("sub"), role=payload.get("role"), token_version=version)
+
+        principal = user_cache.get(user_id)
+        if principal is not None and principal.token_version == version:
+            return principal
 
-        user = await db["users"].find_one({"user_id": user_id})
+        user = await db["users"].find_one({"user_id": user_id}, {"hashed_password": 0})
         if not user:
             raise unauthorized("Could not validate user.")
-
-        return UserSchema(**user)
+        principal = UserSchema(**user)
+        if principal.token_version != version:
+            raise unauthorized("Token has been revoked")   # issued before a role change
+        user_cache.set(user_id, principal)
+        return principal
     except JWTError:
-        raise unauthorized("Invalid token")
\ No newline at end of file
+        raise unauthorized("Invalid token")
+
+# Drop a cached principal; call after anything that changes a user's role or removes the user.
+# Only this process's cache is cleared, other workers catch up within USER_CACHE_TTL_SECONDS
+# (the token_version bump makes them reject old tokens as soon as they re-read the user).
+def invalidate_user(user_id: str):
+    return user_cache.delete(user_id)
+
+def user_cache_stats():
+    return {**user_cache.stats(), "trust_token_claims": AUTH_TRUST_TOKEN_CLAIMS}
+
+# Protects admin-only routes
+async def require_admin(current_user=Depends(get_current_user)):
+    if current_user.role != "admin":
+        raise forbid_error("Admin privileges required")
+    return current_user
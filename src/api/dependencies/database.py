@@ -1,29 +1,207 @@
 from pymongo import AsyncMongoClient   # Import AsyncMongoClient to connect to MongoDB asynchronously
+from pymongo import IndexModel, ASCENDING, DESCENDING
+from pymongo import monitoring
+from bson import ObjectId
+from datetime import datetime
 import os                              # Import os to read environment variables
 from dotenv import load_dotenv,find_dotenv # Import functions to load variables from a .env file
+from fastapi import Request
 from src.utils.logger import logger
+from src.utils.metrics import MONGO_COMMAND_SECONDS
 client=None
-# Define an async function to get a MongoDB database
-async def get_db(db_name="emotion_db"):
-  global client
-  load_dotenv(find_dotenv())                # Load environment variables from .env file
-  MongoDB_url=os.environ.get("MONGODB_URI") # Get the MongoDB connection URL from environment variables
-  
-  try:
-      if not client:
+
+# Times every command the driver sends (find, insert, aggregate, ...) into MONGO_COMMAND_SECONDS
+class CommandTimer(monitoring.CommandListener):
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        MONGO_COMMAND_SECONDS.observe(event.duration_micros / 1e6, command=event.command_name, outcome="ok")
+
+    def failed(self, event):
+        MONGO_COMMAND_SECONDS.observe(event.duration_micros / 1e6, command=event.command_name, outcome="error")
+
+# Connection pool settings; one client (and pool) per process, shared by every request
+load_dotenv(find_dotenv())                # Load environment variables from .env file
+MONGODB_URI = os.environ.get("MONGODB_URI") # Get the MongoDB connection URL from environment variables
+MONGO_DB_NAME = os.environ.get("MONGO_DB_NAME", "emotion_db")
+MONGO_MAX_POOL_SIZE = int(os.environ.get("MONGO_MAX_POOL_SIZE", 100))        # Connections per server, per process
+MONGO_MIN_POOL_SIZE = int(os.environ.get("MONGO_MIN_POOL_SIZE", 10))         # Kept open (and opened at startup)
+MONGO_MAX_IDLE_TIME_MS = int(os.environ.get("MONGO_MAX_IDLE_TIME_MS", 300000))
+MONGO_WAIT_QUEUE_TIMEOUT_MS = int(os.environ.get("MONGO_WAIT_QUEUE_TIMEOUT_MS", 5000))    # Wait for a free connection
+MONGO_CONNECT_TIMEOUT_MS = int(os.environ.get("MONGO_CONNECT_TIMEOUT_MS", 5000))
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.environ.get("MONGO_SERVER_SELECTION_TIMEOUT_MS", 10000))
+
+def create_client():
+    return AsyncMongoClient(
+        MONGODB_URI,
+        maxPoolSize=MONGO_MAX_POOL_SIZE,
+        minPoolSize=MONGO_MIN_POOL_SIZE,
+        maxIdleTimeMS=MONGO_MAX_IDLE_TIME_MS,
+        waitQueueTimeoutMS=MONGO_WAIT_QUEUE_TIMEOUT_MS,
+        connectTimeoutMS=MONGO_CONNECT_TIMEOUT_MS,
+        serverSelectionTimeoutMS=MONGO_SERVER_SELECTION_TIMEOUT_MS,
+        event_listeners=[CommandTimer()],
+    )
+
+def _get_client():
+    global client
+    if not client:
         logger.info("Connecting to MongoDB...")   # Log info before connecting
-        client = AsyncMongoClient(MongoDB_url)    # Create an asynchronous MongoDB client using the connection URL
-        logger.info(f"Connected to database: {db_name}")
-      db = client[db_name]                      # Get the database with the specified name     
-      return db                   # Return the database object for future used       
+        client = create_client()    # Create an asynchronous MongoDB client using the connection URL
+    return client
+
+# Startup: create the client, check the server answers and publish the handles on app.state
+async def open_db(app):
+    db = _get_client()[MONGO_DB_NAME]
+    await db.command("ping")   # fail startup on a bad URI/credentials; the pool then fills to minPoolSize
+    app.state.mongo_client = client
+    app.state.db = db
+    logger.info(f"Connected to database: {MONGO_DB_NAME}")
+    return db
+
+# Request dependency: the database opened by the lifespan. Outside a request (workers, rate limiter)
+# or without the lifespan (TestClient used without a with-block) it falls back to a lazy client.
+async def get_db(request: Request = None):
+  if request is not None:
+      db = getattr(request.app.state, "db", None)
+      if db is not None:
+          return db
+  try:
+      return _get_client()[MONGO_DB_NAME]   # Get the database with the specified name
   except Exception as e:
         logger.error(f"Failed to connect to MongoDB: {e}")  # Log any errors
         return None
-                    
+
 # Function to close DB connection
-def close_db():
+async def close_db(app=None):
     global client
+    if app is not None:
+        app.state.db = None
+        app.state.mongo_client = None
     if client:
-        client.close()
+        await client.close()
         logger.info("MongoDB connection closed")
-        client = None   # Reset client so it can reconnect next time
\ No newline at end of file
+        client = None   # Reset client so it can reconnect next time
+
+# Indexes backing the query shapes used by the routes; every list/filter query sorts by (created_at, _id) desc
+INDEXES = {
+    "users": [
+        IndexModel([("username", ASCENDING)], name="username_unique", unique=True),   # login, register
+        IndexModel([("user_id", ASCENDING)], name="user_id_unique", unique=True),     # every authenticated request
+    ],
+    "emotions": [
+        IndexModel([("user_id", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)], name="user_created"),
+        IndexModel([("created_at", DESCENDING), ("_id", DESCENDING)], name="created"),
+        IndexModel([("user_id", ASCENDING), ("emotion", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)], name="user_emotion_created"),
+        IndexModel([("emotion", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)], name="emotion_created"),
+        IndexModel([("user_id", ASCENDING), ("filename", ASCENDING)], name="user_filename"),
+        IndexModel([("filename", ASCENDING)], name="filename"),
+        IndexModel([("custom_id", ASCENDING), ("user_id", ASCENDING)], name="custom_id", sparse=True),
+    ],
+    "emotion_cache": [
+        IndexModel([("expires_at", ASCENDING)], name="expires_ttl", expireAfterSeconds=0),   # Mongo drops expired entries
+    ],
+    "emotion_rollups": [
+        IndexModel([("user_id", ASCENDING), ("day", ASCENDING), ("emotion", ASCENDING)], name="user_day_emotion", unique=True),
+        IndexModel([("day", ASCENDING)], name="day"),   # admin stats across all users
+    ],
+    "rate_limits": [
+        IndexModel([("expires_at", ASCENDING)], name="expires_ttl", expireAfterSeconds=0),   # idle buckets are full anyway
+    ],
+    "jobs": [
+        IndexModel([("job_id", ASCENDING)], name="job_id_unique", unique=True),
+    ],
+    "job_items": [
+        IndexModel([("status", ASCENDING), ("rank", ASCENDING), ("created_at", ASCENDING)], name="lease_order"),
+        IndexModel([("job_id", ASCENDING), ("index", ASCENDING)], name="job_index"),
+        IndexModel([("user_id", ASCENDING), ("status", ASCENDING)], name="user_status"),
+    ],
+}
+
+# Unique indexes over fields older code could have duplicated: (collection, index name) -> field.
+# Startup never rewrites data to make these build; it reports the duplicates and leaves the index unbuilt.
+UNIQUE_PRECHECKS = {
+    ("users", "user_id_unique"): ("user_id", "python -m scripts.dedupe_user_ids"),   # old count+1 allocator
+}
+
+# Representative query shapes for each route: (description, collection, filter, sort)
+QUERY_SHAPES = [
+    ("get_current_user", "users", {"user_id": "U_001"}, None),
+    ("authenticate_user / register", "users", {"username": "alice"}, None),
+    ("get/update/delete emotion by _id", "emotions", {"_id": ObjectId(), "user_id": "U_001"}, None),
+    ("get/update/delete emotion by custom_id", "emotions", {"custom_id": "abc", "user_id": "U_001"}, None),
+    ("get_emotions (user)", "emotions", {"user_id": "U_001"}, [("created_at", -1), ("_id", -1)]),
+    ("get_emotions (admin)", "emotions", {}, [("created_at", -1), ("_id", -1)]),
+    ("get_emotions emotion filter", "emotions", {"user_id": "U_001", "emotion": "happy"}, [("created_at", -1), ("_id", -1)]),
+    ("get_emotions filename prefix", "emotions", {"user_id": "U_001", "filename": {"$regex": "^img"}}, None),
+    ("emotion stats (user)", "emotion_rollups", {"user_id": "U_001", "day": {"$gte": datetime(2024, 1, 1)}}, None),
+    ("emotion stats (admin)", "emotion_rollups", {"day": {"$gte": datetime(2024, 1, 1)}}, None),
+    ("job status", "jobs", {"job_id": "0" * 32}, None),
+    ("job items", "job_items", {"job_id": "0" * 32}, [("index", 1)]),
+    ("job lease", "job_items", {"status": "queued"}, [("rank", 1), ("created_at", 1)]),
+]
+
+# Values of `field` held by more than one document: [{"_id": value, "ids": [_id, ...], "count": n}, ...]
+async def find_duplicates(db, collection: str, field: str, limit: int = None):
+    pipeline = [
+        {"$group": {"_id": f"${field}", "ids": {"$push": "$_id"}, "count": {"$sum": 1}}},
+        {"$match": {"count": {"$gt": 1}}},
+    ]
+    if limit:
+        pipeline.append({"$limit": limit})
+    cursor = await db[collection].aggregate(pipeline)
+    return [group async for group in cursor]
+
+# Create all indexes; create_indexes is a no-op for indexes that already exist, so this is safe on every startup.
+# Each index is built on its own so one failure (e.g. duplicates under a unique index) does not leave the
+# rest unbuilt. Returns the failures as ["collection.index: error", ...].
+async def ensure_indexes(db):
+    failed = []
+    for collection, indexes in INDEXES.items():
+        built = []
+        for index in indexes:
+            name = index.document["name"]
+            precheck = UNIQUE_PRECHECKS.get((collection, name))
+            try:
+                if precheck:
+                    field, fix = precheck
+                    duplicates = await find_duplicates(db, collection, field, limit=5)
+                    if duplicates:
+                        values = ", ".join(str(group["_id"]) for group in duplicates)
+                        raise RuntimeError(f"duplicate {field} values exist (e.g. {values}); "
+                                           f"not building the unique index, run `{fix}` first")
+                await db[collection].create_indexes([index])
+                built.append(name)
+            except Exception as e:
+                failed.append(f"{collection}.{name}: {e}")
+                logger.error(f"Failed to build index {collection}.{name}: {e}")
+        logger.info(f"Indexes ensured on {collection}: {built}")
+    return failed
+
+# Diagnostic mode: explain() every query shape and fail loudly if any would scan a whole collection
+async def verify_query_plans(db):
+    collscans = []
+    for description, collection, query, sort in QUERY_SHAPES:
+        find = {"find": collection, "filter": query, "limit": 1}
+        if sort:
+            find["sort"] = dict(sort)
+        explain = await db.command({"explain": find, "verbosity": "queryPlanner"})
+        stages = set(_plan_stages(explain["queryPlanner"]["winningPlan"]))
+        logger.info(f"Query plan | {description} | {collection} | stages={sorted(stages)}")
+        if "COLLSCAN" in stages:
+            collscans.append(f"{description} ({collection} {query})")
+    if collscans:
+        raise RuntimeError(f"COLLSCAN in query plans: {'; '.join(collscans)}")
+    logger.success(f"All {len(QUERY_SHAPES)} query shapes use indexes")
+
+# Every "stage" name in a (classic or SBE) winning plan tree
+def _plan_stages(node):
+    if isinstance(node, dict):
+        if "stage" in node:
+            yield node["stage"]
+        for value in node.values():
+            yield from _plan_stages(value)
+    elif isinstance(node, list):
+        for value in node:
+            yield from _plan_stages(value)
@@ -0,0 +1,129 @@
+import re
+import time
+import uuid
+from fastapi.responses import JSONResponse
+from jose import jwt, JWTError
+from src.api.dependencies.auth import SECRET_KEY, ALGORITHM
+from src.services.rate_limiter import request_cost
+from src.utils.context import request_id_var
+from src.utils.metrics import stage, request_span, REQUEST_SECONDS, REQUESTS_TOTAL, RATE_LIMIT_REJECTIONS
+from src.utils.errors import payload_too_large
+from src.utils.logger import logger
+
+# Rejects request bodies over max_bytes while they stream in, before they are spooled to memory/disk.
+# Checks Content-Length up front and counts chunked bodies as they arrive.
+class BodySizeLimitMiddleware:
+    def __init__(self, app, max_bytes: int):
+        self.app = app
+        self.max_bytes = max_bytes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        headers = dict(scope.get("headers") or [])
+        content_length = headers.get(b"content-length")
+        if content_length and content_length.isdigit() and int(content_length) > self.max_bytes:
+            logger.error(f"Request body exceeds {self.max_bytes} bytes: {scope.get('path')}")
+            response = JSONResponse(status_code=413, content={"detail": {"message": f"Request body exceeds {self.max_bytes} bytes"}})
+            return await response(scope, receive, send)
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    # Raised inside body parsing, so FastAPI turns it into a 413 response
+                    payload_too_large(f"Request body exceeds {self.max_bytes} bytes")
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+# Token-bucket rate limiting keyed by the authenticated user (from the JWT claims, no DB read) and role;
+# unauthenticated requests (login, register, bad tokens) are keyed by client IP.
+# Adds RateLimit-* headers to every limited response and answers 429 with Retry-After when a bucket is empty.
+class RateLimitMiddleware:
+    def __init__(self, app, limiter, exempt_paths=("/health", "/metrics", "/docs", "/redoc", "/openapi.json")):
+        self.app = app
+        self.limiter = limiter
+        self.exempt_paths = set(exempt_paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.exempt_paths:
+            return await self.app(scope, receive, send)
+
+        cost = request_cost(scope["method"], scope["path"])
+        principal = self._principal(scope)
+        allowed, limit_headers = await self.limiter.check(principal, cost)
+        if not allowed:
+            RATE_LIMIT_REJECTIONS.inc(principal=principal[0])
+            logger.warning(f"Rate limit exceeded | path={scope['path']} | cost={cost}")
+            response = JSONResponse(status_code=429, content={"detail": {"message": "Rate limit exceeded"}}, headers=limit_headers)
+            return await response(scope, receive, send)
+
+        raw_headers = [(k.lower().encode(), v.encode()) for k, v in limit_headers.items()]
+
+        async def send_with_headers(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + raw_headers
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
+
+    def _principal(self, scope):
+        headers = dict(scope.get("headers") or [])
+        authorization = headers.get(b"authorization", b"").decode()
+        if authorization.lower().startswith("bearer "):
+            try:
+                payload = jwt.decode(authorization[7:], SECRET_KEY, algorithms=[ALGORITHM])
+                if payload.get("user_id"):
+                    return ("admin" if payload.get("role") == "admin" else "user", payload["user_id"])
+            except JWTError:
+                pass   # the route itself will answer 401
+        client = scope.get("client")
+        return ("anonymous", client[0] if client else "unknown")
+
+# Outermost middleware: assigns the request id (X-Request-ID, echoed back), opens the request trace span
+# and records latency per handler (endpoint name, not the raw path, to keep label cardinality bounded)
+class MetricsMiddleware:
+    REQUEST_ID_PATTERN = re.compile(r"^[A-Za-z0-9._-]{1,64}$")
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        headers = dict(scope.get("headers") or [])
+        incoming = headers.get(b"x-request-id", b"").decode(errors="ignore")
+        request_id = incoming if self.REQUEST_ID_PATTERN.match(incoming) else uuid.uuid4().hex
+        token = request_id_var.set(request_id)
+        status = 500
+        started = time.perf_counter()
+
+        async def send_with_request_id(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message["headers"] = list(message.get("headers", [])) + [(b"x-request-id", request_id.encode())]
+            await send(message)
+
+        try:
+            with request_span(scope["method"], scope["path"]):
+                await self.app(scope, receive, send_with_request_id)
+        finally:
+            handler = getattr(scope.get("route"), "name", None) or "unmatched"
+            labels = {"method": scope["method"], "handler": handler, "status": status}
+            REQUEST_SECONDS.observe(time.perf_counter() - started, **labels)
+            REQUESTS_TOTAL.inc(**labels)
+            request_id_var.reset(token)
+
+# Default response class: times JSON encoding as the "serialization" stage
+class TimedJSONResponse(JSONResponse):
+    def render(self, content):
+        with stage("serialization"):
+            return super().render(content)
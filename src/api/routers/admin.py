@@ -0,0 +1,68 @@
+from fastapi import APIRouter, Depends, Query, Body   # For creating routes and dependency injection
+from pymongo import ReturnDocument
+from typing import Optional
+from src.api.dependencies.auth import require_admin, invalidate_user, user_cache_stats   # Only admins may use these endpoints
+from src.api.dependencies.database import get_db
+from src.services.cache_service import cache_stats, invalidate
+from src.services.stats_service import rebuild_rollups
+from src.services.emotion_service import get_backend_metrics
+from src.models.user import UserRoleUpdate, UserResponse
+from src.utils.errors import not_found
+from src.utils.logger import logger
+router = APIRouter(tags=["Admin"])
+
+# Endpoint: Inspect the emotion result cache
+@router.get("/cache")
+async def get_cache_stats(current_user=Depends(require_admin), db=Depends(get_db)):
+    return await cache_stats(db)
+
+# Endpoint: Invalidate one cache entry (by key) or the whole cache
+@router.delete("/cache")
+async def invalidate_cache(
+    key: Optional[str] = Query(None, description="Cache key to drop; omit to clear the whole cache"),
+    current_user=Depends(require_admin),
+    db=Depends(get_db)
+):
+    removed = await invalidate(key, db)
+    logger.info(f"Cache invalidated by {current_user.username} | key={key or '*'} | removed={removed}")
+    return {"removed": removed}
+
+# Endpoint: Recompute the emotion stats rollups from the stored records (backfill / repair)
+@router.post("/rollups/rebuild")
+async def rebuild_emotion_rollups(current_user=Depends(require_admin), db=Depends(get_db)):
+    logger.info(f"Rollup rebuild requested by {current_user.username}")
+    return await rebuild_rollups(db)
+
+# Endpoint: Hit/miss counters of the authenticated-user cache
+@router.get("/users/cache")
+async def get_user_cache_stats(current_user=Depends(require_admin)):
+    return user_cache_stats()
+
+# Endpoint: Change a user's role; bumping token_version revokes the tokens issued with the old role
+@router.put("/users/{user_id}/role", response_model=UserResponse)
+async def change_user_role(user_id: str, update: UserRoleUpdate = Body(...), current_user=Depends(require_admin), db=Depends(get_db)):
+    user = await db.users.find_one_and_update(
+        {"user_id": user_id},
+        {"$set": {"role": update.role}, "$inc": {"token_version": 1}},
+        projection={"hashed_password": 0},
+        return_document=ReturnDocument.AFTER,
+    )
+    if not user:
+        raise not_found(f"User {user_id} not found")
+    invalidate_user(user_id)
+    logger.info(f"Role of {user_id} changed to {update.role} by {current_user.username}")
+    return UserResponse(**user)
+
+# Endpoint: Delete a user; their tokens stop working immediately on this worker
+@router.delete("/users/{user_id}", status_code=204)
+async def delete_user(user_id: str, current_user=Depends(require_admin), db=Depends(get_db)):
+    result = await db.users.delete_one({"user_id": user_id})
+    invalidate_user(user_id)
+    if not result.deleted_count:
+        raise not_found(f"User {user_id} not found")
+    logger.info(f"User {user_id} deleted by {current_user.username}")
+
+# Endpoint: Inference backend state (LLM admission control, circuit breaker, batching, local model)
+@router.get("/backends")
+async def get_backend_state(current_user=Depends(require_admin)):
+    return get_backend_metrics()
@@ -1,19 +1,19 @@
 from fastapi import APIRouter, Depends,Form   # For creating routes and handling HTTP errors
 from pydantic import BaseModel                 # Import BaseModel from Pydantic for request validation
-from passlib.context import CryptContext       # Import CryptContext from passlib for password hashing and verification
 from src.utils.logger import logger                # Import custom logger to log activities
 from src.api.dependencies.database import get_db       # Import function to get database connection 
-from src.utils.errors import  unauthorized, validation_error # import error helpers
+from src.utils.errors import  unauthorized, validation_error, service_unavailable # import error helpers
 from src.models.user import UserCreate,UserResponse
 from src.schemas.user import UserSchema
 from src.api.dependencies.auth import create_access_token
 from datetime import datetime, timezone
 from fastapi.security import OAuth2PasswordRequestForm
+from pymongo.errors import DuplicateKeyError
 from src.api.dependencies.auth import authenticate_user
+from src.services.password_service import hash_password   # bcrypt off the event loop
+from src.services.id_service import allocate_user_id, resync_user_ids
 router = APIRouter()                          # Create a router object to group related endpoints (register, login)
-
-# Password hashing context (bcrypt)
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+USER_ID_MAX_RETRIES = 3                       # Fresh user_id attempts after a duplicate-key collision
 
 # register endpoint
 @router.post("/register",response_model=UserResponse)
@@ -26,16 +26,28 @@ async def register(user:UserCreate,db=Depends(get_db)):
     if existing:
         logger.error(f"User already exists: {user.username}")
         raise validation_error("User already exists") 
-    # Generate sequential user_id (U_001, U_002...)
-    count = await db.users.count_documents({})
-    user_id = f"U_{count + 1:03d}"
-    hashed_pw = pwd_context.hash(user.password)
-    user_doc = UserSchema(user_id=user_id,username=user.username,
-        hashed_password=hashed_pw,
-        role=user.role,
-        created_at=datetime.now(timezone.utc))
-       
-    await db.users.insert_one(user_doc.model_dump())
+    hashed_pw = await hash_password(user.password)
+    created_at = datetime.now(timezone.utc)
+
+    for attempt in range(USER_ID_MAX_RETRIES):
+        # Sequential user_id (U_001, U_002...) from an atomic counter, not count_documents
+        user_id = await allocate_user_id(db)
+        user_doc = UserSchema(user_id=user_id,username=user.username,
+            hashed_password=hashed_pw,
+            role=user.role,
+            created_at=created_at)
+        try:
+            await db.users.insert_one(user_doc.model_dump())
+            break
+        except DuplicateKeyError as e:
+            if "user_id" not in ((e.details or {}).get("keyPattern") or {}):
+                # Lost a race with a concurrent registration of the same username (unique index on users.username)
+                logger.error(f"User already exists: {user.username}")
+                raise validation_error("User already exists")
+            logger.warning(f"user_id {user_id} already taken, resyncing the counter (attempt {attempt + 1})")
+            await resync_user_ids(db)
+    else:
+        raise service_unavailable("Could not allocate a user id, please retry")
     logger.info(f"User registered: {user.username} with user_id {user_id}")
 
     # Return safe response
@@ -58,7 +70,8 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends(),db=Depends(get_
     token = create_access_token({
     "user_id": user.user_id,
     "username": user.username,
-    "role": user.role
+    "role": user.role,
+    "token_version": user.token_version
 })
 
     return {"access_token": token, "token_type": "bearer"}
\ No newline at end of file
@@ -1,32 +1,47 @@
-from fastapi import APIRouter, Depends, UploadFile, File, Query, Path,Body,Request # Import FastAPI router, dependency injection, file upload, query/path parameters
-from typing import List, Optional,Union # For typing hints (list of files, optional query params)
+from fastapi import APIRouter, Depends, UploadFile, File, Query, Path,Body,Request,Response,HTTPException # Import FastAPI router, dependency injection, file upload, query/path parameters
+from fastapi.responses import JSONResponse
+from fastapi.responses import StreamingResponse
+from fastapi.encoders import jsonable_encoder
+from typing import List, Optional,Union,Literal # For typing hints (list of files, optional query params)
 from src.api.dependencies.auth import get_current_user  # Dependency to get the logged-in user from JWT token
 from src.services.emotion_service import analyzed_emotion_from_image  # Service to analyze emotions from an image
-from src.models.emotion import EmotionCreate, EmotionResponse  # Pydantic models for request and response validation
-from src.schemas.emotion import EmotionSchema  # MongoDB document schema for emotions
+from src.models.emotion import EmotionCreate, EmotionResponse, EmotionUploadError, EmotionStatsResponse, EmotionBulkUpdate, EmotionBulkDelete, EmotionBulkResult  # Pydantic models for request and response validation
 from src.api.dependencies.database import get_db  # Dependency to get MongoDB database
 from src.utils.errors import validation_error,not_found,forbid_error  # Custom error for validation failures
-from src.services.image_service import validate_image  # Service to validate image size & format
+from src.services.image_service import read_upload, validate_image  # Services to read and validate image size & format
+from src.services.record_service import store_emotion_record  # Service to persist analysis results
+from src.services.stats_service import emotion_stats, record_updated, record_updated_many, record_deleted, STATS_BUCKETS
 from datetime import datetime, timezone
 from bson import ObjectId
-from src.utils.logger import logger
+from pymongo import ReturnDocument, UpdateOne
+from src.utils.logger import logger, hot_logger
 from src.utils.constants import EMOJI_MAP,CATEGORIES
 from dotenv import load_dotenv,find_dotenv
 import os
-from slowapi import Limiter,_rate_limit_exceeded_handler
-from slowapi.util import get_remote_address
-from slowapi.errors import RateLimitExceeded
-from slowapi.middleware import SlowAPIMiddleware
+import asyncio
+import weakref
+import re
+import json
+import base64
+import csv
+import io
+import zlib
 load_dotenv(find_dotenv())
-RATE_LIMIT_REQUESTS = int(os.environ.get("RATE_LIMIT_REQUESTS"))
-RATE_LIMIT_WINDOW= int(os.environ.get("RATE_LIMIT_WINDOW"))
-RATE_LIMIT = f"{RATE_LIMIT_REQUESTS}/{RATE_LIMIT_WINDOW} seconds"
-# Initialize limiter (global)
-limiter = Limiter(key_func=get_remote_address)
+MAX_UPLOAD_CONCURRENCY = int(os.environ.get("MAX_UPLOAD_CONCURRENCY", 4))                 # Files analyzed at once within one request
+MAX_GLOBAL_UPLOAD_CONCURRENCY = int(os.environ.get("MAX_GLOBAL_UPLOAD_CONCURRENCY", 16))  # Files analyzed at once across the process
+DISCONNECT_POLL_SECONDS = float(os.environ.get("DISCONNECT_POLL_SECONDS", 1))             # How often to check for client disconnects
+DEFAULT_PAGE_SIZE = int(os.environ.get("DEFAULT_PAGE_SIZE", 50))                          # GET /emotions page size
+MAX_PAGE_SIZE = int(os.environ.get("MAX_PAGE_SIZE", 500))                                 # Largest page a client may request
+PAGE_SORT = [("created_at", -1), ("_id", -1)]                                             # Must match the emotions indexes
+EXPORT_BATCH_SIZE = int(os.environ.get("EXPORT_BATCH_SIZE", 1000))                         # Default rows per cursor batch in exports
+EXPORT_CSV_COLUMNS = ["id", "user_id", "filename", "emotion", "emoji", "created_at", "updated_at", "content_type", "image_size", "scores"]
+MAX_BULK_ITEMS = int(os.environ.get("MAX_BULK_ITEMS", 500))                               # Ids per bulk update/delete request
+BULK_DELETE_CONCURRENCY = int(os.environ.get("BULK_DELETE_CONCURRENCY", 16))              # Deletes in flight per bulk request
+PROJECTABLE_FIELDS = {"user_id", "filename", "emotion", "emoji", "scores", "metadata", "created_at", "updated_at"}
 router = APIRouter(tags=["Emotions"])
 
 # Endpoint: Upload and analyze one or multiple images
-@router.post("", response_model=List[EmotionResponse], status_code=201)
+@router.post("", response_model=List[Union[EmotionResponse, EmotionUploadError]], status_code=201)
 
 async def upload_and_analyze_images(request:Request,
     files: Optional[List[UploadFile]] = File(None),  # Accept multiple uploaded files
@@ -38,70 +53,259 @@ async def upload_and_analyze_images(request:Request,
         logger.error("No files uploaded")
         not_found("No files uploaded")  
     logger.info(f"User {current_user.username} uploading {len(files)} files")
-    results = []  # Prepare list to store results for all images
-    for file in files:  # Loop through each uploaded file
-        logger.info(f"Validating file: {file.filename}")
-        await validate_image(file)  # Validate image format and size
-        logger.info(f"Analyzing emotion for file: {file.filename}")
-        emotion_data = await analyzed_emotion_from_image(file)  # Analyze emotion using LLM
-        
-        # Prepare a MongoDB document using EmotionSchema
-        emotion_doc = EmotionSchema(
-            user_id=current_user.user_id,  # Associate with current user
-            filename=file.filename,  # Store original filename
-            emotion=emotion_data["emotion"],  # Detected emotion
-            emoji=emotion_data["emoji"],  # Corresponding emoji
-            metadata=emotion_data.get("metadata", {}) , # Optional metadata (like image size)
-            created_at=datetime.now(timezone.utc),
-            updated_at=datetime.now(timezone.utc)
-        )
-        insert_result = await db.emotions.insert_one(emotion_doc.model_dump())  # Insert document into MongoDB
-        emotion_id = str(insert_result.inserted_id)
-        logger.info(f"Inserted emotion record: {emotion_id} for file: {file.filename}")
-
-        # Prepare API response using EmotionResponse model
-        results.append(EmotionResponse(
-            id=emotion_id,  
-            user_id=emotion_doc.user_id,
-            filename=emotion_doc.filename,
-            emotion=emotion_doc.emotion,
-            emoji=emotion_doc.emoji,
-            created_at=emotion_doc.created_at,
-            updated_at=emotion_doc.updated_at,
-            metadata=emotion_doc.metadata
-        ))
-    logger.success(f"Successfully processed {len(results)} file(s) for user: {current_user.username}")
+    request_slots = asyncio.Semaphore(MAX_UPLOAD_CONCURRENCY)  # Cap for this request only
+    # Run every file through the pipeline concurrently; gather keeps input order
+    results = await _cancel_on_disconnect(request, asyncio.gather(*(
+        _process_upload(file, current_user, db, request_slots) for file in files
+    )))
+    failed = sum(isinstance(r, EmotionUploadError) for r in results)
+    if failed == len(results):
+        logger.error(f"All {failed} file(s) failed for user: {current_user.username}")
+        return JSONResponse(status_code=_all_failed_status(results), content=[r.model_dump() for r in results])
+    logger.success(f"Successfully processed {len(results) - failed} file(s), {failed} failed, for user: {current_user.username}")
     return results  # Return the list of emotion analysis results
 
-# Endpoint: Get all emotion records with optional filters
+# Status for a response where every file failed: the shared status if there is one, 422 when every
+# failure is the client's fault, otherwise 503 (provider unavailable or timing out) or 502, so clients
+# and monitoring see an outage as retryable rather than as bad input
+def _all_failed_status(errors):
+    statuses = {e.status_code for e in errors}
+    if len(statuses) == 1:
+        return statuses.pop()
+    if all(400 <= code < 500 for code in statuses):
+        return 422
+    if statuses & {503, 504}:
+        return 503
+    return 502
+
+# Process one uploaded file: validate -> analyze -> insert; failures become per-item errors
+async def _process_upload(file, current_user, db, request_slots):
+    async with request_slots, _global_upload_slots():
+        try:
+            hot_logger.info(f"Validating file: {file.filename}")
+            image_bytes = await read_upload(file)  # Read the upload once; everything below shares these bytes
+            image_info = await validate_image(image_bytes)  # Validate image format, size and dimensions from the header
+            hot_logger.info(f"Analyzing emotion for file: {file.filename}")
+            emotion_data = await analyzed_emotion_from_image(image_bytes, file.filename, file.content_type, db, image_info)  # Analyze emotion using LLM (or the result cache)
+
+            return await store_emotion_record(db, current_user.user_id, file.filename, emotion_data)
+        except HTTPException as e:
+            detail = e.detail.get("message") if isinstance(e.detail, dict) else str(e.detail)
+            return EmotionUploadError(filename=file.filename, status_code=e.status_code, error=detail)
+        except Exception as e:
+            logger.error(f"Failed to process file: {file.filename} | {e}")
+            return EmotionUploadError(filename=file.filename, status_code=500, error="Failed to analyze image")
+
+# Await a coroutine, cancelling it (and any in-flight LLM calls) if the HTTP client goes away
+async def _cancel_on_disconnect(request, coro):
+    task = asyncio.ensure_future(coro)
+    while True:
+        done, _ = await asyncio.wait({task}, timeout=DISCONNECT_POLL_SECONDS)
+        if done:
+            return task.result()
+        if await request.is_disconnected():
+            logger.warning(f"Client disconnected, cancelling {request.method} {request.url.path}")
+            task.cancel()
+            return await task
+
+# Process-wide cap shared by all requests; one semaphore per event loop
+_global_slots = weakref.WeakKeyDictionary()
+def _global_upload_slots():
+    loop = asyncio.get_running_loop()
+    if loop not in _global_slots:
+        _global_slots[loop] = asyncio.Semaphore(MAX_GLOBAL_UPLOAD_CONCURRENCY)
+    return _global_slots[loop]
+
+# Endpoint: Get emotion records, newest first, one keyset-paginated page at a time.
+# The next page's cursor is returned in the X-Next-Cursor header (absent on the last page).
 @router.get("", response_model=List[EmotionResponse])
 
-async def get_emotions(request:Request,
+async def get_emotions(request:Request, response: Response,
     user_id: Optional[str] = Query(None),
+    emotion: Optional[str] = Query(None, description="Only records with this emotion"),
+    created_from: Optional[datetime] = Query(None, description="Only records created at or after this time"),
+    created_to: Optional[datetime] = Query(None, description="Only records created before this time"),
+    filename_prefix: Optional[str] = Query(None, description="Only records whose filename starts with this"),
+    fields: Optional[str] = Query(None, description=f"Comma-separated subset of: {', '.join(sorted(PROJECTABLE_FIELDS))}"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Page size"),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor value from the previous page"),
     current_user=Depends(get_current_user),
     db=Depends(get_db)
 ):
-    # Admin sees all (can filter by user_id), normal user sees only their own
-    if current_user.role == "admin" and user_id:
-        query = {"user_id": user_id}
-    elif current_user.role == "admin":
-        query = {}  
-    else:
-        if user_id and user_id != current_user.user_id:
-            raise forbid_error(f"You are not allowed to access other user's records whose id {user_id}")
-        query = {"user_id": current_user.user_id}
-
-    records = db.emotions.find(query)
-    
-    results = []
-    async for r in records:
+    query = _scoped_query(current_user, user_id)
+    query.update(_filter_query(emotion, created_from, created_to, filename_prefix))
+    if cursor:
+        created_at, last_id = _decode_cursor(cursor)
+        # Keyset: strictly after the last row of the previous page in (created_at desc, _id desc) order
+        query = {"$and": [query, {"$or": [
+            {"created_at": {"$lt": created_at}},
+            {"created_at": created_at, "_id": {"$lt": last_id}},
+        ]}]}
+
+    projection = None
+    if fields:
+        requested = {f.strip() for f in fields.split(",") if f.strip()}
+        unknown = requested - PROJECTABLE_FIELDS
+        if unknown:
+            raise validation_error(f"Unknown fields {sorted(unknown)}, must be among {sorted(PROJECTABLE_FIELDS)}")
+        projection = {f: 1 for f in requested | {"created_at"}}   # created_at is needed for the cursor
+
+    # Fetch one extra row to learn whether another page exists
+    records = db.emotions.find(query, projection).sort(PAGE_SORT).limit(limit + 1)
+    rows = [r async for r in records]
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    if not rows and not cursor:
+        raise not_found("No emotion records found")
+    headers = {}
+    if has_more:
+        headers["X-Next-Cursor"] = _encode_cursor(rows[-1])
+        headers["Link"] = f'<{request.url.include_query_params(cursor=headers["X-Next-Cursor"])}>; rel="next"'
+
+    for r in rows:
         r["id"] = str(r["_id"])   # map ObjectId to string id
         del r["_id"]              # remove _id to avoid duplication
-        results.append(EmotionResponse(**r))
+    if projection:
+        # Partial records do not fit EmotionResponse; return only what was asked for (plus id)
+        keep = requested | {"id"}
+        content = [{k: v for k, v in r.items() if k in keep} for r in rows]
+        return JSONResponse(content=jsonable_encoder(content), headers=headers)
+    response.headers.update(headers)
+    return [EmotionResponse(**r) for r in rows]
+
+# Admin sees all (can filter by user_id), normal user sees only their own
+def _scoped_query(current_user, user_id):
+    if current_user.role == "admin" and user_id:
+        return {"user_id": user_id}
+    if current_user.role == "admin":
+        return {}
+    if user_id and user_id != current_user.user_id:
+        raise forbid_error(f"You are not allowed to access other user's records whose id {user_id}")
+    return {"user_id": current_user.user_id}
+
+def _filter_query(emotion, created_from, created_to, filename_prefix):
+    query = {}
+    if emotion:
+        query["emotion"] = emotion.lower()
+    if created_from or created_to:
+        query["created_at"] = {}
+        if created_from:
+            query["created_at"]["$gte"] = created_from
+        if created_to:
+            query["created_at"]["$lt"] = created_to
+    if filename_prefix:
+        query["filename"] = {"$regex": f"^{re.escape(filename_prefix)}"}   # anchored, so it can use the index
+    return query
+
+# Opaque cursor: base64 of the last row's (created_at, _id)
+def _encode_cursor(row):
+    raw = json.dumps({"c": row["created_at"].isoformat(), "i": str(row["_id"])})
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def _decode_cursor(cursor):
+    try:
+        raw = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return datetime.fromisoformat(raw["c"]), ObjectId(raw["i"])
+    except Exception:
+        raise validation_error("Invalid cursor")
 
-    if not results:
-        raise not_found("No emotion records found")
-    return results
+
+# Endpoint: Stream every matching record as NDJSON or CSV (optionally gzipped) straight from the DB cursor.
+# Memory stays flat: rows are fetched batch_size at a time and written out as they arrive.
+@router.get("/export")
+
+async def export_emotions(request:Request,
+    format: Literal["ndjson", "csv"] = Query("ndjson", description="Output format"),
+    gzip: bool = Query(False, description="Gzip-compress the stream"),
+    batch_size: int = Query(EXPORT_BATCH_SIZE, ge=1, le=10000, description="Rows fetched per DB round-trip"),
+    user_id: Optional[str] = Query(None),
+    emotion: Optional[str] = Query(None),
+    created_from: Optional[datetime] = Query(None),
+    created_to: Optional[datetime] = Query(None),
+    filename_prefix: Optional[str] = Query(None),
+    current_user=Depends(get_current_user),
+    db=Depends(get_db)
+):
+    query = _scoped_query(current_user, user_id)   # same RBAC as get_emotions
+    query.update(_filter_query(emotion, created_from, created_to, filename_prefix))
+    cursor = db.emotions.find(query).sort(PAGE_SORT).batch_size(batch_size)
+    logger.info(f"Export started | user_id={current_user.user_id} | format={format} | gzip={gzip}")
+
+    filename = f"emotions.{format}" + (".gz" if gzip else "")
+    media_type = "application/gzip" if gzip else ("application/x-ndjson" if format == "ndjson" else "text/csv")
+    return StreamingResponse(
+        _export_stream(cursor, format, gzip, batch_size),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+async def _export_stream(cursor, format, compress, batch_size):
+    compressor = zlib.compressobj(wbits=31) if compress else None   # wbits=31 -> gzip container
+    out = io.StringIO()
+    writer = csv.writer(out) if format == "csv" else None
+    if writer:
+        writer.writerow(EXPORT_CSV_COLUMNS)
+    rows = 0
+    async for doc in cursor:
+        if writer:
+            writer.writerow(_csv_row(doc))
+        else:
+            out.write(json.dumps(_export_doc(doc), default=_json_default, ensure_ascii=False) + "\n")
+        rows += 1
+        if rows % batch_size == 0:   # flush once per DB batch
+            chunk = _drain(out, compressor)
+            if chunk:
+                yield chunk
+    chunk = _drain(out, compressor)
+    if compressor:
+        chunk += compressor.flush()
+    if chunk:
+        yield chunk
+    logger.info(f"Export finished | rows={rows}")
+
+def _drain(out, compressor):
+    data = out.getvalue().encode()
+    out.seek(0)
+    out.truncate()
+    return compressor.compress(data) if compressor else data
+
+def _export_doc(doc):
+    doc["id"] = str(doc.pop("_id"))
+    return doc
+
+def _csv_row(doc):
+    metadata = doc.get("metadata") or {}
+    return [
+        str(doc["_id"]), doc.get("user_id"), doc.get("filename"), doc.get("emotion"), doc.get("emoji"),
+        _json_default(doc.get("created_at")), _json_default(doc.get("updated_at")),
+        metadata.get("content_type"), metadata.get("Image_size"),
+        json.dumps(doc["scores"]) if doc.get("scores") else "",
+    ]
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value) if value is not None else None
+
+
+# Endpoint: Counts by emotion, user and time bucket for dashboards.
+# Served from the per-day rollups when the range is day-aligned, otherwise aggregated from the records.
+@router.get("/stats", response_model=EmotionStatsResponse)
+
+async def get_emotion_stats(request:Request,
+    user_id: Optional[str] = Query(None),
+    emotion: Optional[str] = Query(None, description="Only count this emotion"),
+    created_from: Optional[datetime] = Query(None, description="Start of the range (inclusive)"),
+    created_to: Optional[datetime] = Query(None, description="End of the range (exclusive)"),
+    bucket: Literal[STATS_BUCKETS] = Query("day", description="Time bucket size; 'all' collapses the range into one bucket"),
+    current_user=Depends(get_current_user),
+    db=Depends(get_db)
+):
+    match = _scoped_query(current_user, user_id)   # same RBAC as get_emotions
+    if emotion:
+        match["emotion"] = emotion.lower()
+    return await emotion_stats(db, match, created_from, created_to, bucket)
 
 
 @router.get("/{id}", response_model=EmotionResponse)
@@ -114,14 +318,14 @@ async def get_emotion_record_with_id(request:Request,
     try:
         object_id = ObjectId(id)
         query = {"_id": object_id}
-        logger.info(f"Parsed ID as ObjectId: {object_id}")
+        hot_logger.info(f"Parsed ID as ObjectId: {object_id}")
     except Exception:
         query = {"custom_id": id}
-        logger.info(f"Using custom_id for query: {id}")
+        hot_logger.info(f"Using custom_id for query: {id}")
     # Apply user_id filter only if not admin
     if current_user.role != "admin":
         query["user_id"] = current_user.user_id
-        logger.info(f"User is not admin, applying user filter: {current_user.user_id}")
+        hot_logger.info(f"User is not admin, applying user filter: {current_user.user_id}")
     record = await db.emotions.find_one(query)
 
     if not record:
@@ -130,7 +334,7 @@ async def get_emotion_record_with_id(request:Request,
 
     record["id"] = str(record["_id"])
     del record["_id"]
-    logger.success(f"Emotion record retrieved successfully | record_id={record['id']} | user_id={record['user_id']}")
+    hot_logger.success(f"Emotion record retrieved successfully | record_id={record['id']} | user_id={record['user_id']}")
     return EmotionResponse(**record)
 
 
@@ -145,56 +349,20 @@ async def update_emotion_record(request:Request,
     emotion: EmotionCreate = Body(...)
 ):
     logger.info(f"Update request started | record_id={id} | user_id={current_user.user_id} | role={current_user.role}")
-    
-    # Parse ID
-    try:
-        object_id = ObjectId(id)
-        query = {"_id": object_id}
-    except Exception:
-        query = {"custom_id": id}
+    update_fields = _update_fields(current_user, emotion)
 
-    # Non-admins can only access their own records
-    if current_user.role != "admin":
-        query["user_id"] = current_user.user_id
+    # Owner check is part of the filter: non-admins simply cannot match other users' records
+    query = {**_id_query(id), **_owner_query(current_user)}
 
-    record = await db.emotions.find_one(query)
+    # One atomic round-trip. BEFORE (not AFTER) so the stats rollups can move the count off the
+    # old emotion; the response applies the same $set to it locally.
+    record = await db.emotions.find_one_and_update(query, {"$set": update_fields}, return_document=ReturnDocument.BEFORE)
     if not record:
         raise not_found("Record not found")
+    updated_record = _apply_set(record, update_fields)
+    await record_updated(db, record, updated_record)
 
-    update_data = emotion.model_dump(exclude_unset=True)
-
-    # Restrict normal users
-    if current_user.role != "admin":
-        if record["user_id"] != current_user.user_id:
-            raise validation_error("You are not allowed to update this record")
-        if "user_id" in update_data and update_data["user_id"] != current_user.user_id:
-            raise forbid_error(f"You are not allowed to update another user's record (user_id={update_data['user_id']})")
-
-        # Only emotion + metadata allowed
-        allowed_fields = {}
-        if "emotion" in update_data:
-            allowed_fields["emotion"] = update_data["emotion"]
-        if "metadata" in update_data:
-            allowed_fields["metadata"] = {**(record.get("metadata") or {}), **update_data["metadata"]}
-        update_data = allowed_fields
-
-    # Auto-set emoji if emotion provided
-    if "emotion" in update_data and update_data["emotion"]:
-        emotion_val = update_data["emotion"].lower()
-        if emotion_val not in CATEGORIES:
-            raise validation_error(f"Invalid emotion '{emotion_val}', must be one of {list(CATEGORIES)}")
-        update_data["emoji"] = EMOJI_MAP[emotion_val]
-
-    # Always update timestamp
-    update_data["updated_at"] = datetime.now(timezone.utc)
-
-    # Update DB
-    await db.emotions.update_one({"_id": record["_id"]}, {"$set": update_data})
-    updated_record = await db.emotions.find_one({"_id": record["_id"]})
-
-    updated_record["id"] = str(updated_record["_id"])
-    del updated_record["_id"]
-
+    updated_record["id"] = str(updated_record.pop("_id"))
     logger.success(f"Update successful | record_id={updated_record['id']}")
     return EmotionResponse(**updated_record)
 
@@ -207,30 +375,163 @@ async def delete_emotion_record(request:Request,
     db=Depends(get_db)  # Get database connection
 ):
     logger.info(f"Delete request for record ID: {id} by user: {current_user.username}")
-    record = None
-
-    try:
-        object_id = ObjectId(id)
-        query = {"_id": object_id}
-    except Exception as e:
-        logger.warning(f"ID is not a valid ObjectId: {id}, trying custom_id. Error: {e}")
-        query = {"custom_id": id}
 
     # Admin can delete any record, normal users can only delete their own
-    if current_user.role != "admin":
-        query["user_id"] = current_user.user_id
-
-    record = await db.emotions.find_one(query)
-
+    query = {**_id_query(id), **_owner_query(current_user)}
+    record = await db.emotions.find_one_and_delete(query, projection={"user_id": 1, "emotion": 1, "created_at": 1})
     if not record:
         logger.error(f"Record not found for ID: {id}")
         raise not_found("Record not found")
 
-    # RBAC check: if not admin, must be owner
-    if current_user.role != "admin" and record["user_id"] != current_user.user_id:
-        logger.error(f"User {current_user.username} not allowed to delete record {id}")
-        raise validation_error("You are not allowed to delete this record")
-
-    await db.emotions.delete_one({"_id": record["_id"]})  # Delete record
+    await record_deleted(db, [record])
     logger.success(f"Record successfully deleted: {record['_id']}")
     return {"message": "Deleted successfully"}
+
+# Endpoint: Update many records in one bulk write; each item carries its own id and changes
+@router.post("/bulk/update", response_model=EmotionBulkResult)
+
+async def bulk_update_emotion_records(request:Request,
+    body: EmotionBulkUpdate = Body(...),
+    current_user=Depends(get_current_user),
+    db=Depends(get_db)
+):
+    if len(body.items) > MAX_BULK_ITEMS:
+        raise validation_error(f"At most {MAX_BULK_ITEMS} items per bulk request")
+    updates = {item.id: _update_fields(current_user, item) for item in body.items}   # validate everything first
+    owner = _owner_query(current_user)
+
+    # Current (user_id, emotion, created_at) of each record, for the rollups. All three go into each op's
+    # filter, so a record changed concurrently is skipped rather than counted twice.
+    before = await _find_by_ids(db, updates, owner)
+    ops = [
+        UpdateOne({"_id": doc["_id"], "user_id": doc["user_id"], "emotion": doc["emotion"], "created_at": doc["created_at"]},
+                  {"$set": updates[ref]})
+        for ref, doc in before.items()
+    ]
+    result = await db.emotions.bulk_write(ops, ordered=False) if ops else None
+    matched = result.matched_count if result else 0
+
+    after = {ref: _apply_set(dict(doc), updates[ref]) for ref, doc in before.items()}
+    if matched < len(ops):
+        # Some records changed between the read and the write; count only what we actually changed
+        current = await _find_by_ids(db, before, owner)
+        after = {ref: doc for ref, doc in after.items()
+                 if ref in current and current[ref]["emotion"] == doc["emotion"] and current[ref]["user_id"] == doc["user_id"]}
+    await record_updated_many(db, [(before[ref], doc) for ref, doc in after.items()])
+
+    logger.info(f"Bulk update by {current_user.user_id} | requested={len(updates)} | matched={matched}")
+    return EmotionBulkResult(
+        requested=len(updates),
+        matched=matched,
+        modified=result.modified_count if result else 0,
+        not_found=[ref for ref in updates if ref not in before],
+    )
+
+# Endpoint: Delete many records in one request
+@router.post("/bulk/delete", response_model=EmotionBulkResult)
+
+async def bulk_delete_emotion_records(request:Request,
+    body: EmotionBulkDelete = Body(...),
+    current_user=Depends(get_current_user),
+    db=Depends(get_db)
+):
+    if len(body.ids) > MAX_BULK_ITEMS:
+        raise validation_error(f"At most {MAX_BULK_ITEMS} ids per bulk request")
+    owner = _owner_query(current_user)
+    before = await _find_by_ids(db, body.ids, owner)
+    # One find_one_and_delete per record, like the single-record path: a record a concurrent request
+    # deleted first comes back as None (that request already took it out of the rollups), so the
+    # rollups are decremented for exactly the records this request removed
+    removed, failed = [], []
+    slots = asyncio.Semaphore(BULK_DELETE_CONCURRENCY)
+    async def delete_one(ref, doc):
+        try:
+            async with slots:
+                record = await db.emotions.find_one_and_delete({"_id": doc["_id"], **owner}, projection={"user_id": 1, "emotion": 1, "created_at": 1})
+        except Exception as e:
+            logger.error(f"Bulk delete failed for record {ref}: {e}")
+            failed.append(ref)
+            return
+        if record:
+            removed.append(record)
+    try:
+        await asyncio.gather(*(delete_one(ref, doc) for ref, doc in before.items()), return_exceptions=True)
+    finally:
+        await record_deleted(db, removed)   # even if the request is cancelled part-way
+    deleted = len(removed)
+
+    logger.info(f"Bulk delete by {current_user.user_id} | requested={len(body.ids)} | deleted={deleted} | failed={len(failed)}")
+    return EmotionBulkResult(
+        requested=len(body.ids),
+        matched=len(before),
+        deleted=deleted,
+        failed=failed,
+        not_found=[ref for ref in body.ids if ref not in before],
+    )
+
+# Records are addressed by ObjectId, or by custom_id when the id is not a valid ObjectId
+def _id_query(id):
+    if ObjectId.is_valid(id):
+        return {"_id": ObjectId(id)}
+    return {"custom_id": id}
+
+def _owner_query(current_user):
+    return {} if current_user.role == "admin" else {"user_id": current_user.user_id}
+
+# Fetch the records behind a list of ids (ObjectIds and/or custom_ids) in one query; returns {id: doc}
+async def _find_by_ids(db, ids, owner):
+    object_ids = [ObjectId(ref) for ref in ids if ObjectId.is_valid(ref)]
+    custom_ids = [ref for ref in ids if not ObjectId.is_valid(ref)]
+    clauses = []
+    if object_ids:
+        clauses.append({"_id": {"$in": object_ids}})
+    if custom_ids:
+        clauses.append({"custom_id": {"$in": custom_ids}})
+    if not clauses:
+        return {}
+    cursor = db.emotions.find({"$or": clauses, **owner}, {"user_id": 1, "emotion": 1, "created_at": 1, "custom_id": 1})
+    found = {}
+    async for doc in cursor:
+        found[str(doc["_id"])] = doc
+        if doc.get("custom_id"):
+            found[doc["custom_id"]] = doc
+    return {ref: found[ref] for ref in ids if ref in found}
+
+# $set document for an update request, applying the same rules as PUT /{id}
+def _update_fields(current_user, emotion):
+    update_data = emotion.model_dump(exclude_unset=True, exclude={"id"})
+
+    # Restrict normal users
+    if current_user.role != "admin":
+        if "user_id" in update_data and update_data["user_id"] != current_user.user_id:
+            raise forbid_error(f"You are not allowed to update another user's record (user_id={update_data['user_id']})")
+
+        # Only emotion + metadata allowed; metadata is merged key by key (dotted paths, no read-modify-write)
+        allowed_fields = {}
+        if "emotion" in update_data:
+            allowed_fields["emotion"] = update_data["emotion"]
+        for key, value in (update_data.get("metadata") or {}).items():
+            allowed_fields[f"metadata.{key}"] = value
+        update_data = allowed_fields
+
+    # Auto-set emoji if emotion provided
+    if "emotion" in update_data and update_data["emotion"]:
+        emotion_val = update_data["emotion"].lower()
+        if emotion_val not in CATEGORIES:
+            raise validation_error(f"Invalid emotion '{emotion_val}', must be one of {list(CATEGORIES)}")
+        update_data["emotion"] = emotion_val
+        update_data["emoji"] = EMOJI_MAP[emotion_val]
+
+    # Always update timestamp
+    update_data["updated_at"] = datetime.now(timezone.utc)
+    return update_data
+
+# Apply a $set document (top-level or one-level dotted keys) to a fetched record
+def _apply_set(doc, fields):
+    for key, value in fields.items():
+        if "." in key:
+            parent, child = key.split(".", 1)
+            doc[parent] = {**(doc.get(parent) or {}), child: value}
+        else:
+            doc[key] = value
+    return doc
@@ -0,0 +1,58 @@
+import asyncio
+from fastapi import APIRouter, HTTPException, Depends, UploadFile, File, Form, Path, Query   # For creating routes and handling uploads
+from typing import List, Optional
+from src.api.dependencies.auth import get_current_user  # Dependency to get the logged-in user from JWT token
+from src.api.dependencies.database import get_db  # Dependency to get MongoDB database
+from src.models.job import JobSubmitResponse, JobStatusResponse, JobItemResponse
+from src.services.image_service import read_upload, validate_image  # Reads each upload once with the size cap applied
+from src.services.job_service import enqueue_job, get_job, get_job_items, check_webhook_url, WebhookRejected
+from src.utils.errors import validation_error, not_found
+from src.utils.logger import logger
+router = APIRouter(tags=["Jobs"])
+
+# Endpoint: Queue images for background analysis; returns 202 immediately
+@router.post("", response_model=JobSubmitResponse, status_code=202)
+async def submit_job(
+    files: Optional[List[UploadFile]] = File(None),
+    webhook_url: Optional[str] = Form(None, description="Optional URL that receives a POST when the job finishes"),
+    current_user=Depends(get_current_user),
+    db=Depends(get_db)
+):
+    if not files:
+        logger.error("No files uploaded")
+        not_found("No files uploaded")
+    if webhook_url:
+        try:
+            await asyncio.to_thread(check_webhook_url, webhook_url)   # DNS lookup off the event loop
+        except WebhookRejected as e:
+            raise validation_error(str(e))
+    uploads = [(file.filename, file.content_type, await read_upload(file)) for file in files]
+    # Reject bad files now with a 4xx instead of queueing work that can only fail
+    for filename, _, data in uploads:
+        try:
+            await validate_image(data)
+        except HTTPException as e:
+            detail = e.detail.get("message") if isinstance(e.detail, dict) else str(e.detail)
+            raise validation_error(f"{filename}: {detail}")
+    job = await enqueue_job(db, current_user.user_id, uploads, webhook_url)
+    return JobSubmitResponse(job_id=job.job_id, status=job.status, total=job.total, status_url=f"/api/v1/jobs/{job.job_id}")
+
+# Endpoint: Job status with (partial) per-image results
+@router.get("/{job_id}", response_model=JobStatusResponse)
+async def get_job_status(
+    job_id: str = Path(..., description="ID returned by POST /api/v1/jobs"),
+    offset: int = Query(0, ge=0, description="First item to return"),
+    limit: int = Query(100, ge=1, le=1000, description="Maximum items to return"),
+    current_user=Depends(get_current_user),
+    db=Depends(get_db)
+):
+    job = await get_job(db, job_id)
+    # Non-admins only see their own jobs; answer 404 rather than revealing that the job exists
+    if not job or (current_user.role != "admin" and job["user_id"] != current_user.user_id):
+        raise not_found(f"No job found with id: {job_id}")
+    items = await get_job_items(db, job_id, offset, limit)
+    return JobStatusResponse(
+        **job,
+        pending=job["total"] - job["done"] - job["failed"],
+        items=[JobItemResponse(**item) for item in items],
+    )
@@ -1,25 +1,73 @@
 from fastapi import FastAPI
-from src.api.routers import emotion, auth  # Import routers from src/api/routers
+from fastapi.responses import PlainTextResponse
+from src.api.routers import emotion, auth, admin, jobs  # Import routers from src/api/routers
+from src.services.emotion_service import get_backend_metrics, start_backends, shutdown_backends
+from src.api.middleware import BodySizeLimitMiddleware, RateLimitMiddleware, MetricsMiddleware, TimedJSONResponse
+from src.services.rate_limiter import build_rate_limiter
+from src.services.image_service import start_preprocess_pool, shutdown_preprocess_pool
+from src.services.password_service import start_password_pool, shutdown_password_pool, password_stats
+from src.services.record_service import flush_records
+from src.api.dependencies.database import get_db, open_db, close_db, ensure_indexes, verify_query_plans
+from src.utils.logger import logger
+from src.utils.metrics import render_metrics, Gauge
+from contextlib import asynccontextmanager
 from dotenv import load_dotenv,find_dotenv
 import os
-from slowapi import Limiter,_rate_limit_exceeded_handler
-from slowapi.util import get_remote_address
-from slowapi.errors import RateLimitExceeded
-from slowapi.middleware import SlowAPIMiddleware
 load_dotenv(find_dotenv())
-RATE_LIMIT_REQUESTS = int(os.environ.get("RATE_LIMIT_REQUESTS"))
-RATE_LIMIT_WINDOW= int(os.environ.get("RATE_LIMIT_WINDOW"))
-RATE_LIMIT = f"{RATE_LIMIT_REQUESTS}/{RATE_LIMIT_WINDOW} second"
-# Initialize limiter (global)
-limiter = Limiter(key_func=get_remote_address,default_limits=[RATE_LIMIT])
+INDEX_DIAGNOSTICS = os.environ.get("INDEX_DIAGNOSTICS", "false").lower() == "true"   # explain() every route query at startup
+MAX_REQUEST_BODY_SIZE = int(os.environ.get("MAX_REQUEST_BODY_SIZE", 200 * 1024 * 1024))  # Whole multipart body, all files
+# Per-user token buckets, shared across workers through Mongo (RATE_LIMIT_STORE=memory for a single process)
+rate_limiter = build_rate_limiter(get_db)
 
-app = FastAPI(title="Emotion Detection API", version="1.0")
+# Startup/shutdown of process-wide resources. Everything is created and warmed here, before the first
+# request; the lazy getters behind them only remain for scripts, workers and tests without a lifespan.
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    db = await open_db(app)   # pooled Mongo client on app.state, read by get_db
+    failed_indexes = await ensure_indexes(db)
+    if failed_indexes:
+        if INDEX_DIAGNOSTICS:
+            raise RuntimeError(f"Index builds failed: {'; '.join(failed_indexes)}")
+        logger.error(f"{len(failed_indexes)} index(es) missing, affected queries will scan: {failed_indexes}")
+    if INDEX_DIAGNOSTICS:
+        await verify_query_plans(db)   # raises, so the app refuses to start with a COLLSCAN route
+    start_backends()           # LLM client / local model for EMOTION_BACKEND_MODE; misconfiguration fails here
+    start_preprocess_pool()
+    start_password_pool()
+    logger.info("Startup complete")
+    yield
+    await shutdown_backends()   # waits for in-flight LLM calls, then closes the client
+    await flush_records()   # buffered emotion records must reach Mongo before we exit
+    shutdown_preprocess_pool()
+    shutdown_password_pool()
+    await close_db(app)
+    await logger.complete()   # let the background log writer empty its queue
 
-app.state.limiter = limiter
-app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
-app.add_middleware(SlowAPIMiddleware)
+app = FastAPI(title="Emotion Detection API", version="1.0", lifespan=lifespan, default_response_class=TimedJSONResponse)
+
+app.add_middleware(RateLimitMiddleware, limiter=rate_limiter)
+app.add_middleware(BodySizeLimitMiddleware, max_bytes=MAX_REQUEST_BODY_SIZE)
+app.add_middleware(MetricsMiddleware)   # outermost: sees every request, including rejected ones
 # Include routers
 app.include_router(auth.router, prefix="/api/v1/auth", tags=["Auth"])
 app.include_router(emotion.router, prefix="/api/v1/emotions", tags=["Emotions"])
+app.include_router(jobs.router, prefix="/api/v1/jobs", tags=["Jobs"])
+app.include_router(admin.router, prefix="/api/v1/admin", tags=["Admin"])
+
+# Health check; also reports backend mode, LLM calls in flight, the password hashing queue and rate limiting
+@app.get("/health", tags=["Health"])
+async def health():
+    return {"status": "ok", "backends": get_backend_metrics(), "passwords": password_stats(), "rate_limits": rate_limiter.stats}
+
 
+# Point-in-time values read from the existing counters on every scrape
+Gauge("llm_in_flight", "LLM calls currently awaiting Gemini", fn=lambda: get_backend_metrics()["gemini"]["in_flight"])
+Gauge("llm_concurrency_limit", "Adaptive LLM concurrency limit", fn=lambda: get_backend_metrics()["gemini"]["admission"]["concurrency_limit"])
+Gauge("llm_circuit_open", "1 while the LLM circuit breaker is open or probing",
+      fn=lambda: int(get_backend_metrics()["gemini"]["admission"]["state"] != "closed"))
+Gauge("password_hash_pending", "Password hash/verify operations waiting or running", fn=lambda: password_stats()["pending"])
 
+# Prometheus scrape endpoint (text exposition format)
+@app.get("/metrics", tags=["Health"], response_class=PlainTextResponse)
+async def metrics():
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4; charset=utf-8")
@@ -2,17 +2,43 @@
 from pydantic import BaseModel,Field
 
 from datetime import datetime
-from typing import Optional
+from typing import Dict, List, Optional
+
+# Header-level facts about an uploaded image (no pixel data is decoded to get these)
+class ImageInfo(BaseModel):
+    format: str                          # "JPEG" or "PNG", from the magic bytes
+    mime_type: str
+    width: int
+    height: int
+    mode: Optional[str] = None           # PIL mode, e.g. "RGB"
+    orientation: Optional[int] = None    # EXIF orientation tag (1-8), if present
 
 class Metadata(BaseModel):
     filename: Optional[str]
     content_type: Optional[str]
-    Image_size: Optional[int]
+    Image_size: Optional[int]                 # Original upload size in bytes
+    submitted_size: Optional[int] = None      # Bytes actually sent to the LLM after preprocessing
+    backend: Optional[str] = None             # Inference backend that produced the emotion ("gemini", "local")
+    image: Optional[ImageInfo] = None
 # Schema for creating/updating an emotion record
 class EmotionCreate(BaseModel):
     user_id: Optional[str] = None
     emotion: str
     metadata: Optional[Metadata]=None
+# One entry of a bulk update: the record id plus the same fields as a single update
+class EmotionBulkUpdateItem(EmotionCreate):
+    id: str
+class EmotionBulkUpdate(BaseModel):
+    items: List[EmotionBulkUpdateItem]
+class EmotionBulkDelete(BaseModel):
+    ids: List[str]
+class EmotionBulkResult(BaseModel):
+    requested: int
+    matched: int                 # Records found (and owned by the caller)
+    modified: int = 0
+    deleted: int = 0
+    not_found: List[str] = []    # Ids that matched no record the caller may change
+    failed: List[str] = []       # Ids whose write raised an error; safe to retry
 # Schema for storing/retrieving a complete emotion record 
 class EmotionResponse(BaseModel):
     id: str
@@ -22,4 +48,26 @@ class EmotionResponse(BaseModel):
     emoji: str
     created_at: datetime
     updated_at: datetime
-    metadata: Optional[Metadata]=None  
\ No newline at end of file
+    metadata: Optional[Metadata]=None
+    scores: Optional[Dict[str, float]] = None   # Per-category probabilities, when the backend provides them
+    cache_hit: Optional[bool] = None   # Set on upload responses: True when the result came from the cache
+# Per-file failure returned in place of an EmotionResponse for batch uploads
+class EmotionUploadError(BaseModel):
+    filename: Optional[str] = None
+    status_code: int
+    error: str
+# One (time bucket, user, emotion) count returned by GET /emotions/stats
+class EmotionStatsRow(BaseModel):
+    bucket: Optional[datetime] = None   # Start of the bucket (UTC); None when bucket="all"
+    user_id: str
+    emotion: str
+    count: int
+class EmotionStatsResponse(BaseModel):
+    source: str                          # "rollup" (pre-computed daily counts) or "aggregation" (raw records)
+    bucket: str
+    created_from: Optional[datetime] = None
+    created_to: Optional[datetime] = None
+    total: int
+    by_emotion: Dict[str, int]
+    by_user: Dict[str, int]
+    buckets: List[EmotionStatsRow]
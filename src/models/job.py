@@ -0,0 +1,35 @@
+# Import BaseModel from Pydantic for data validation 
+from pydantic import BaseModel
+from datetime import datetime
+from typing import List, Optional
+from src.models.emotion import EmotionResponse
+
+# Returned by POST /api/v1/jobs (202)
+class JobSubmitResponse(BaseModel):
+    job_id: str
+    status: str
+    total: int
+    status_url: str
+
+class JobItemResponse(BaseModel):
+    index: int
+    filename: str
+    status: str
+    attempts: int
+    result: Optional[EmotionResponse] = None
+    error: Optional[str] = None
+
+# Returned by GET /api/v1/jobs/{id}; items hold partial results while the job runs
+class JobStatusResponse(BaseModel):
+    job_id: str
+    user_id: str
+    status: str
+    total: int
+    done: int
+    failed: int
+    pending: int
+    webhook_status: Optional[str] = None
+    created_at: datetime
+    updated_at: datetime
+    completed_at: Optional[datetime] = None
+    items: List[JobItemResponse]
@@ -20,4 +20,7 @@ class UserResponse(BaseModel):
     user_id:str
     username:str
     role:str
-    created_at: datetime
\ No newline at end of file
+    created_at: datetime
+# Model for an admin changing a user's role
+class UserRoleUpdate(BaseModel):
+    role: Literal["admin", "user"]
@@ -1,5 +1,6 @@
 from pydantic import BaseModel, Field
 from datetime import datetime
+from typing import Dict, Optional
 
 class EmotionSchema(BaseModel):
     _id: str 
@@ -10,3 +11,4 @@ class EmotionSchema(BaseModel):
     created_at: datetime
     updated_at: datetime
     metadata: dict
+    scores: Optional[Dict[str, float]] = None   # Per-category probabilities from the backend, if it gave any
@@ -0,0 +1,36 @@
+from pydantic import BaseModel
+from datetime import datetime
+from typing import Optional
+
+# One bulk-analysis job (collection "jobs"); the images live in job_items
+class JobSchema(BaseModel):
+    job_id: str
+    user_id: str
+    status: str                      # queued | running | completed | completed_with_errors
+    total: int
+    done: int = 0
+    failed: int = 0
+    webhook_url: Optional[str] = None
+    webhook_status: Optional[str] = None
+    created_at: datetime
+    updated_at: datetime
+    completed_at: Optional[datetime] = None
+
+# One image of a job (collection "job_items"); worked off by src/workers/job_worker.py
+class JobItemSchema(BaseModel):
+    job_id: str
+    user_id: str
+    index: int                       # Position in the original upload
+    filename: str
+    content_type: Optional[str] = None
+    data: Optional[bytes] = None     # Image bytes; dropped once the item is finished
+    status: str = "queued"           # queued | leased | done | failed
+    rank: int                        # Per-user queue position; workers serve the lowest rank first
+    attempts: int = 0
+    next_attempt_at: datetime
+    lease_expires_at: Optional[datetime] = None
+    leased_by: Optional[str] = None
+    result: Optional[dict] = None
+    error: Optional[str] = None
+    created_at: datetime
+    updated_at: datetime
@@ -8,3 +8,4 @@ class UserSchema(BaseModel):
     hashed_password: Optional[str] = None
     role: Optional[str] = None
     created_at: Optional[datetime] = None
+    token_version: int = 0   # Bumped on role change/deletion; tokens carrying an older "ver" are rejected
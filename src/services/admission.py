@@ -0,0 +1,172 @@
+import asyncio
+import random
+import time
+from src.utils.logger import logger
+from src.utils.loop_bound import LoopBound
+
+# Raised without calling the provider: the circuit is open
+class CircuitOpenError(Exception):
+    pass
+
+# Raised without calling the provider: no concurrency slot freed up within queue_timeout
+class AdmissionRejected(Exception):
+    pass
+
+# Admission control in front of a rate-limited remote service:
+#  - adaptive concurrency (AIMD): +1/limit per fast success, x latency_backoff when slower than
+#    target_latency, x overload_backoff on an overload (429) reply
+#  - retries with full-jitter exponential backoff for retryable errors (429, 5xx, transport errors)
+#  - circuit breaker: breaker_failures consecutive failed calls open it for cooldown_seconds, then one
+#    probe call decides between closing it again and another cooldown
+# call(factory) runs factory() (a fresh coroutine per attempt) under all three.
+class AdmissionController(LoopBound):
+    def __init__(self, name, is_retryable, is_overload, initial_limit=8, min_limit=1, max_limit=64,
+                 target_latency=10.0, queue_timeout=30.0, max_retries=3, retry_base=0.5, retry_max=8.0,
+                 breaker_failures=5, cooldown_seconds=30.0, latency_backoff=0.9, overload_backoff=0.5):
+        self.name = name
+        self.is_retryable = is_retryable
+        self.is_overload = is_overload
+        self.limit = float(initial_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.target_latency = target_latency
+        self.queue_timeout = queue_timeout
+        self.max_retries = max_retries
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+        self.breaker_failures = breaker_failures
+        self.cooldown_seconds = cooldown_seconds
+        self.latency_backoff = latency_backoff
+        self.overload_backoff = overload_backoff
+        self.state = "closed"            # closed | open | half_open
+        self.opened_at = 0.0
+        self.consecutive_failures = 0
+        self.in_flight = 0
+        self._slots = None               # asyncio.Condition, bound to the running loop
+        self.counters = {"admitted": 0, "rejected_queue": 0, "rejected_open": 0, "retries": 0,
+                         "overloads": 0, "failures": 0, "opened": 0}
+
+    async def call(self, factory):
+        probe = self._enter_circuit()   # True when this caller is the half-open probe
+        attempt = 0
+        try:
+            while True:
+                try:
+                    result = await self._attempt(factory)
+                except Exception as e:
+                    if self.is_retryable(e) and attempt < self.max_retries:
+                        attempt += 1
+                        self.counters["retries"] += 1
+                        delay = random.uniform(0, min(self.retry_max, self.retry_base * 2 ** attempt))
+                        logger.warning(f"{self.name} call failed ({e}), retry {attempt}/{self.max_retries} in {delay:.2f}s")
+                        await asyncio.sleep(delay)
+                        continue
+                    if self.is_retryable(e) or isinstance(e, asyncio.TimeoutError):
+                        self._record_failure(e, probe)   # provider trouble, not a bad request
+                    raise
+                self._record_success(probe)
+                return result
+        finally:
+            if probe and self.state == "half_open":
+                self._probe_done()
+
+    # One attempt under a concurrency slot; adjusts the limit from what happened
+    async def _attempt(self, factory):
+        await self._acquire()
+        started = time.monotonic()
+        try:
+            result = await factory()
+        except Exception as e:
+            if self.is_overload(e):
+                self.counters["overloads"] += 1
+                self._set_limit(self.limit * self.overload_backoff)
+            elif isinstance(e, asyncio.TimeoutError):
+                self._set_limit(self.limit * self.latency_backoff)
+            raise
+        finally:
+            await self._release()
+        latency = time.monotonic() - started
+        if latency > self.target_latency:
+            self._set_limit(self.limit * self.latency_backoff)
+        else:
+            self._set_limit(self.limit + 1 / self.limit)
+        return result
+
+    def _set_limit(self, value):
+        self.limit = min(self.max_limit, max(self.min_limit, value))
+
+    def _reset_loop_state(self):
+        self._slots, self.in_flight = asyncio.Condition(), 0
+
+    def _condition(self):
+        self._bind_loop()
+        return self._slots
+
+    async def _acquire(self):
+        slots = self._condition()
+        async with slots:
+            try:
+                await asyncio.wait_for(slots.wait_for(lambda: self.in_flight < int(self.limit)), self.queue_timeout)
+            except asyncio.TimeoutError:
+                self.counters["rejected_queue"] += 1
+                raise AdmissionRejected(f"{self.name} is saturated ({self.in_flight} calls in flight)")
+            self.in_flight += 1
+            self.counters["admitted"] += 1
+
+    async def _release(self):
+        slots = self._condition()
+        async with slots:
+            self.in_flight -= 1
+            slots.notify_all()
+
+    # Circuit breaker. Only the probe moves the circuit out of half-open; calls admitted before the
+    # circuit opened may still finish while it is open or half-open, and their outcome is stale.
+    def _enter_circuit(self):
+        if self.state == "open":
+            if time.monotonic() - self.opened_at < self.cooldown_seconds:
+                self.counters["rejected_open"] += 1
+                raise CircuitOpenError(f"{self.name} circuit is open")
+            self.state = "half_open"
+            logger.info(f"{self.name} circuit half-open, probing")
+            return True
+        if self.state == "half_open":
+            self.counters["rejected_open"] += 1
+            raise CircuitOpenError(f"{self.name} circuit is half-open, probe in progress")
+        return False
+
+    def _record_success(self, probe):
+        if probe:
+            self.state = "closed"
+            logger.info(f"{self.name} circuit closed")
+        if self.state == "closed":
+            self.consecutive_failures = 0
+
+    def _record_failure(self, error, probe):
+        self.counters["failures"] += 1
+        if probe:
+            self._open(error)
+        elif self.state == "closed":
+            self.consecutive_failures += 1
+            if self.consecutive_failures >= self.breaker_failures:
+                self._open(error)
+
+    def _open(self, error):
+        self.state = "open"
+        self.opened_at = time.monotonic()
+        self.consecutive_failures = 0
+        self.counters["opened"] += 1
+        logger.error(f"{self.name} circuit opened for {self.cooldown_seconds}s after: {error}")
+
+    def _probe_done(self):
+        # The probe ended without deciding (e.g. a 400 or a cancellation): let the next caller probe
+        self.state = "open"
+        self.opened_at = time.monotonic() - self.cooldown_seconds
+
+    def stats(self):
+        return {
+            "state": self.state,
+            "concurrency_limit": round(self.limit, 2),
+            "in_flight": self.in_flight,
+            "consecutive_failures": self.consecutive_failures,
+            **self.counters,
+        }
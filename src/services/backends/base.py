@@ -0,0 +1,26 @@
+from abc import ABC, abstractmethod
+
+# Raised when a backend cannot serve requests at all (missing model file, missing optional package, ...)
+class BackendUnavailable(Exception):
+    pass
+
+# Common interface for everything that can turn an image into an emotion.
+# classify() returns {"emotion": <label>, "confidence": <0..1 or None>, "scores": {<category>: p} or None};
+# labels outside CATEGORIES are mapped to "unknown" by the caller.
+class EmotionBackend(ABC):
+    name = "base"
+
+    @property
+    @abstractmethod
+    def version(self) -> str:
+        """Identifies model + prompt/weights; part of the result-cache key."""
+
+    def is_available(self) -> bool:
+        return True
+
+    @abstractmethod
+    async def classify(self, image_bytes: bytes, mime_type: str) -> dict:
+        ...
+
+    def stats(self) -> dict:
+        return {}
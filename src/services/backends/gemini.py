@@ -0,0 +1,318 @@
+import os
+import asyncio
+import io
+import json
+import hashlib
+from dotenv import load_dotenv,find_dotenv
+from google import genai
+from google.genai import types
+from google.genai import errors as genai_errors
+import httpx
+from src.utils.constants import EMOJI_MAP
+from src.utils.logger import logger
+from src.utils.errors import timeout_error, service_unavailable
+from src.services.admission import AdmissionController, AdmissionRejected, CircuitOpenError
+from src.utils.metrics import stage, LLM_ERRORS
+from src.services.llm_batcher import LLMBatcher, MalformedBatchResponse
+from src.services.backends.base import EmotionBackend, BackendUnavailable
+load_dotenv(find_dotenv())
+GOOGLE_API_KEY = os.environ.get("GOOGLE_API_KEY")
+LLM_MODEL = os.environ.get("GEMINI_MODEL", "gemini-2.5-flash")
+LLM_TIMEOUT_SECONDS = float(os.environ.get("LLM_TIMEOUT_SECONDS", 60))   # Deadline for one upload + generate call
+LLM_INLINE_MAX_BYTES = int(os.environ.get("LLM_INLINE_MAX_BYTES", 15 * 1024 * 1024))  # Above this, images go via the Files API
+LLM_BATCH_ENABLED = os.environ.get("LLM_BATCH_ENABLED", "true").lower() == "true"   # Micro-batch images into one call
+LLM_BATCH_MAX_SIZE = int(os.environ.get("LLM_BATCH_MAX_SIZE", 8))                    # Images per batched call
+LLM_BATCH_MAX_WAIT_MS = float(os.environ.get("LLM_BATCH_MAX_WAIT_MS", 50))          # How long the first image waits for company
+
+LLM_SECOND_PASS_MODEL = os.environ.get("GEMINI_SECOND_PASS_MODEL")   # Optional stronger model for low-confidence answers
+LOW_CONFIDENCE_THRESHOLD = float(os.environ.get("LOW_CONFIDENCE_THRESHOLD", 0.5))
+# Admission control (see src/services/admission.py)
+LLM_CONCURRENCY_INITIAL = int(os.environ.get("LLM_CONCURRENCY_INITIAL", 8))         # Starting concurrent-call limit
+LLM_CONCURRENCY_MIN = int(os.environ.get("LLM_CONCURRENCY_MIN", 1))
+LLM_CONCURRENCY_MAX = int(os.environ.get("LLM_CONCURRENCY_MAX", 64))
+LLM_TARGET_LATENCY_SECONDS = float(os.environ.get("LLM_TARGET_LATENCY_SECONDS", 10))   # Slower calls shrink the limit
+LLM_QUEUE_TIMEOUT_SECONDS = float(os.environ.get("LLM_QUEUE_TIMEOUT_SECONDS", 30))     # Max wait for a free slot
+LLM_MAX_RETRIES = int(os.environ.get("LLM_MAX_RETRIES", 3))                            # On 429 / 5xx / connection errors
+LLM_RETRY_BASE_SECONDS = float(os.environ.get("LLM_RETRY_BASE_SECONDS", 0.5))
+LLM_RETRY_MAX_SECONDS = float(os.environ.get("LLM_RETRY_MAX_SECONDS", 8))
+LLM_BREAKER_FAILURES = int(os.environ.get("LLM_BREAKER_FAILURES", 5))                  # Consecutive failed calls to open
+LLM_BREAKER_COOLDOWN_SECONDS = float(os.environ.get("LLM_BREAKER_COOLDOWN_SECONDS", 30))
+LLM_CIRCUIT_OPEN_FALLBACK = os.environ.get("LLM_CIRCUIT_OPEN_FALLBACK", "fail").lower()   # fail (503) | unknown
+LLM_DRAIN_TIMEOUT_SECONDS = float(os.environ.get("LLM_DRAIN_TIMEOUT_SECONDS", 30))   # Shutdown wait for in-flight calls
+
+client = None   # genai.Client; created by the app lifespan (or on first use by scripts and tests)
+
+def get_llm_client():
+    global client
+    if client is None:
+        if not GOOGLE_API_KEY:
+            raise RuntimeError("GOOGLE_API_KEY is not set")
+        client = genai.Client(api_key=GOOGLE_API_KEY)
+    return client
+
+# Shutdown: let queued and in-flight calls finish (their callers are still waiting), then close the HTTP client
+async def close_llm_client(timeout: float = LLM_DRAIN_TIMEOUT_SECONDS):
+    global client
+    deadline = asyncio.get_running_loop().time() + timeout
+    await llm_batcher.drain(timeout)
+    while llm_metrics["in_flight"] and asyncio.get_running_loop().time() < deadline:
+        await asyncio.sleep(0.05)
+    if llm_metrics["in_flight"]:
+        logger.warning(f"Closing the LLM client with {llm_metrics['in_flight']} call(s) still in flight")
+    if client is not None:
+        await client.aio.aclose()
+        client = None
+        logger.info("LLM client closed")
+
+EMOTION_PROMPT = f"""
+You are a highly accurate emotion detection system.
+Analyze the uploaded image file of a human face.
+From the following list of emotions: {list(EMOJI_MAP.keys())},
+identify exactly one dominant emotion and estimate a probability for every emotion in the list.
+
+Return a JSON object with "emotion" (the dominant emotion keyword, lowercase) and "scores"
+(an object mapping each listed emotion to a probability between 0 and 1; the probabilities sum to 1).
+"""
+
+RETRY_PROMPT = EMOTION_PROMPT + """
+Your previous reply could not be parsed. Reply with the JSON object only: no prose, no markdown.
+"""
+
+BATCH_PROMPT = f"""
+You are a highly accurate emotion detection system.
+You will receive {{count}} images of human faces, labelled "Image 1", "Image 2", and so on.
+For each image, identify exactly one dominant emotion from this list: {list(EMOJI_MAP.keys())},
+and estimate a probability for every emotion in the list.
+
+Return a JSON array of {{count}} objects, where the i-th object describes Image i and has
+"emotion" (the dominant emotion keyword, lowercase) and "scores" (each listed emotion -> probability).
+"""
+
+# Schema-constrained output: Gemini must answer with {"emotion": <category>, "scores": {<category>: float}}
+PREDICTION_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "emotion": {"type": "STRING", "enum": list(EMOJI_MAP.keys())},
+        "scores": {
+            "type": "OBJECT",
+            "properties": {emotion: {"type": "NUMBER"} for emotion in EMOJI_MAP},
+            "required": list(EMOJI_MAP.keys()),
+        },
+    },
+    "required": ["emotion", "scores"],
+}
+PREDICTION_CONFIG = {"response_mime_type": "application/json", "response_schema": PREDICTION_SCHEMA}
+BATCH_CONFIG = {"response_mime_type": "application/json", "response_schema": {"type": "ARRAY", "items": PREDICTION_SCHEMA}}
+RETRY_CONFIG = {**PREDICTION_CONFIG, "temperature": 0}
+
+# Raised when a single-image reply cannot be turned into a prediction
+class MalformedPrediction(ValueError):
+    pass
+
+# Counters for LLM calls; "in_flight" is the number of calls currently awaiting Gemini
+llm_metrics = {"in_flight": 0, "started": 0, "succeeded": 0, "failed": 0, "timed_out": 0, "cancelled": 0,
+               "parse_retries": 0, "second_passes": 0}
+
+def get_llm_metrics():
+    return {**llm_metrics, "batching": dict(llm_batcher.stats), "admission": llm_admission.stats()}
+
+def _is_overload(e):
+    return isinstance(e, genai_errors.APIError) and e.code == 429
+
+def _is_retryable(e):
+    if isinstance(e, genai_errors.APIError):
+        return e.code == 429 or (e.code or 0) >= 500
+    return isinstance(e, httpx.TransportError)
+
+llm_admission = AdmissionController(
+    "gemini", _is_retryable, _is_overload,
+    initial_limit=LLM_CONCURRENCY_INITIAL, min_limit=LLM_CONCURRENCY_MIN, max_limit=LLM_CONCURRENCY_MAX,
+    target_latency=LLM_TARGET_LATENCY_SECONDS, queue_timeout=LLM_QUEUE_TIMEOUT_SECONDS,
+    max_retries=LLM_MAX_RETRIES, retry_base=LLM_RETRY_BASE_SECONDS, retry_max=LLM_RETRY_MAX_SECONDS,
+    breaker_failures=LLM_BREAKER_FAILURES, cooldown_seconds=LLM_BREAKER_COOLDOWN_SECONDS,
+)
+
+async def get_llm_response(prompt, image_bytes, mime_type, model=LLM_MODEL, config=None):
+    response = await _tracked_call(lambda: _generate(prompt, image_bytes, mime_type, model, config))
+    return response.text
+
+# Ask about several images in one generate_content call; returns one prediction per image, in order
+async def get_llm_batch_response(images):
+    contents = [BATCH_PROMPT.format(count=len(images))]
+    for i, (image_bytes, mime_type) in enumerate(images, start=1):
+        contents.append(f"Image {i}:")
+        contents.append(types.Part.from_bytes(data=image_bytes, mime_type=mime_type))
+    response = await _tracked_call(lambda: _timed_generate(
+        model=LLM_MODEL,
+        contents=contents,
+        config=BATCH_CONFIG,
+    ))
+    return parse_batch_predictions(response.text, len(images))
+
+def parse_batch_predictions(text, count):
+    try:
+        items = json.loads(_strip_fences(text))
+    except ValueError as e:
+        raise MalformedBatchResponse(f"not JSON: {e}")
+    if not isinstance(items, list) or len(items) != count:
+        raise MalformedBatchResponse(f"expected a JSON array of {count} objects")
+    try:
+        return [normalize_prediction(item) for item in items]
+    except MalformedPrediction as e:
+        raise MalformedBatchResponse(str(e))
+
+# Tolerant parse of a single reply: JSON object (possibly fenced or wrapped in prose) or a bare keyword
+def parse_prediction(text):
+    cleaned = _strip_fences(text)
+    if cleaned.lower().strip(" .\"'") in EMOJI_MAP:   # model ignored the schema but the answer is usable
+        return {"emotion": cleaned.lower().strip(" .\"'"), "confidence": None, "scores": None}
+    start, end = cleaned.find("{"), cleaned.rfind("}")
+    if start == -1 or end <= start:
+        raise MalformedPrediction(f"no JSON object in reply: {cleaned[:80]!r}")
+    try:
+        item = json.loads(cleaned[start:end + 1])
+    except ValueError as e:
+        raise MalformedPrediction(f"invalid JSON: {e}")
+    return normalize_prediction(item)
+
+# Clean up {"emotion", "scores"}: keep known categories, clamp and renormalize, derive the winner if needed
+def normalize_prediction(item):
+    if isinstance(item, str):
+        item = {"emotion": item}
+    if not isinstance(item, dict):
+        raise MalformedPrediction("prediction is not an object")
+    emotion = str(item.get("emotion") or "").strip().lower()
+    scores = None
+    if isinstance(item.get("scores"), dict):
+        scores = {}
+        for key, value in item["scores"].items():
+            key = str(key).strip().lower()
+            if key in EMOJI_MAP and isinstance(value, (int, float)):
+                scores[key] = min(max(float(value), 0.0), 1.0)
+        total = sum(scores.values())
+        scores = {key: value / total for key, value in scores.items()} if total > 0 else None
+    if emotion not in EMOJI_MAP and scores:
+        emotion = max(scores, key=scores.get)
+    if emotion not in EMOJI_MAP:
+        raise MalformedPrediction(f"unknown emotion {emotion!r}")
+    confidence = scores.get(emotion) if scores else None
+    return {"emotion": emotion, "confidence": confidence, "scores": scores}
+
+def _strip_fences(text):
+    return (text or "").strip().removeprefix("```json").removeprefix("```").removesuffix("```").strip()
+
+# Run one LLM call through admission control, each attempt under the shared deadline, while keeping
+# the in-flight counters up to date. factory() must return a fresh coroutine (it is called again on retry).
+async def _tracked_call(factory):
+    llm_metrics["in_flight"] += 1
+    llm_metrics["started"] += 1
+    try:
+        # Upload (if any) + generate share one deadline; both use the SDK's async client so the event loop stays free
+        response = await llm_admission.call(lambda: asyncio.wait_for(factory(), timeout=LLM_TIMEOUT_SECONDS))
+        llm_metrics["succeeded"] += 1
+    except asyncio.TimeoutError:
+        llm_metrics["timed_out"] += 1
+        LLM_ERRORS.inc(kind="timeout")
+        timeout_error(f"LLM did not respond within {LLM_TIMEOUT_SECONDS}s")
+    except (CircuitOpenError, AdmissionRejected) as e:
+        llm_metrics["failed"] += 1
+        LLM_ERRORS.inc(kind="circuit_open" if isinstance(e, CircuitOpenError) else "saturated")
+        raise
+    except genai_errors.APIError as e:
+        llm_metrics["failed"] += 1
+        LLM_ERRORS.inc(kind=f"api_{e.code}")
+        if _is_retryable(e):   # retries exhausted: the provider is overloaded or down, not our request
+            service_unavailable(f"LLM provider error {e.code}, please retry later")
+        raise
+    except asyncio.CancelledError:
+        llm_metrics["cancelled"] += 1   # e.g. the HTTP client disconnected
+        raise
+    except Exception:
+        llm_metrics["failed"] += 1
+        LLM_ERRORS.inc(kind="other")
+        raise
+    finally:
+        llm_metrics["in_flight"] -= 1
+    return response
+
+async def _generate(prompt, image_bytes, mime_type, model, config):
+    # Small images go inline in the generate request: one round-trip, nothing written to disk
+    if len(image_bytes) <= LLM_INLINE_MAX_BYTES:
+        image_part = types.Part.from_bytes(data=image_bytes, mime_type=mime_type)
+        return await _timed_generate(model=model, contents=[prompt, image_part], config=config)
+
+    # Large images go through the Files API straight from memory; the remote copy is always deleted
+    with stage("llm_upload"):
+        myfile = await get_llm_client().aio.files.upload(file=io.BytesIO(image_bytes), config={"mime_type": mime_type})
+    try:
+        return await _timed_generate(model=model, contents=[prompt, myfile], config=config)
+    finally:
+        try:
+            await get_llm_client().aio.files.delete(name=myfile.name)
+        except Exception as e:
+            logger.warning(f"Failed to delete uploaded LLM file {myfile.name}: {e}")
+
+async def _timed_generate(**kwargs):
+    with stage("llm_generate"):
+        return await get_llm_client().aio.models.generate_content(**kwargs)
+
+# One image, one call: schema-constrained request plus a single stricter retry if the reply is unusable
+async def get_single_prediction(image_bytes, mime_type, model=LLM_MODEL):
+    text = await get_llm_response(EMOTION_PROMPT, image_bytes, mime_type, model, PREDICTION_CONFIG)
+    try:
+        return parse_prediction(text)
+    except MalformedPrediction as e:
+        logger.warning(f"Unparseable LLM reply, retrying once: {e}")
+        llm_metrics["parse_retries"] += 1
+    text = await get_llm_response(RETRY_PROMPT, image_bytes, mime_type, model, RETRY_CONFIG)
+    try:
+        return parse_prediction(text)
+    except MalformedPrediction as e:
+        logger.warning(f"LLM reply still unparseable after retry: {e}")
+        return {"emotion": (text or "").strip().lower(), "confidence": None, "scores": None}   # mapped to "unknown" by the caller
+
+llm_batcher = LLMBatcher(get_llm_batch_response, get_single_prediction, LLM_BATCH_MAX_SIZE, LLM_BATCH_MAX_WAIT_MS / 1000)
+
+# Route one image to the micro-batcher when it is small enough to share a request, else call directly
+async def get_emotion_prediction(image_bytes, mime_type):
+    if LLM_BATCH_ENABLED and len(image_bytes) <= LLM_INLINE_MAX_BYTES // LLM_BATCH_MAX_SIZE:
+        return await llm_batcher.submit(image_bytes, mime_type)
+    return await get_single_prediction(image_bytes, mime_type)
+
+# Remote backend: Gemini through the module-level client above
+class GeminiBackend(EmotionBackend):
+    name = "gemini"
+
+    def start(self):
+        get_llm_client()   # a missing key or bad client config fails startup instead of the first upload
+
+    async def close(self):
+        await close_llm_client()
+
+    @property
+    def version(self):
+        prompt_hash = hashlib.sha256((EMOTION_PROMPT + BATCH_PROMPT).encode()).hexdigest()[:12]
+        return f"gemini:{LLM_MODEL}:{LLM_SECOND_PASS_MODEL}:{prompt_hash}"
+
+    async def classify(self, image_bytes, mime_type):
+        try:
+            prediction = await get_emotion_prediction(image_bytes, mime_type)
+        except (CircuitOpenError, AdmissionRejected) as e:
+            if LLM_CIRCUIT_OPEN_FALLBACK == "unknown":
+                # Degrade instead of failing; "unknown" results are never cached
+                return {"emotion": "unknown", "confidence": None, "scores": None}
+            raise BackendUnavailable(str(e))
+        confidence = prediction["confidence"]
+        # Low-confidence answers get a second opinion from the stronger model, if one is configured
+        if LLM_SECOND_PASS_MODEL and confidence is not None and confidence < LOW_CONFIDENCE_THRESHOLD:
+            llm_metrics["second_passes"] += 1
+            try:
+                second = await get_single_prediction(image_bytes, mime_type, model=LLM_SECOND_PASS_MODEL)
+            except (CircuitOpenError, AdmissionRejected):
+                return prediction   # the first answer is still usable
+            if (second["confidence"] or 0) > confidence:
+                return second
+        return prediction
+
+    def stats(self):
+        return get_llm_metrics()
@@ -0,0 +1,145 @@
+import os
+import io
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from PIL import Image, ImageOps
+from dotenv import load_dotenv, find_dotenv
+from src.services.backends.base import EmotionBackend, BackendUnavailable
+from src.services.llm_batcher import LLMBatcher
+from src.utils.logger import logger
+load_dotenv(find_dotenv())
+ONNX_MODEL_PATH = os.environ.get("ONNX_MODEL_PATH")   # e.g. the FER+ model emotion-ferplus-8.onnx
+ONNX_MODEL_LABELS = os.environ.get(
+    "ONNX_MODEL_LABELS", "neutral,happiness,surprise,sadness,anger,disgust,fear,contempt"
+).split(",")                                            # Model output order
+ONNX_INPUT_SIZE = int(os.environ.get("ONNX_INPUT_SIZE", 64))              # Square grayscale input edge
+LOCAL_BACKEND_WORKERS = int(os.environ.get("LOCAL_BACKEND_WORKERS", 2))   # Threads running inference
+LOCAL_BATCH_MAX_SIZE = int(os.environ.get("LOCAL_BATCH_MAX_SIZE", 32))
+LOCAL_BATCH_MAX_WAIT_MS = float(os.environ.get("LOCAL_BATCH_MAX_WAIT_MS", 10))
+
+# Map model labels onto our CATEGORIES; labels mapping to the same category have their scores summed
+LABEL_TO_CATEGORY = {
+    "neutral": "neutral",
+    "happiness": "happy", "happy": "happy",
+    "surprise": "surprised", "surprised": "surprised",
+    "sadness": "sad", "sad": "sad",
+    "anger": "angry", "angry": "angry",
+    "disgust": "disgusted", "disgusted": "disgusted", "contempt": "disgusted",
+    "fear": "fearful", "fearful": "fearful",
+}
+
+# Local CPU backend: ONNX facial-expression classifier (numpy + onnxruntime, optional cv2 for face crops).
+# Images are micro-batched into one session.run() and inference runs in a thread pool.
+class OnnxEmotionBackend(EmotionBackend):
+    name = "local"
+
+    def __init__(self, model_path: str = ONNX_MODEL_PATH):
+        self.model_path = model_path
+        self._session = None
+        self._input_name = None
+        self._pool = None
+        self._face_cascade = None
+        self._load_error = None   # remembered so an unavailable backend is only reported once
+        self._batcher = LLMBatcher(self._classify_batch, self._classify_one, LOCAL_BATCH_MAX_SIZE, LOCAL_BATCH_MAX_WAIT_MS / 1000)
+        self._stats = {"runs": 0, "images": 0}
+
+    @property
+    def version(self):
+        return f"onnx:{os.path.basename(self.model_path or '')}"
+
+    def is_available(self):
+        try:
+            self._load()
+            return True
+        except BackendUnavailable:
+            return False
+
+    def _load(self):
+        if self._session is not None:
+            return
+        if self._load_error:
+            raise BackendUnavailable(self._load_error)
+        if not self.model_path or not os.path.exists(self.model_path):
+            self._fail(f"ONNX model not found: {self.model_path!r}")
+        try:
+            import onnxruntime
+        except ImportError as e:
+            self._fail(f"local backend needs numpy and onnxruntime installed ({e})")
+        try:
+            session = onnxruntime.InferenceSession(self.model_path, providers=["CPUExecutionProvider"])
+            input_name = session.get_inputs()[0].name
+        except Exception as e:   # corrupt or incompatible model, unavailable provider...
+            self._fail(f"could not load ONNX model {self.model_path!r}: {e}")
+        self._session, self._input_name = session, input_name
+        self._pool = ThreadPoolExecutor(max_workers=LOCAL_BACKEND_WORKERS, thread_name_prefix="onnx-emotion")
+        logger.info(f"Loaded local emotion model: {self.model_path}")
+
+    def _fail(self, reason):
+        self._load_error = reason
+        logger.warning(f"Local emotion backend unavailable: {reason}")
+        raise BackendUnavailable(reason)
+
+    async def classify(self, image_bytes, mime_type):
+        self._load()
+        return await self._batcher.submit(image_bytes, mime_type)
+
+    async def _classify_one(self, image_bytes, mime_type):
+        return (await self._classify_batch([(image_bytes, mime_type)]))[0]
+
+    async def _classify_batch(self, images):
+        loop = asyncio.get_running_loop()
+        results = await loop.run_in_executor(self._pool, self._infer, [image_bytes for image_bytes, _ in images])
+        # Counted back on the event loop: _infer runs on several threads at once
+        self._stats["runs"] += 1
+        self._stats["images"] += len(images)
+        return results
+
+    # Runs in a worker thread; onnxruntime releases the GIL during session.run
+    def _infer(self, images):
+        import numpy as np
+        batch = np.stack([self._to_tensor(image_bytes) for image_bytes in images])
+        logits = self._session.run(None, {self._input_name: batch})[0]
+        exp = np.exp(logits - logits.max(axis=1, keepdims=True))
+        probs = exp / exp.sum(axis=1, keepdims=True)
+
+        results = []
+        for row in probs:
+            scores = {}
+            for label, p in zip(ONNX_MODEL_LABELS, row):
+                category = LABEL_TO_CATEGORY.get(label.strip().lower())
+                if category:
+                    scores[category] = scores.get(category, 0.0) + float(p)
+            emotion = max(scores, key=scores.get)
+            results.append({"emotion": emotion, "confidence": scores[emotion], "scores": scores})
+        return results
+
+    def _to_tensor(self, image_bytes):
+        import numpy as np
+        with Image.open(io.BytesIO(image_bytes)) as img:
+            img = ImageOps.exif_transpose(img).convert("L")
+            img = self._crop_face(img)
+            img = img.resize((ONNX_INPUT_SIZE, ONNX_INPUT_SIZE))
+            return np.asarray(img, dtype=np.float32)[None, :, :]   # (1, H, W)
+
+    # Crop to the largest detected face when OpenCV is installed; otherwise use the whole image
+    def _crop_face(self, img):
+        try:
+            import cv2
+            import numpy as np
+        except ImportError:
+            return img
+        if self._face_cascade is None:
+            self._face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + "haarcascade_frontalface_default.xml")
+        faces = self._face_cascade.detectMultiScale(np.asarray(img), scaleFactor=1.1, minNeighbors=5)
+        if len(faces) == 0:
+            return img
+        x, y, w, h = max(faces, key=lambda f: f[2] * f[3])
+        return img.crop((x, y, x + w, y + h))
+
+    def stats(self):
+        return {**self._stats, "loaded": self._session is not None, "batching": dict(self._batcher.stats)}
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
@@ -0,0 +1,72 @@
+import os
+import hashlib
+from datetime import datetime, timedelta, timezone
+from dotenv import load_dotenv, find_dotenv
+from src.utils.cache import TTLCache
+from src.utils.logger import logger
+load_dotenv(find_dotenv())
+CACHE_MAX_ENTRIES = int(os.environ.get("EMOTION_CACHE_MAX_ENTRIES", 10000))    # In-process LRU size bound
+CACHE_TTL_SECONDS = float(os.environ.get("EMOTION_CACHE_TTL_SECONDS", 3600))   # In-process entry lifetime
+CACHE_PERSISTENT = os.environ.get("EMOTION_CACHE_PERSISTENT", "false").lower() == "true"  # Enable the Mongo tier
+CACHE_PERSISTENT_TTL_SECONDS = float(os.environ.get("EMOTION_CACHE_PERSISTENT_TTL_SECONDS", 30 * 24 * 3600))
+CACHE_COLLECTION = "emotion_cache"
+
+# Tier 1: in-process LRU; tier 2 (optional): the emotion_cache collection
+memory_cache = TTLCache(CACHE_MAX_ENTRIES, CACHE_TTL_SECONDS)
+
+# Content-addressed key: same image bytes + same backend version (model/prompt) -> same key
+def make_cache_key(image_bytes, version: str):
+    image_hash = hashlib.sha256(image_bytes).hexdigest()
+    version_hash = hashlib.sha256(version.encode()).hexdigest()[:16]
+    return f"{image_hash}:{version_hash}"
+
+# Look up a cached {"emotion", "emoji", "scores"} result; returns None on a miss
+async def get_cached_result(key: str, db=None):
+    result = memory_cache.get(key)
+    if result is not None:
+        return result
+    if CACHE_PERSISTENT and db is not None:
+        doc = await db[CACHE_COLLECTION].find_one(
+            {"_id": key, "expires_at": {"$gt": datetime.now(timezone.utc)}},
+            {"emotion": 1, "emoji": 1, "scores": 1},
+        )
+        if doc:
+            result = {"emotion": doc["emotion"], "emoji": doc["emoji"], "scores": doc.get("scores")}
+            memory_cache.set(key, result)   # promote to the in-process tier
+            return result
+    return None
+
+async def store_result(key: str, result: dict, db=None):
+    value = {"emotion": result["emotion"], "emoji": result["emoji"], "scores": result.get("scores")}
+    memory_cache.set(key, value)
+    if CACHE_PERSISTENT and db is not None:
+        now = datetime.now(timezone.utc)
+        try:
+            await db[CACHE_COLLECTION].update_one(
+                {"_id": key},
+                {"$set": {**value, "created_at": now, "expires_at": now + timedelta(seconds=CACHE_PERSISTENT_TTL_SECONDS)}},
+                upsert=True,
+            )
+        except Exception as e:
+            logger.warning(f"Failed to persist cache entry {key}: {e}")   # the cache is best-effort
+
+# Drop one key (or everything when key is None) from both tiers; returns number of entries removed
+async def invalidate(key: str = None, db=None):
+    if key:
+        removed = int(memory_cache.delete(key))
+    else:
+        removed = memory_cache.clear()
+    if CACHE_PERSISTENT and db is not None:
+        res = await db[CACHE_COLLECTION].delete_many({"_id": key} if key else {})
+        removed += res.deleted_count
+    return removed
+
+async def cache_stats(db=None):
+    stats = {"memory": memory_cache.stats(), "persistent": None}
+    if CACHE_PERSISTENT and db is not None:
+        stats["persistent"] = {
+            "collection": CACHE_COLLECTION,
+            "size": await db[CACHE_COLLECTION].estimated_document_count(),
+            "ttl_seconds": CACHE_PERSISTENT_TTL_SECONDS,
+        }
+    return stats
@@ -1,79 +1,136 @@
 import os
 from dotenv import load_dotenv,find_dotenv  
-from google import genai
 from src.utils.constants import EMOJI_MAP,CATEGORIES
-from src.utils.logger import logger
-from src.services.image_service import validate_image
-import tempfile
-try:    
-    load_dotenv(find_dotenv())
-    api_key = os.environ.get("GOOGLE_API_KEY")
-    client = genai.Client(api_key=api_key)
-except Exception as e:
-    logger.error(f"Failed to connect with the api key.{e}")
+from src.utils.logger import logger, hot_logger
+from src.utils.errors import service_unavailable
+from src.services.image_service import preprocess_for_llm
+from src.services.cache_service import make_cache_key, get_cached_result, store_result
+from src.utils.metrics import stage, CACHE_LOOKUPS
+from src.services.backends.base import BackendUnavailable
+from src.services.backends.gemini import GeminiBackend
+from src.services.backends.onnx_local import OnnxEmotionBackend
+load_dotenv(find_dotenv())
+# remote-only | local-only | local-first (local, remote when unsure) | remote-fallback (remote, local on error)
+EMOTION_BACKEND_MODE = os.environ.get("EMOTION_BACKEND_MODE", "remote-only").lower()
+LOCAL_MIN_CONFIDENCE = float(os.environ.get("LOCAL_MIN_CONFIDENCE", 0.6))   # local-first: below this, ask the remote backend
+LOW_CONFIDENCE_THRESHOLD = float(os.environ.get("LOW_CONFIDENCE_THRESHOLD", 0.5))   # Below this, results are not cached
+BACKEND_MODES = {"remote-only", "local-only", "local-first", "remote-fallback"}
+if EMOTION_BACKEND_MODE not in BACKEND_MODES:
+    raise ValueError(f"EMOTION_BACKEND_MODE must be one of {sorted(BACKEND_MODES)}, got {EMOTION_BACKEND_MODE!r}")
 
-async def get_llm_response(prompt, file):
-    # reset pointer in case it was read before
-    file.file.seek(0)
+remote_backend = GeminiBackend()
+local_backend = OnnxEmotionBackend()
 
-    # save UploadFile to a temp file
-    with tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(file.filename)[1]) as tmp:
-        tmp.write(await file.read())
-        tmp_path = tmp.name
+# Cache entries are only valid for the backend(s) that can produce them
+def backend_version():
+    if EMOTION_BACKEND_MODE == "remote-only":
+        return remote_backend.version
+    if EMOTION_BACKEND_MODE == "local-only":
+        return local_backend.version
+    return f"{EMOTION_BACKEND_MODE}|{local_backend.version}|{remote_backend.version}"
 
-   
-    myfile = client.files.upload(file=tmp_path)
+def get_backend_metrics():
+    return {"mode": EMOTION_BACKEND_MODE, remote_backend.name: remote_backend.stats(), local_backend.name: local_backend.stats()}
 
-    response = client.models.generate_content(
-        model="gemini-2.5-flash",
-        contents=[prompt, myfile]
-    )
+# Startup: create the clients/models the configured mode needs, so a misconfiguration fails the boot
+def start_backends():
+    if EMOTION_BACKEND_MODE != "local-only":
+        remote_backend.start()
+    if EMOTION_BACKEND_MODE != "remote-only":
+        available = local_backend.is_available()   # loads the model and starts its inference threads
+        if not available and EMOTION_BACKEND_MODE == "local-only":
+            raise BackendUnavailable("EMOTION_BACKEND_MODE is local-only but the local model could not be loaded")
 
-    # cleanup
-    os.remove(tmp_path)
+# Shutdown: drain in-flight LLM calls before closing the client, then stop local inference threads
+async def shutdown_backends():
+    await remote_backend.close()
+    local_backend.shutdown()
 
-    return response.text.strip().lower()
+# Pick backend(s) according to EMOTION_BACKEND_MODE; returns {"emotion", "confidence", "scores", "backend"}
+async def classify_image(image_bytes, mime_type):
+    if EMOTION_BACKEND_MODE == "remote-only":
+        return await _classify_with(remote_backend, image_bytes, mime_type)
+    if EMOTION_BACKEND_MODE == "local-only":
+        return await _classify_with(local_backend, image_bytes, mime_type)
 
-async def analyzed_emotion_from_image(file):
-    # Validate image
-    await validate_image(file)
+    if EMOTION_BACKEND_MODE == "local-first":
+        local_result = None
+        if local_backend.is_available():
+            local_result = await _classify_with(local_backend, image_bytes, mime_type)
+            if (local_result["confidence"] or 0) >= LOCAL_MIN_CONFIDENCE:
+                return local_result
+        try:
+            return await _classify_with(remote_backend, image_bytes, mime_type)
+        except Exception as e:
+            if local_result is None:
+                raise
+            logger.warning(f"Remote backend failed, keeping low-confidence local result: {e}")
+            return local_result
 
-   
-    image_bytes = await file.read()
-    
-    file_size_bytes = len(image_bytes)
-    file.file.seek(0)
-    prompt = f"""
-You are a highly accurate emotion detection system.
-Analyze the uploaded image file of a human face.
-From the following list of emotions: {list(EMOJI_MAP.keys())},
-identify exactly one dominant emotion.
+    # remote-fallback
+    try:
+        return await _classify_with(remote_backend, image_bytes, mime_type)
+    except Exception as e:
+        if not local_backend.is_available():
+            raise
+        logger.warning(f"Remote backend failed, falling back to local backend: {e}")
+        return await _classify_with(local_backend, image_bytes, mime_type)
 
-Return only the emotion keyword: it must be exactly one of the listed words,
-in lowercase, with no punctuation, no additional words or explanation.
-"""
+async def _classify_with(backend, image_bytes, mime_type):
+    try:
+        result = await backend.classify(image_bytes, mime_type)
+    except BackendUnavailable as e:
+        service_unavailable(f"Emotion backend '{backend.name}' is unavailable: {e}")
+    return {**result, "backend": backend.name}
 
+# image_bytes is the already-validated upload buffer (see image_service.read_upload)
+async def analyzed_emotion_from_image(image_bytes: bytes, filename: str, content_type: str, db=None, image_info=None):
+    metadata = {
+        "filename": filename,
+        "content_type": content_type,
+        "Image_size": len(image_bytes),
+        "image": image_info.model_dump() if image_info else None,
+    }
+
+    # Same bytes + same backend/model/prompt -> reuse the earlier answer instead of calling the LLM
+    with stage("cache_lookup"):
+        cache_key = make_cache_key(image_bytes, backend_version())
+        cached = await get_cached_result(cache_key, db)
+    CACHE_LOOKUPS.inc(result="hit" if cached else "miss")
+    if cached:
+        hot_logger.info(f"Emotion cache hit for file: {filename}")
+        return {**cached, "metadata": metadata, "cache_hit": True}
 
     # Get LLM response
-    emotion = await get_llm_response(prompt,file)
+    if image_info:
+        # Downscale/re-encode in the process pool; the LLM sees far fewer bytes
+        llm_bytes, mime_type = await preprocess_for_llm(image_bytes, image_info)
+    else:
+        llm_bytes, mime_type = image_bytes, (content_type if (content_type or "").startswith("image/") else "image/jpeg")
+    metadata["submitted_size"] = len(llm_bytes)
+    with stage("inference"):
+        prediction = await classify_image(llm_bytes, mime_type)
+    emotion = prediction["emotion"]
+    metadata["backend"] = prediction["backend"]
 
     # Check and map emoji
     if emotion in CATEGORIES:
         emoji = EMOJI_MAP[emotion]
     else:
-        logger.warning(f"Unexpected emotion from LLM: {emotion}")
+        logger.warning(f"Unexpected emotion from {prediction['backend']} backend: {emotion}")
         emotion = "unknown"
         emoji = "❓"
 
     result = {
         "emotion": emotion,
         "emoji": emoji,
-        "metadata": {
-            "filename": file.filename,
-            "content_type": file.content_type,
-            "Image_size": file_size_bytes,
-
-        }
+        "scores": prediction.get("scores"),
+        "metadata": metadata,
+        "cache_hit": False,
     }
+    # Never cache a failed classification; low-confidence ones are re-analysed next time
+    confidence = prediction.get("confidence")
+    if emotion != "unknown" and (confidence is None or confidence >= LOW_CONFIDENCE_THRESHOLD):
+        await store_result(cache_key, result, db)
 
     return result
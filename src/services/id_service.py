@@ -0,0 +1,93 @@
+import os
+from dotenv import load_dotenv, find_dotenv
+from pymongo import ReturnDocument
+from src.utils.logger import logger
+from src.api.dependencies.database import find_duplicates
+load_dotenv(find_dotenv())
+USER_ID_BLOCK_SIZE = int(os.environ.get("USER_ID_BLOCK_SIZE", 1))   # IDs reserved per round-trip; 1 = strictly sequential
+COUNTERS_COLLECTION = "counters"
+USER_ID_COUNTER = "user_id"
+
+# Per-process state: the counter is seeded once, then IDs are handed out from the reserved block.
+# With blocks > 1, IDs from different workers interleave and a restart leaves a gap; both are harmless
+# because user_id only has to be unique (enforced by the users.user_id unique index).
+_seeded = False
+_next = 0
+_end = 0   # exclusive
+
+def format_user_id(n: int):
+    return f"U_{n:03d}"   # U_001, U_002...
+
+# One-time migration: start the counter after the highest existing U_<n>.
+# $max makes concurrent seeding by several workers safe and never moves the counter backwards.
+async def _seed(db):
+    pipeline = [
+        {"$project": {"n": {"$convert": {
+            "input": {"$substrCP": ["$user_id", 2, 32]}, "to": "long", "onError": 0, "onNull": 0,
+        }}}},
+        {"$group": {"_id": None, "max": {"$max": "$n"}}},
+    ]
+    cursor = await db.users.aggregate(pipeline)
+    rows = [row async for row in cursor]
+    highest = int(rows[0]["max"]) if rows else 0
+    await db[COUNTERS_COLLECTION].update_one({"_id": USER_ID_COUNTER}, {"$max": {"seq": highest}}, upsert=True)
+    logger.info(f"User id counter seeded at {highest}")
+
+async def _ensure_seeded(db):
+    global _seeded
+    if _seeded:
+        return
+    if not await db[COUNTERS_COLLECTION].find_one({"_id": USER_ID_COUNTER}):
+        await _seed(db)
+    _seeded = True
+
+# Atomically reserve the next USER_ID_BLOCK_SIZE numbers; returns the first one
+async def _reserve_block(db, size):
+    counter = await db[COUNTERS_COLLECTION].find_one_and_update(
+        {"_id": USER_ID_COUNTER},
+        {"$inc": {"seq": size}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER,
+    )
+    return counter["seq"] - size + 1
+
+async def allocate_user_id(db):
+    global _next, _end
+    await _ensure_seeded(db)
+    if _next >= _end:
+        start = await _reserve_block(db, USER_ID_BLOCK_SIZE)
+        _next, _end = start, start + USER_ID_BLOCK_SIZE
+    n = _next
+    _next += 1
+    return format_user_id(n)
+
+# Called after a duplicate user_id: the counter lags behind existing users (e.g. IDs inserted by hand).
+# Drop the local block and re-seed so the next allocation jumps past them.
+async def resync_user_ids(db):
+    global _seeded, _next, _end
+    _next = _end = 0
+    await _seed(db)
+    _seeded = True
+
+# One-time migration for users created by the old count+1 allocator, which could hand two concurrent
+# registrations the same id. The earliest account keeps it; later ones get a fresh id and a bumped
+# token_version, so their existing tokens (which carry the old id) stop working and they log in again.
+# Records already stored under a shared id cannot be told apart and stay with the account that keeps it.
+# Run explicitly (python -m scripts.dedupe_user_ids), never at startup. Returns [(old_id, new_id, _id), ...].
+async def dedupe_user_ids(db, dry_run: bool = False):
+    groups = await find_duplicates(db, "users", "user_id")
+    if not groups:
+        return []
+    if not dry_run:
+        await resync_user_ids(db)   # new ids must start past every existing one
+    moved = []
+    for group in groups:
+        for _id in sorted(group["ids"])[1:]:   # ObjectIds sort by creation time
+            if dry_run:
+                moved.append((group["_id"], None, _id))
+                continue
+            new_id = await allocate_user_id(db)
+            await db.users.update_one({"_id": _id}, {"$set": {"user_id": new_id}, "$inc": {"token_version": 1}})
+            logger.warning(f"Duplicate user_id {group['_id']} reassigned to {new_id} for user document {_id}")
+            moved.append((group["_id"], new_id, _id))
+    return moved
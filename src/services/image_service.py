@@ -1,25 +1,163 @@
-from PIL import Image
+from PIL import Image, ImageOps
 import io
 import os
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 from dotenv import load_dotenv, find_dotenv
 from src.utils.errors import validation_error  # import custom error
+from src.models.emotion import ImageInfo
+from src.utils.metrics import stage
 load_dotenv(find_dotenv())
 maxsize = int(os.environ.get("MAX_IMAGE_SIZE"))
+max_pixels = int(os.environ.get("MAX_IMAGE_PIXELS", 40_000_000))     # Width * height limit
+max_dimension = int(os.environ.get("MAX_IMAGE_DIMENSION", 10_000))   # Limit for either edge, in pixels
 ALLOWED_FORMATS = ["JPEG", "PNG"]
-async def validate_image(file):
-    # Read bytes from uploaded file
-    image_data = await file.read()
-     # Reset pointer so file can be reused later
-    await file.seek(0)
+MAGIC_BYTES = {b"\xff\xd8\xff": "JPEG", b"\x89PNG\r\n\x1a\n": "PNG"}
+MIME_TYPES = {"JPEG": "image/jpeg", "PNG": "image/png"}
+EXIF_ORIENTATION_TAG = 0x0112
+READ_CHUNK_SIZE = 1024 * 1024   # Upload bytes read per chunk
+LLM_IMAGE_MAX_EDGE = int(os.environ.get("LLM_IMAGE_MAX_EDGE", 768))        # Longest edge sent to the LLM, in pixels
+LLM_IMAGE_FORMAT = os.environ.get("LLM_IMAGE_FORMAT", "JPEG").upper()      # JPEG or WEBP
+LLM_IMAGE_QUALITY = int(os.environ.get("LLM_IMAGE_QUALITY", 85))
+PREPROCESS_WORKERS = int(os.environ.get("PREPROCESS_WORKERS", min(4, os.cpu_count() or 1)))
+LLM_MIME_TYPES = {"JPEG": "image/jpeg", "WEBP": "image/webp"}
+if LLM_IMAGE_FORMAT not in LLM_MIME_TYPES:
+    raise ValueError(f"LLM_IMAGE_FORMAT must be one of {sorted(LLM_MIME_TYPES)}, got {LLM_IMAGE_FORMAT!r}")
+JPEG_METADATA_MARKERS = {0xE1, 0xED, 0xFE}                          # APP1 (EXIF, XMP), APP13 (IPTC), COM
+PNG_METADATA_CHUNKS = {b"eXIf", b"tEXt", b"zTXt", b"iTXt", b"tIME"}
+_preprocess_pool = None   # Created on first use; CPU-bound resizing runs here, off the event loop
+
+# Read an upload exactly once into an immutable buffer, rejecting it as soon as it passes the size cap
+async def read_upload(file):
+    if file.size is not None and file.size > maxsize:   # declared size is already too large
+        raise validation_error(f"Image size exceeds {maxsize // (1024 * 1024)} MB limit")
+    buffer = bytearray()
+    while chunk := await file.read(READ_CHUNK_SIZE):
+        buffer += chunk
+        if len(buffer) > maxsize:
+            raise validation_error(f"Image size exceeds {maxsize // (1024 * 1024)} MB limit")
+    await file.close()   # release the spooled upload now that we hold the bytes
+    return bytes(buffer)
+
+# Sniff the real format from the leading bytes instead of trusting the filename/content type
+def sniff_format(image_data: bytes):
+    for magic, fmt in MAGIC_BYTES.items():
+        if image_data[:len(magic)] == magic:
+            return fmt
+    return None
+
+# Validate from the header only: Image.open parses the header lazily and we never touch pixel data
+async def validate_image(image_data: bytes):
+    with stage("validation"):
+        return _validate_image(image_data)
+
+def _validate_image(image_data: bytes):
     # Check size before opening image
     if len(image_data) > maxsize:
-        raise validation_error("Image size exceeds 10 MB limit")
+        raise validation_error(f"Image size exceeds {maxsize // (1024 * 1024)} MB limit")
   # Check file format
+    img_format = sniff_format(image_data)
+    if img_format not in ALLOWED_FORMATS:
+        raise validation_error(f"Invalid image format. Allowed: {ALLOWED_FORMATS}")
     try:
-      img = Image.open(io.BytesIO(image_data)) # Read bytes from uploaded file
-      img_format=img.format.upper()
-      if img_format not in ALLOWED_FORMATS:
-            raise validation_error(f"Invalid image format. Allowed: {ALLOWED_FORMATS}")
+      with Image.open(io.BytesIO(image_data), formats=[img_format]) as img: # Open the shared buffer without copying it
+        width, height = img.size
+        mode = img.mode
+        orientation = img.getexif().get(EXIF_ORIENTATION_TAG) if img_format == "JPEG" else None
+    except Image.DecompressionBombError:
+        raise validation_error(f"Image exceeds {max_pixels} pixel limit")
     except Exception:
         raise validation_error("Invalid image file")
-    return image_data
+    # Block decompression bombs: a tiny file can declare an enormous canvas
+    if width > max_dimension or height > max_dimension:
+        raise validation_error(f"Image dimensions {width}x{height} exceed {max_dimension}px limit")
+    if width * height > max_pixels:
+        raise validation_error(f"Image exceeds {max_pixels} pixel limit")
+    return ImageInfo(format=img_format, mime_type=MIME_TYPES[img_format], width=width, height=height,
+                     mode=mode, orientation=orientation)
+
+# Runs in a worker process: normalize orientation, downscale, drop metadata and re-encode
+def _downscale_and_encode(image_data: bytes, max_edge: int, out_format: str, quality: int):
+    with Image.open(io.BytesIO(image_data)) as img:
+        img.draft("RGB", (max_edge, max_edge))   # JPEG only: let the decoder skip detail we will throw away
+        img = ImageOps.exif_transpose(img)
+        if img.mode != "RGB":
+            img = img.convert("RGB")
+        img.thumbnail((max_edge, max_edge))
+        out = io.BytesIO()
+        img.save(out, format=out_format, quality=quality)   # no exif= argument, so metadata is stripped
+        return out.getvalue()
+
+# Drop metadata segments/chunks without touching the pixel data; raises ValueError on a malformed file
+def _strip_metadata(image_data: bytes, img_format: str):
+    out = io.BytesIO()
+    if img_format == "JPEG":
+        out.write(image_data[:2])   # SOI
+        pos = 2
+        while True:
+            if pos + 4 > len(image_data) or image_data[pos] != 0xFF:
+                raise ValueError("malformed JPEG segment")
+            marker = image_data[pos + 1]
+            if marker == 0xDA:   # start of scan: entropy-coded data follows, no more metadata segments
+                out.write(image_data[pos:])
+                return out.getvalue()
+            end = pos + 2 + int.from_bytes(image_data[pos + 2:pos + 4], "big")
+            if end > len(image_data):
+                raise ValueError("truncated JPEG segment")
+            if marker not in JPEG_METADATA_MARKERS:
+                out.write(image_data[pos:end])
+            pos = end
+    out.write(image_data[:8])   # PNG signature
+    pos = 8
+    while pos + 12 <= len(image_data):
+        end = pos + 12 + int.from_bytes(image_data[pos:pos + 4], "big")   # length, type, data, crc
+        chunk_type = image_data[pos + 4:pos + 8]
+        if chunk_type not in PNG_METADATA_CHUNKS:
+            out.write(image_data[pos:end])
+        if chunk_type == b"IEND":
+            return out.getvalue()
+        pos = end
+    raise ValueError("truncated PNG")
+
+# Runs in a worker process. Large or rotated images are re-encoded; small upright ones are sent as
+# whichever is smaller, the re-encoded image or the original with its metadata stripped.
+# Either way no EXIF/GPS or other metadata leaves the process. Returns (bytes, mime_type).
+def _prepare_for_llm(image_data: bytes, img_format: str, mime_type: str, keep_original: bool):
+    encoded = _downscale_and_encode(image_data, LLM_IMAGE_MAX_EDGE, LLM_IMAGE_FORMAT, LLM_IMAGE_QUALITY)
+    candidates = [(encoded, LLM_MIME_TYPES[LLM_IMAGE_FORMAT])]
+    if keep_original:
+        try:
+            candidates.append((_strip_metadata(image_data, img_format), mime_type))
+        except ValueError:
+            pass   # Pillow could decode it, our segment walker could not: send the re-encoded image
+    return min(candidates, key=lambda candidate: len(candidate[0]))
+
+def _get_preprocess_pool():
+    global _preprocess_pool
+    if _preprocess_pool is None:
+        _preprocess_pool = ProcessPoolExecutor(max_workers=PREPROCESS_WORKERS)
+    return _preprocess_pool
+
+# Startup: fork the worker processes now rather than inside the first upload
+def start_preprocess_pool():
+    pool = _get_preprocess_pool()
+    for future in [pool.submit(os.getpid) for _ in range(PREPROCESS_WORKERS)]:
+        future.result()
+
+def shutdown_preprocess_pool():
+    global _preprocess_pool
+    if _preprocess_pool is not None:
+        _preprocess_pool.shutdown(wait=True)
+        _preprocess_pool = None
+
+# Prepare an image for the LLM off the event loop; returns (bytes, mime_type)
+async def preprocess_for_llm(image_data: bytes, image_info: ImageInfo):
+    small = max(image_info.width, image_info.height) <= LLM_IMAGE_MAX_EDGE
+    upright = image_info.orientation in (None, 1)
+    loop = asyncio.get_running_loop()
+    with stage("preprocessing"):
+        return await loop.run_in_executor(
+            _get_preprocess_pool(),
+            partial(_prepare_for_llm, image_data, image_info.format, image_info.mime_type, small and upright),
+        )
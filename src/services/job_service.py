@@ -0,0 +1,192 @@
+import os
+import uuid
+import json
+import random
+import socket
+import asyncio
+import ipaddress
+import urllib.parse
+import urllib.request
+from datetime import datetime, timedelta, timezone
+from bson import ObjectId
+from pymongo import ReturnDocument
+from dotenv import load_dotenv, find_dotenv
+from src.schemas.job import JobSchema, JobItemSchema
+from src.utils.logger import logger
+from src.utils.errors import service_unavailable
+load_dotenv(find_dotenv())
+JOB_LEASE_SECONDS = float(os.environ.get("JOB_LEASE_SECONDS", 300))          # A leased item is retried if not finished by then
+JOB_MAX_ATTEMPTS = int(os.environ.get("JOB_MAX_ATTEMPTS", 5))
+JOB_RETRY_BASE_SECONDS = float(os.environ.get("JOB_RETRY_BASE_SECONDS", 5))  # Backoff: base * 2^(attempt-1), jittered
+JOB_WEBHOOK_TIMEOUT_SECONDS = float(os.environ.get("JOB_WEBHOOK_TIMEOUT_SECONDS", 10))
+JOB_WEBHOOK_ATTEMPTS = int(os.environ.get("JOB_WEBHOOK_ATTEMPTS", 3))
+# Comma-separated hosts trusted as webhook targets (may be internal). Empty: any host with only public addresses
+JOB_WEBHOOK_ALLOWED_HOSTS = {h.strip().lower() for h in os.environ.get("JOB_WEBHOOK_ALLOWED_HOSTS", "").split(",") if h.strip()}
+TERMINAL_JOB_STATUSES = ["completed", "completed_with_errors"]
+
+# Queue a job: one jobs document plus one job_items document per image.
+# Fairness: each item's rank is its position in that user's pending queue, and workers always take the
+# lowest rank first, so users are served round-robin and a large backfill cannot starve a small upload.
+async def enqueue_job(db, user_id: str, uploads, webhook_url: str = None):
+    now = datetime.now(timezone.utc)
+    job = JobSchema(job_id=uuid.uuid4().hex, user_id=user_id, status="queued", total=len(uploads),
+                    webhook_url=webhook_url, created_at=now, updated_at=now)
+    pending_filter = {"user_id": user_id, "status": {"$in": ["queued", "leased"]}}
+    pending = await db.job_items.count_documents(pending_filter)   # provisional; corrected below
+    items = [
+        JobItemSchema(job_id=job.job_id, user_id=user_id, index=i, filename=filename, content_type=content_type,
+                      data=data, rank=pending + i, next_attempt_at=now, created_at=now, updated_at=now).model_dump()
+        for i, (filename, content_type, data) in enumerate(uploads)
+    ]
+    for item in items:
+        item["_id"] = ObjectId()   # ascending, so this job's items sort after anything submitted earlier
+    # The job document goes first: workers update its counters as soon as an item is done.
+    # If the items cannot all be stored, remove the job again rather than leave one that never finishes.
+    await db.jobs.insert_one(job.model_dump())
+    try:
+        await db.job_items.insert_many(items, ordered=False)
+    except Exception as e:
+        logger.error(f"Failed to queue items of job {job.job_id}, removing it: {e}")
+        await db.job_items.delete_many({"job_id": job.job_id})
+        await db.jobs.delete_one({"job_id": job.job_id})
+        service_unavailable("Could not queue the job, please retry")
+    # Concurrent submits by the same user all counted the same pending items; now that ours are stored,
+    # count only what is queued ahead of them and shift the ranks if that differs
+    ahead = await db.job_items.count_documents({**pending_filter, "_id": {"$lt": items[0]["_id"]}})
+    if ahead != pending:
+        await db.job_items.update_many({"job_id": job.job_id}, [{"$set": {"rank": {"$add": [ahead, "$index"]}}}])
+    logger.info(f"Queued job {job.job_id} with {job.total} image(s) for user {user_id}")
+    return job
+
+async def get_job(db, job_id: str):
+    return await db.jobs.find_one({"job_id": job_id}, {"_id": 0})
+
+async def get_job_items(db, job_id: str, offset: int, limit: int):
+    cursor = db.job_items.find({"job_id": job_id}, {"_id": 0, "data": 0}).sort("index", 1).skip(offset).limit(limit)
+    return [item async for item in cursor]
+
+# Atomically take the next runnable item: queued and due, or leased by a worker whose lease ran out
+async def lease_next_item(db, worker_id: str):
+    now = datetime.now(timezone.utc)
+    item = await db.job_items.find_one_and_update(
+        {"$or": [
+            {"status": "queued", "next_attempt_at": {"$lte": now}},
+            {"status": "leased", "lease_expires_at": {"$lt": now}},
+        ]},
+        {"$set": {"status": "leased", "leased_by": worker_id, "updated_at": now,
+                  "lease_expires_at": now + timedelta(seconds=JOB_LEASE_SECONDS)},
+         "$inc": {"attempts": 1}},
+        sort=[("rank", 1), ("created_at", 1)],
+        return_document=ReturnDocument.AFTER,
+    )
+    if item:
+        await db.jobs.update_one({"job_id": item["job_id"], "status": "queued"},
+                                 {"$set": {"status": "running", "updated_at": now}})
+    return item
+
+async def complete_item(db, item, result: dict):
+    now = datetime.now(timezone.utc)
+    res = await db.job_items.update_one(
+        {"_id": item["_id"], "status": "leased", "leased_by": item["leased_by"]},   # only if our lease still holds
+        {"$set": {"status": "done", "result": result, "error": None, "updated_at": now}, "$unset": {"data": ""}},
+    )
+    if res.modified_count:
+        await db.jobs.update_one({"job_id": item["job_id"]}, {"$inc": {"done": 1}, "$set": {"updated_at": now}})
+        await _finalize_if_complete(db, item["job_id"])
+
+# Transient failures go back to the queue with jittered exponential backoff; permanent ones (or too many
+# attempts) mark the item failed
+async def fail_item(db, item, error: str, permanent: bool = False):
+    now = datetime.now(timezone.utc)
+    if permanent or item["attempts"] >= JOB_MAX_ATTEMPTS:
+        res = await db.job_items.update_one(
+            {"_id": item["_id"], "status": "leased", "leased_by": item["leased_by"]},
+            {"$set": {"status": "failed", "error": error, "updated_at": now}, "$unset": {"data": ""}},
+        )
+        if res.modified_count:
+            await db.jobs.update_one({"job_id": item["job_id"]}, {"$inc": {"failed": 1}, "$set": {"updated_at": now}})
+            await _finalize_if_complete(db, item["job_id"])
+        return
+    delay = JOB_RETRY_BASE_SECONDS * 2 ** (item["attempts"] - 1) * random.uniform(0.5, 1.5)
+    await db.job_items.update_one(
+        {"_id": item["_id"], "status": "leased", "leased_by": item["leased_by"]},
+        {"$set": {"status": "queued", "error": error, "updated_at": now, "leased_by": None,
+                  "next_attempt_at": now + timedelta(seconds=delay)}},
+    )
+    logger.warning(f"Job item {item['job_id']}#{item['index']} failed (attempt {item['attempts']}), retrying in {delay:.1f}s: {error}")
+
+# Flip the job to a terminal status exactly once, then fire the webhook
+async def _finalize_if_complete(db, job_id: str):
+    now = datetime.now(timezone.utc)
+    job = await db.jobs.find_one_and_update(
+        {"job_id": job_id, "status": {"$nin": TERMINAL_JOB_STATUSES}, "$expr": {"$gte": [{"$add": ["$done", "$failed"]}, "$total"]}},
+        [{"$set": {
+            "status": {"$cond": [{"$gt": ["$failed", 0]}, "completed_with_errors", "completed"]},
+            "completed_at": now,
+            "updated_at": now,
+        }}],
+        return_document=ReturnDocument.AFTER,
+    )
+    if not job:
+        return
+    logger.success(f"Job {job_id} finished: {job['status']} ({job['done']} done, {job['failed']} failed)")
+    if job.get("webhook_url"):
+        delivered = await send_webhook(job["webhook_url"], {
+            "job_id": job_id, "status": job["status"], "total": job["total"], "done": job["done"], "failed": job["failed"],
+        })
+        await db.jobs.update_one({"job_id": job_id}, {"$set": {"webhook_status": "delivered" if delivered else "failed"}})
+
+# Raised for webhook URLs the server must not call
+class WebhookRejected(ValueError):
+    pass
+
+# Webhooks are posted from inside our network, so a user-supplied URL must not reach internal services
+# (cloud metadata, localhost admin ports, the database). Blocking: resolves the host.
+def check_webhook_url(url: str):
+    parts = urllib.parse.urlsplit(url)
+    if parts.scheme not in ("http", "https") or not parts.hostname:
+        raise WebhookRejected("webhook_url must be an http(s) URL")
+    host = parts.hostname.lower()
+    if JOB_WEBHOOK_ALLOWED_HOSTS:
+        if host not in JOB_WEBHOOK_ALLOWED_HOSTS:
+            raise WebhookRejected(f"webhook host {host} is not allowed")
+        return
+    try:
+        infos = socket.getaddrinfo(host, parts.port or 443, type=socket.SOCK_STREAM)
+    except (OSError, UnicodeError, ValueError):
+        raise WebhookRejected(f"webhook host {host} does not resolve")
+    for info in infos:
+        address = ipaddress.ip_address(info[4][0].split("%")[0])
+        if getattr(address, "ipv4_mapped", None):
+            address = address.ipv4_mapped
+        # is_global excludes loopback, private, link-local, shared and reserved ranges
+        if not address.is_global or address.is_multicast:
+            raise WebhookRejected(f"webhook host {host} resolves to a non-public address")
+
+async def send_webhook(url: str, payload: dict):
+    body = json.dumps(payload).encode()
+    for attempt in range(1, JOB_WEBHOOK_ATTEMPTS + 1):
+        try:
+            await asyncio.to_thread(_post_json, url, body)
+            return True
+        except WebhookRejected as e:
+            logger.warning(f"Webhook {url} not sent: {e}")
+            return False
+        except Exception as e:
+            logger.warning(f"Webhook {url} failed (attempt {attempt}/{JOB_WEBHOOK_ATTEMPTS}): {e}")
+            if attempt < JOB_WEBHOOK_ATTEMPTS:
+                await asyncio.sleep(2 ** attempt)
+    return False
+
+# A redirect could point anywhere, including internal addresses; 3xx replies count as failed deliveries
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        return None
+
+_webhook_opener = urllib.request.build_opener(_NoRedirect)
+
+def _post_json(url: str, body: bytes):
+    check_webhook_url(url)   # again at send time: DNS may have changed since the job was submitted
+    req = urllib.request.Request(url, data=body, method="POST", headers={"Content-Type": "application/json"})
+    with _webhook_opener.open(req, timeout=JOB_WEBHOOK_TIMEOUT_SECONDS) as resp:
+        resp.read()
@@ -0,0 +1,60 @@
+import asyncio
+from src.utils.logger import logger
+from src.services.micro_batcher import MicroBatcher
+
+# Raised by a batch call whose reply cannot be mapped back onto its images
+class MalformedBatchResponse(ValueError):
+    pass
+
+# Sends images submitted within a short window (across requests and users) to the LLM as one
+# multi-image call. Each caller awaits its own future.
+# call_batch(items) -> list of results, one per (image_bytes, mime_type) item, in order.
+# call_single(image_bytes, mime_type) -> result; used for 1-item batches and as the fallback.
+class LLMBatcher(MicroBatcher):
+    def __init__(self, call_batch, call_single, max_size: int, max_wait_seconds: float):
+        super().__init__(max_size, max_wait_seconds)
+        self.call_batch = call_batch
+        self.call_single = call_single
+        self.stats = {"batches": 0, "batched_images": 0, "fallbacks": 0}
+
+    async def submit(self, image_bytes: bytes, mime_type: str):
+        return await self._enqueue((image_bytes, mime_type))
+
+    async def _run_batch(self, batch):
+        batch = [entry for entry in batch if not entry[1].done()]   # skip callers that already gave up
+        if not batch:
+            return
+        if len(batch) == 1:
+            return await self._run_single(batch[0])
+        self.stats["batches"] += 1
+        self.stats["batched_images"] += len(batch)
+        try:
+            results = await self.call_batch([item for item, _ in batch])
+        except MalformedBatchResponse as e:
+            # The model did not return one answer per image: ask about each image on its own
+            logger.warning(f"Malformed batch response for {len(batch)} images, falling back to single calls: {e}")
+            self.stats["fallbacks"] += 1
+            await asyncio.gather(*(self._run_single(entry) for entry in batch))
+            return
+        except BaseException as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            return
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+    async def _run_single(self, entry):
+        (image_bytes, mime_type), future = entry
+        try:
+            result = await self.call_single(image_bytes, mime_type)
+        except Exception as e:
+            if not future.done():
+                future.set_exception(e)
+            return
+        if not future.done():
+            future.set_result(result)
+
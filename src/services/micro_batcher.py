@@ -0,0 +1,48 @@
+import asyncio
+from src.utils.loop_bound import LoopBound
+
+# Collects items submitted within a short window (across requests) and hands them to _run_batch() as
+# one batch: when max_size items are waiting, or max_wait_seconds after the first one arrived.
+# Each caller gets its own future; _run_batch(batch) receives [(item, future), ...] and must resolve
+# every future that is not done yet.
+class MicroBatcher(LoopBound):
+    def __init__(self, max_size: int, max_wait_seconds: float):
+        self.max_size = max_size
+        self.max_wait_seconds = max_wait_seconds
+        self._reset_loop_state()
+
+    def _reset_loop_state(self):
+        self._pending = []        # (item, future)
+        self._timer = None
+        self._tasks = set()       # running batches: keeps them referenced and lets drain() wait for them
+
+    def _enqueue(self, item):
+        loop = self._bind_loop()
+        future = loop.create_future()
+        self._pending.append((item, future))
+        if len(self._pending) >= self.max_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait_seconds, self._flush)
+        return future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = self._loop.create_task(self._run_batch(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run_batch(self, batch):
+        raise NotImplementedError
+
+    # Send anything still waiting and wait (up to timeout seconds) for running batches; used at shutdown
+    async def drain(self, timeout: float = None):
+        if self._loop is not asyncio.get_running_loop():
+            return
+        self._flush()
+        if self._tasks:
+            await asyncio.wait(list(self._tasks), timeout=timeout)
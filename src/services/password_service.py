@@ -0,0 +1,70 @@
+import os
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from dotenv import load_dotenv, find_dotenv
+from passlib.context import CryptContext   # Password hashing and verification
+from src.utils.errors import service_unavailable
+from src.utils.logger import logger
+load_dotenv(find_dotenv())
+BCRYPT_ROUNDS = int(os.environ.get("BCRYPT_ROUNDS", 12))                                # Cost factor (2^rounds iterations)
+PASSWORD_HASH_WORKERS = int(os.environ.get("PASSWORD_HASH_WORKERS", os.cpu_count() or 2))  # Hashes computed at once
+PASSWORD_HASH_MAX_QUEUE = int(os.environ.get("PASSWORD_HASH_MAX_QUEUE", 64))             # Waiting + running before 503
+
+# Single bcrypt context for the whole app. Hashes made with a different cost than BCRYPT_ROUNDS
+# are reported by verify_and_update, so logins upgrade (or downgrade) them transparently.
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__default_rounds=BCRYPT_ROUNDS,
+                           bcrypt__min_rounds=BCRYPT_ROUNDS, bcrypt__max_rounds=BCRYPT_ROUNDS)
+
+# bcrypt releases the GIL, so threads give real parallelism without pickling overhead
+_executor = None
+_pending = 0
+password_metrics = {"hashed": 0, "verified": 0, "rehashed": 0, "rejected": 0}
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="bcrypt")
+    return _executor
+
+# Run one CPU-bound passlib call off the event loop; refuse work beyond the queue limit instead of
+# letting a login burst pile up behind the pool (clients get a fast 503 and can retry)
+async def _run(func, *args):
+    global _pending
+    if _pending >= PASSWORD_HASH_MAX_QUEUE:
+        password_metrics["rejected"] += 1
+        service_unavailable("Too many authentication requests in progress, please retry")
+    _pending += 1
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_get_executor(), func, *args)
+    finally:
+        _pending -= 1
+
+async def hash_password(password: str) -> str:
+    hashed = await _run(pwd_context.hash, password)
+    password_metrics["hashed"] += 1
+    return hashed
+
+# Returns (valid, new_hash); new_hash is set when the stored hash should be replaced
+async def verify_password(password: str, hashed_password: str):
+    valid, new_hash = await _run(pwd_context.verify_and_update, password, hashed_password)
+    password_metrics["verified"] += 1
+    if new_hash:
+        password_metrics["rehashed"] += 1
+    return valid, new_hash
+
+def password_stats():
+    return {**password_metrics, "pending": _pending, "workers": PASSWORD_HASH_WORKERS,
+            "max_queue": PASSWORD_HASH_MAX_QUEUE, "rounds": BCRYPT_ROUNDS}
+
+# Startup: create the pool and spin up its threads before the first login
+def start_password_pool():
+    executor = _get_executor()
+    for _ in range(PASSWORD_HASH_WORKERS):
+        executor.submit(int)
+
+def shutdown_password_pool():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=True)
+        _executor = None
+        logger.info("Password hashing pool shut down")
@@ -0,0 +1,113 @@
+import os
+import time
+from dotenv import load_dotenv, find_dotenv
+from pymongo import ReturnDocument
+from src.utils.logger import logger
+load_dotenv(find_dotenv())
+RATE_LIMIT_REQUESTS = int(os.environ.get("RATE_LIMIT_REQUESTS"))          # Bucket size for a normal user
+RATE_LIMIT_WINDOW = int(os.environ.get("RATE_LIMIT_WINDOW"))              # Seconds to refill a full bucket
+RATE_LIMIT_ADMIN_REQUESTS = int(os.environ.get("RATE_LIMIT_ADMIN_REQUESTS", RATE_LIMIT_REQUESTS * 10))
+RATE_LIMIT_ANONYMOUS_REQUESTS = int(os.environ.get("RATE_LIMIT_ANONYMOUS_REQUESTS", RATE_LIMIT_REQUESTS))   # Per client IP
+RATE_LIMIT_UPLOAD_COST = int(os.environ.get("RATE_LIMIT_UPLOAD_COST", 5))   # Tokens per LLM-bound request; reads cost 1
+RATE_LIMIT_STORE = os.environ.get("RATE_LIMIT_STORE", "mongo").lower()      # mongo (shared by all workers) | memory
+RATE_LIMIT_COLLECTION = "rate_limits"
+
+# Bucket capacity per principal kind; every bucket refills completely in RATE_LIMIT_WINDOW seconds
+ROLE_CAPACITY = {"admin": RATE_LIMIT_ADMIN_REQUESTS, "user": RATE_LIMIT_REQUESTS, "anonymous": RATE_LIMIT_ANONYMOUS_REQUESTS}
+
+# (method, path prefix) -> cost; the first match wins
+REQUEST_COSTS = [
+    ("POST", "/api/v1/emotions/bulk", 1),
+    ("POST", "/api/v1/emotions", RATE_LIMIT_UPLOAD_COST),
+    ("POST", "/api/v1/jobs", RATE_LIMIT_UPLOAD_COST),
+]
+
+def request_cost(method: str, path: str):
+    for cost_method, prefix, cost in REQUEST_COSTS:
+        if method == cost_method and path.startswith(prefix):
+            return cost
+    return 1
+
+# Token-bucket stores. take() atomically refills the bucket for the time elapsed, then removes cost
+# tokens if there are enough. Returns (allowed, tokens_left).
+class MemoryBucketStore:
+    # Per-process stand-in for tests and single-worker deployments
+    def __init__(self):
+        self._buckets = {}   # key -> (tokens, updated_at)
+
+    async def take(self, key, cost, capacity, refill_per_second):
+        now = time.monotonic()
+        tokens, updated_at = self._buckets.get(key, (capacity, now))
+        tokens = min(capacity, tokens + (now - updated_at) * refill_per_second)
+        allowed = tokens >= cost
+        if allowed:
+            tokens -= cost
+        self._buckets[key] = (tokens, now)
+        return allowed, tokens
+
+class MongoBucketStore:
+    # One document per bucket, updated with a single pipeline upsert so every worker sees the same
+    # count. Uses the server clock ($$NOW), so worker clock skew does not matter.
+    def __init__(self, get_db, collection=RATE_LIMIT_COLLECTION):
+        self.get_db = get_db
+        self.collection = collection
+
+    async def take(self, key, cost, capacity, refill_per_second):
+        db = await self.get_db()
+        elapsed = {"$divide": [{"$subtract": ["$$NOW", {"$ifNull": ["$updated_at", "$$NOW"]}]}, 1000]}
+        refilled = {"$min": [capacity, {"$add": [{"$ifNull": ["$tokens", capacity]}, {"$multiply": [elapsed, refill_per_second]}]}]}
+        ttl_ms = int(capacity / refill_per_second * 1000) if refill_per_second else 0
+        doc = await db[self.collection].find_one_and_update(
+            {"_id": key},
+            [
+                {"$set": {"tokens": refilled, "updated_at": "$$NOW"}},
+                {"$set": {"allowed": {"$gte": ["$tokens", cost]}}},
+                {"$set": {
+                    "tokens": {"$cond": ["$allowed", {"$subtract": ["$tokens", cost]}, "$tokens"]},
+                    "expires_at": {"$add": ["$$NOW", ttl_ms]},   # a full bucket needs no document
+                }},
+            ],
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+        return doc["allowed"], doc["tokens"]
+
+class RateLimiter:
+    def __init__(self, store, window_seconds: int = RATE_LIMIT_WINDOW):
+        self.store = store
+        self.window_seconds = window_seconds
+        self.stats = {"allowed": 0, "rejected": 0, "store_errors": 0}
+
+    # Returns (allowed, headers). principal is (kind, id): ("user", "U_001"), ("admin", ...), ("anonymous", ip)
+    async def check(self, principal, cost: int):
+        kind, ident = principal
+        capacity = ROLE_CAPACITY.get(kind, RATE_LIMIT_REQUESTS)
+        refill_per_second = capacity / self.window_seconds
+        try:
+            allowed, tokens = await self.store.take(f"{kind}:{ident}", cost, capacity, refill_per_second)
+        except Exception as e:
+            # Fail open: an unreachable store must not take the whole API down
+            self.stats["store_errors"] += 1
+            logger.warning(f"Rate limit store unavailable, allowing request: {e}")
+            return True, {}
+        # Seconds until the bucket is full again / until this request could be afforded
+        reset = (capacity - tokens) / refill_per_second
+        headers = {
+            "RateLimit-Limit": str(capacity),
+            "RateLimit-Remaining": str(int(tokens)),
+            "RateLimit-Reset": str(int(reset + 0.999)),
+            "RateLimit-Policy": f"{capacity};w={self.window_seconds}",
+        }
+        if allowed:
+            self.stats["allowed"] += 1
+        else:
+            self.stats["rejected"] += 1
+            headers["Retry-After"] = str(int((cost - tokens) / refill_per_second + 0.999))
+        return allowed, headers
+
+def build_rate_limiter(get_db):
+    if RATE_LIMIT_STORE == "memory":
+        return RateLimiter(MemoryBucketStore())
+    if RATE_LIMIT_STORE == "mongo":
+        return RateLimiter(MongoBucketStore(get_db))
+    raise ValueError(f"RATE_LIMIT_STORE must be 'mongo' or 'memory', got {RATE_LIMIT_STORE!r}")
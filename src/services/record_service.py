@@ -0,0 +1,64 @@
+import os
+from datetime import datetime, timezone
+from dotenv import load_dotenv, find_dotenv
+from pymongo import WriteConcern
+from src.schemas.emotion import EmotionSchema  # MongoDB document schema for emotions
+from src.models.emotion import EmotionResponse
+from src.services.stats_service import record_inserted
+from src.services.write_batcher import WriteBatcher
+from src.utils.logger import hot_logger
+load_dotenv(find_dotenv())
+RECORD_WRITE_BATCH_SIZE = int(os.environ.get("RECORD_WRITE_BATCH_SIZE", 100))            # Flush when this many records are buffered
+RECORD_WRITE_MAX_WAIT_MS = float(os.environ.get("RECORD_WRITE_MAX_WAIT_MS", 20))         # ...or when the oldest has waited this long
+RECORD_WRITE_CONCERN_W = os.environ.get("RECORD_WRITE_CONCERN_W", "1")                   # "0", "1", "majority", ...
+RECORD_WRITE_CONCERN_J = os.environ.get("RECORD_WRITE_CONCERN_J", "false").lower() == "true"   # Wait for the journal
+
+def _write_concern():
+    w = int(RECORD_WRITE_CONCERN_W) if RECORD_WRITE_CONCERN_W.isdigit() else RECORD_WRITE_CONCERN_W
+    return WriteConcern(w=w, j=RECORD_WRITE_CONCERN_J or None)
+
+# All emotion records (uploads and job items) are written through this batcher; the stats
+# rollups are bumped once per flushed batch instead of once per record
+emotion_writer = WriteBatcher(
+    "emotions",
+    max_size=RECORD_WRITE_BATCH_SIZE,
+    max_wait_seconds=RECORD_WRITE_MAX_WAIT_MS / 1000,
+    write_concern=_write_concern(),
+    on_inserted=record_inserted,
+)
+
+# Persist one analysis result (shared by the upload endpoint and the background job workers)
+async def store_emotion_record(db, user_id: str, filename: str, emotion_data: dict):
+    now = datetime.now(timezone.utc)
+    # Prepare a MongoDB document using EmotionSchema
+    emotion_doc = EmotionSchema(
+        user_id=user_id,  # Associate with the uploading user
+        filename=filename,  # Store original filename
+        emotion=emotion_data["emotion"],  # Detected emotion
+        emoji=emotion_data["emoji"],  # Corresponding emoji
+        scores=emotion_data.get("scores"),  # Per-category probabilities
+        metadata=emotion_data.get("metadata", {}) , # Optional metadata (like image size)
+        created_at=now,
+        updated_at=now
+    )
+    inserted_id = await emotion_writer.insert(db, emotion_doc.model_dump())  # Batched insert_many into MongoDB
+    emotion_id = str(inserted_id)
+    hot_logger.info(f"Inserted emotion record: {emotion_id} for file: {filename}")
+
+    # Prepare API response using EmotionResponse model
+    return EmotionResponse(
+        id=emotion_id,  
+        user_id=emotion_doc.user_id,
+        filename=emotion_doc.filename,
+        emotion=emotion_doc.emotion,
+        emoji=emotion_doc.emoji,
+        created_at=emotion_doc.created_at,
+        updated_at=emotion_doc.updated_at,
+        metadata=emotion_doc.metadata,
+        scores=emotion_doc.scores,
+        cache_hit=emotion_data.get("cache_hit", False)
+    )
+
+# Flush buffered records before the process exits
+async def flush_records():
+    await emotion_writer.drain()
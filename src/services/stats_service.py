@@ -0,0 +1,138 @@
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from pymongo import UpdateOne
+from src.utils.logger import logger, hot_logger
+ROLLUP_COLLECTION = "emotion_rollups"   # One doc per (user_id, UTC day, emotion) holding a running count
+STATS_BUCKETS = ("hour", "day", "week", "month", "year", "all")
+ROLLUP_BUCKETS = {"day", "week", "month", "year", "all"}   # Buckets that can be built from daily rollups
+
+def _utc(ts):
+    # Mongo hands back naive datetimes that are already UTC
+    return ts.replace(tzinfo=timezone.utc) if ts.tzinfo is None else ts.astimezone(timezone.utc)
+
+def _day(ts):
+    ts = _utc(ts)
+    return datetime(ts.year, ts.month, ts.day, tzinfo=timezone.utc)
+
+def _day_aligned(ts):
+    return ts is None or _utc(ts) == _day(ts)
+
+# Apply (user_id, created_at, emotion, delta) changes to the rollups in one round-trip.
+# Rollups are derived data: a failure here is logged, never surfaced to the caller whose write already succeeded.
+async def apply_rollup_deltas(db, changes):
+    totals = defaultdict(int)
+    for user_id, created_at, emotion, delta in changes:
+        if user_id and created_at and emotion:
+            totals[(user_id, _day(created_at), emotion)] += delta
+    ops = [
+        UpdateOne({"user_id": user_id, "day": day, "emotion": emotion}, {"$inc": {"count": n}}, upsert=True)
+        for (user_id, day, emotion), n in totals.items() if n
+    ]
+    if not ops:
+        return
+    try:
+        await db[ROLLUP_COLLECTION].bulk_write(ops, ordered=False)
+    except Exception as e:
+        logger.warning(f"Failed to update emotion rollups ({len(ops)} keys): {e}")
+
+async def record_inserted(db, docs):
+    await apply_rollup_deltas(db, [(d["user_id"], d["created_at"], d["emotion"], 1) for d in docs])
+
+async def record_deleted(db, docs):
+    await apply_rollup_deltas(db, [(d["user_id"], d["created_at"], d["emotion"], -1) for d in docs])
+
+# before/after are the stored document around an update; only emotion/user_id changes move a count
+def _update_changes(before, after):
+    if before.get("emotion") == after.get("emotion") and before.get("user_id") == after.get("user_id"):
+        return []
+    return [
+        (before["user_id"], before["created_at"], before["emotion"], -1),
+        (after["user_id"], after["created_at"], after["emotion"], 1),
+    ]
+
+async def record_updated(db, before, after):
+    await record_updated_many(db, [(before, after)])
+
+# Many updates in one rollup round-trip; pairs is [(before, after), ...]
+async def record_updated_many(db, pairs):
+    await apply_rollup_deltas(db, [change for before, after in pairs for change in _update_changes(before, after)])
+
+def _group_stage(date_field, bucket, count):
+    bucket_expr = None if bucket == "all" else {"$dateTrunc": {"date": f"${date_field}", "unit": bucket, "timezone": "UTC"}}
+    return {"$group": {
+        "_id": {"bucket": bucket_expr, "user_id": "$user_id", "emotion": "$emotion"},
+        "count": {"$sum": count},
+    }}
+
+def _stats_pipeline(match, date_field, created_from, created_to, bucket, count):
+    match = dict(match)
+    if created_from or created_to:
+        match[date_field] = {}
+        if created_from:
+            match[date_field]["$gte"] = created_from
+        if created_to:
+            match[date_field]["$lt"] = created_to
+    return [
+        {"$match": match},
+        _group_stage(date_field, bucket, count),
+        {"$match": {"count": {"$gt": 0}}},   # rollups can hold zeroed-out keys after deletes
+        {"$sort": {"_id.bucket": 1, "_id.user_id": 1, "_id.emotion": 1}},
+    ]
+
+# Counts by (bucket, user_id, emotion). match holds the user_id/emotion filters.
+# Day-aligned ranges with day-or-coarser buckets read the rollups (a few docs per user per day);
+# anything else (hourly buckets, ranges starting mid-day) aggregates the raw records instead.
+async def emotion_stats(db, match, created_from=None, created_to=None, bucket="day"):
+    created_from = _utc(created_from) if created_from else None
+    created_to = _utc(created_to) if created_to else None
+    if bucket in ROLLUP_BUCKETS and _day_aligned(created_from) and _day_aligned(created_to):
+        source = "rollup"
+        pipeline = _stats_pipeline(match, "day", created_from, created_to, bucket, "$count")
+        cursor = await db[ROLLUP_COLLECTION].aggregate(pipeline)
+    else:
+        source = "aggregation"
+        pipeline = _stats_pipeline(match, "created_at", created_from, created_to, bucket, 1)
+        cursor = await db.emotions.aggregate(pipeline)
+
+    rows, by_emotion, by_user = [], defaultdict(int), defaultdict(int)
+    async for doc in cursor:
+        key = doc["_id"]
+        rows.append({"bucket": key["bucket"], "user_id": key["user_id"], "emotion": key["emotion"], "count": doc["count"]})
+        by_emotion[key["emotion"]] += doc["count"]
+        by_user[key["user_id"]] += doc["count"]
+    hot_logger.info(f"Emotion stats served | source={source} | bucket={bucket} | rows={len(rows)}")
+    return {
+        "source": source,
+        "bucket": bucket,
+        "created_from": created_from,
+        "created_to": created_to,
+        "total": sum(by_emotion.values()),
+        "by_emotion": dict(by_emotion),
+        "by_user": dict(by_user),
+        "buckets": rows,
+    }
+
+# Recompute every rollup from the emotions collection (initial backfill, or repair after a failed increment).
+# $out swaps the collection in atomically and keeps its indexes; increments landing mid-rebuild are lost,
+# so run this while writes are quiet.
+async def rebuild_rollups(db):
+    pipeline = [
+        {"$group": {
+            "_id": {
+                "user_id": "$user_id",
+                "day": {"$dateTrunc": {"date": "$created_at", "unit": "day", "timezone": "UTC"}},
+                "emotion": "$emotion",
+            },
+            "count": {"$sum": 1},
+        }},
+        {"$project": {"_id": 0, "user_id": "$_id.user_id", "day": "$_id.day", "emotion": "$_id.emotion", "count": 1}},
+        {"$out": ROLLUP_COLLECTION},
+    ]
+    started = datetime.now(timezone.utc)
+    cursor = await db.emotions.aggregate(pipeline)
+    async for _ in cursor:
+        pass
+    rollups = await db[ROLLUP_COLLECTION].estimated_document_count()
+    elapsed = (datetime.now(timezone.utc) - started) / timedelta(seconds=1)
+    logger.info(f"Emotion rollups rebuilt | docs={rollups} | seconds={elapsed:.2f}")
+    return {"rollups": rollups, "seconds": round(elapsed, 3)}
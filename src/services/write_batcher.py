@@ -0,0 +1,71 @@
+import asyncio
+from bson import ObjectId
+from pymongo import WriteConcern
+from pymongo.errors import BulkWriteError, WriteError
+from src.utils.logger import logger
+from src.utils.metrics import stage
+from src.services.micro_batcher import MicroBatcher
+
+# Write-behind batcher: documents submitted within a short window (across requests and job items)
+# are written with one insert_many(ordered=False). Each caller awaits its own future, which resolves
+# to the inserted _id or raises the error Mongo reported for that particular document.
+# on_inserted(db, docs) runs once per flushed batch with the documents that were written.
+class WriteBatcher(MicroBatcher):
+    def __init__(self, collection: str, max_size: int, max_wait_seconds: float, write_concern: WriteConcern = None, on_inserted=None):
+        super().__init__(max_size, max_wait_seconds)
+        self.collection = collection
+        self.write_concern = write_concern
+        self.on_inserted = on_inserted
+        self.stats = {"batches": 0, "documents": 0, "failed": 0}
+
+    async def insert(self, db, doc: dict):
+        doc.setdefault("_id", ObjectId())   # known up front, so results map back without relying on order
+        # shield: a caller that disconnects must not cancel a write other callers share
+        return await asyncio.shield(self._enqueue((db, doc)))
+
+    async def _run_batch(self, batch):
+        # Tests (and the worker) may hand in different db handles; one insert_many per database
+        by_db = {}
+        for entry in batch:
+            by_db.setdefault(id(entry[0][0]), []).append(entry)
+        await asyncio.gather(*(self._write(entries) for entries in by_db.values()))
+
+    async def _write(self, entries):
+        db = entries[0][0][0]
+        docs = [doc for (_, doc), _ in entries]
+        collection = db.get_collection(self.collection, write_concern=self.write_concern)
+        self.stats["batches"] += 1
+        errors = {}
+        try:
+            with stage("mongo_insert"):
+                await collection.insert_many(docs, ordered=False)
+        except BulkWriteError as e:
+            # ordered=False: every document except those listed in writeErrors was written
+            for err in e.details.get("writeErrors", []):
+                errors[err["index"]] = WriteError(err.get("errmsg"), err.get("code"), err)
+            if e.details.get("writeConcernErrors"):
+                # Written, but not yet acknowledged at the requested write concern
+                logger.warning(f"{self.collection} batch write concern not satisfied: {e.details['writeConcernErrors'][0].get('errmsg')}")
+        except Exception as e:
+            errors = {index: e for index in range(len(docs))}   # nothing known to be written
+        written = []
+        for index, ((_, doc), future) in enumerate(entries):
+            error = errors.get(index)
+            if future.done():
+                continue
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(doc["_id"])
+                written.append(doc)
+        self.stats["documents"] += len(written)
+        self.stats["failed"] += len(errors)
+        if errors:
+            logger.error(f"{len(errors)} of {len(docs)} {self.collection} writes failed: {next(iter(errors.values()))}")
+        if written and self.on_inserted:
+            await self.on_inserted(db, written)
+
+    # Write out anything still buffered and wait for in-flight batches (shutdown)
+    async def drain(self, timeout: float = None):
+        await super().drain(timeout)
+        logger.info(f"{self.collection} write batcher drained | {self.stats}")
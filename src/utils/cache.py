@@ -0,0 +1,54 @@
+import time
+from collections import OrderedDict
+
+# Small in-process LRU cache with a per-entry TTL.
+# Not thread-safe: it is only used from the event loop thread.
+class TTLCache:
+    def __init__(self, max_size: int, ttl_seconds: float):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._data = OrderedDict()   # key -> (expires_at, value), oldest first
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._data[key]      # expired -> treat as a miss
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)  # mark as most recently used
+        self.hits += 1
+        return value
+
+    def set(self, key, value):
+        if self.max_size <= 0:
+            return
+        self._data[key] = (time.monotonic() + self.ttl_seconds, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False)   # drop least recently used
+            self.evictions += 1
+
+    def delete(self, key):
+        return self._data.pop(key, None) is not None
+
+    def clear(self):
+        count = len(self._data)
+        self._data.clear()
+        return count
+
+    def stats(self):
+        return {
+            "size": len(self._data),
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
@@ -0,0 +1,6 @@
+from contextvars import ContextVar
+
+# Per-request values, set by the middleware / auth dependency and read by the logger and tracing.
+# asyncio copies the context into every task, so values follow the request through gather() and batchers.
+request_id_var = ContextVar("request_id", default="-")
+user_id_var = ContextVar("user_id", default="-")
@@ -23,3 +23,15 @@ def validation_error(detail: str = "Validation failed"):
 
 def forbid_error(detail:str="Forbidden"):
     return api_exception(detail, status.HTTP_403_FORBIDDEN)
+
+# function for "Gateway Timeout" (504) errors, e.g. when the LLM does not answer in time
+def timeout_error(detail: str = "Upstream service timed out"):
+    return api_exception(detail, status.HTTP_504_GATEWAY_TIMEOUT)
+
+# function for "Payload Too Large" (413) errors
+def payload_too_large(detail: str = "Request body too large"):
+    return api_exception(detail, status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+
+# function for "Service Unavailable" (503) errors, e.g. an inference backend or worker pool is not usable
+def service_unavailable(detail: str = "Service unavailable"):
+    return api_exception(detail, status.HTTP_503_SERVICE_UNAVAILABLE)
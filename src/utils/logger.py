@@ -1,10 +1,85 @@
 from loguru import logger  # Import Loguru's logger for easy logging
+import os
+import re
+import sys
+import json
+import random
+from dotenv import load_dotenv, find_dotenv
+from src.utils.context import request_id_var, user_id_var
+load_dotenv(find_dotenv())
+LOG_FILE = os.environ.get("LOG_FILE", "emotion_api.log")
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO")
+LOG_JSON = os.environ.get("LOG_JSON", "true").lower() == "true"           # One JSON object per line in the log file
+LOG_CONSOLE = os.environ.get("LOG_CONSOLE", "true").lower() == "true"     # Human-readable lines on stderr
+LOG_ROTATION = os.environ.get("LOG_ROTATION", "50 MB")                    # Size ("50 MB") or time ("00:00", "1 day")
+LOG_RETENTION = os.environ.get("LOG_RETENTION", "14 days")
+LOG_COMPRESSION = os.environ.get("LOG_COMPRESSION", "gz")                 # Rotated files are compressed in the background
+LOG_SAMPLE_RATE = float(os.environ.get("LOG_SAMPLE_RATE", 0.1))            # Share of hot-path info logs that are kept
+
+SENSITIVE_KEYS = {"password", "hashed_password", "token", "access_token", "authorization", "api_key", "secret"}
+# key=value / "key": "value" pairs and bearer tokens inside free-text messages
+_SENSITIVE_PATTERN = re.compile(r"(?i)\b(password|hashed_password|access_token|token|api_key|secret)(['\"]?\s*[:=]\s*['\"]?)([^\s'\",}|]+)")
+_BEARER_PATTERN = re.compile(r"(?i)\bbearer\s+[A-Za-z0-9._~+/=-]+")
+
+def redact(text: str):
+    text = _SENSITIVE_PATTERN.sub(lambda m: f"{m.group(1)}{m.group(2)}***", text)
+    return _BEARER_PATTERN.sub("Bearer ***", text)
+
+# Runs for every record: attach request/user ids and scrub secrets before any sink sees the record
+def _patch(record):
+    extra = record["extra"]
+    extra.setdefault("request_id", request_id_var.get())
+    extra.setdefault("user_id", user_id_var.get())
+    for key in extra:
+        if key.lower() in SENSITIVE_KEYS:
+            extra[key] = "***"
+    record["message"] = redact(record["message"])
+
+# Hot-path info logs (bound with sample=True) are kept with probability LOG_SAMPLE_RATE; warnings and errors always pass
+def _sample(record):
+    if record["extra"].get("sample") and record["level"].no < 30:
+        return random.random() < LOG_SAMPLE_RATE
+    return True
+
+def _json_format(record):
+    payload = {
+        "time": record["time"].isoformat(),
+        "level": record["level"].name,
+        "message": record["message"],
+        "request_id": record["extra"].get("request_id"),
+        "user_id": record["extra"].get("user_id"),
+        "logger": f"{record['name']}:{record['function']}:{record['line']}",
+    }
+    payload.update({k: v for k, v in record["extra"].items() if k not in payload and k not in ("sample", "_json")})
+    if record["exception"]:
+        payload["exception"] = str(record["exception"].value)
+    record["extra"]["_json"] = json.dumps(payload, default=str, ensure_ascii=False)
+    return "{extra[_json]}\n"
+
+logger.remove()   # replace loguru's default synchronous stderr sink
+logger.configure(patcher=_patch)
+
+# enqueue=True: records go onto a queue and a background thread does the I/O, so handlers never block on disk
+if LOG_CONSOLE:
+    logger.add(
+        sys.stderr,
+        level=LOG_LEVEL,
+        format="<green>{time:YYYY-MM-DD HH:mm:ss}</green> | <level>{level}</level> | {extra[request_id]} | {message}",
+        filter=_sample,
+        enqueue=True,
+    )
 
 # Add a log file where all log messages will be stored
 logger.add(
-    "emotion_api.log",   # Name of the log file
-    level="INFO",        # Minimum log level to record (INFO, WARNING, ERROR)
-    format="{time:YYYY-MM-DD HH:mm:ss} | {level} | {message}", # set up time as per my choice then log level after that log message 
-    
+    LOG_FILE,            # Name of the log file
+    level=LOG_LEVEL,     # Minimum log level to record (INFO, WARNING, ERROR)
+    format=_json_format if LOG_JSON else "{time:YYYY-MM-DD HH:mm:ss} | {level} | {extra[request_id]} | {extra[user_id]} | {message}",
+    filter=_sample,
+    enqueue=True,
+    rotation=LOG_ROTATION,
+    retention=LOG_RETENTION,
+    compression=LOG_COMPRESSION,
+)
 
-)
\ No newline at end of file
+# For high-volume info logs on hot paths (per file, per record); sampled by LOG_SAMPLE_RATE
+hot_logger = logger.bind(sample=True)
@@ -0,0 +1,18 @@
+import asyncio
+
+# Base for objects that hold asyncio primitives (futures, timers, conditions), which only work on the
+# event loop that created them. The app runs on one loop, but a fresh TestClient, asyncio.run() or a
+# worker process brings a new one: _bind_loop() returns the running loop and calls _reset_loop_state()
+# on first use and whenever the loop has changed.
+class LoopBound:
+    _loop = None
+
+    def _bind_loop(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._reset_loop_state()
+        return loop
+
+    def _reset_loop_state(self):
+        pass
@@ -0,0 +1,137 @@
+import os
+import time
+from contextlib import contextmanager, ExitStack
+from dotenv import load_dotenv, find_dotenv
+from src.utils.context import request_id_var
+load_dotenv(find_dotenv())
+TRACING_ENABLED = os.environ.get("TRACING_ENABLED", "false").lower() == "true"   # OpenTelemetry spans per stage
+
+# Optional dependency: spans are only emitted when opentelemetry is installed (and an SDK/exporter configured)
+try:
+    from opentelemetry import trace as _otel_trace
+    _tracer = _otel_trace.get_tracer("emotion-api") if TRACING_ENABLED else None
+except ImportError:
+    _tracer = None
+
+# Minimal Prometheus metrics (text exposition format 0.0.4). Updated from the event loop thread only.
+_registry = []
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+def _label_str(labelnames, values, extra=()):
+    pairs = list(zip(labelnames, values)) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        _registry.append(self)
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples())
+        return lines
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def _samples(self):
+        return [f"{self.name}{_label_str(self.labelnames, key)} {value}" for key, value in self._values.items()]
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    # fn() -> {label tuple: value} (or a number for unlabelled gauges), evaluated at scrape time
+    def __init__(self, name, documentation, labelnames=(), fn=None):
+        super().__init__(name, documentation, labelnames)
+        self.fn = fn
+
+    def set(self, value, **labels):
+        self._values[self._key(labels)] = value
+
+    def _samples(self):
+        values = self._values
+        if self.fn is not None:
+            result = self.fn()
+            values = result if isinstance(result, dict) else {(): result}
+        return [f"{self.name}{_label_str(self.labelnames, key)} {value}" for key, value in values.items()]
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        entry = self._values.get(key)
+        if entry is None:
+            entry = self._values[key] = [[0] * len(self.buckets), 0, 0.0]   # per-bucket counts, count, sum
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                entry[0][i] += 1
+                break
+        entry[1] += 1
+        entry[2] += value
+
+    def _samples(self):
+        lines = []
+        for key, (counts, count, total) in self._values.items():
+            cumulative = 0
+            for bound, n in zip(self.buckets, counts):
+                cumulative += n
+                lines.append(f"{self.name}_bucket{_label_str(self.labelnames, key, [('le', bound)])} {cumulative}")
+            lines.append(f"{self.name}_bucket{_label_str(self.labelnames, key, [('le', '+Inf')])} {count}")
+            lines.append(f"{self.name}_count{_label_str(self.labelnames, key)} {count}")
+            lines.append(f"{self.name}_sum{_label_str(self.labelnames, key)} {total}")
+        return lines
+
+def render_metrics():
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+# Metrics shared across the app
+REQUEST_SECONDS = Histogram("http_request_duration_seconds", "HTTP request latency", ["method", "handler", "status"])
+REQUESTS_TOTAL = Counter("http_requests_total", "HTTP requests", ["method", "handler", "status"])
+STAGE_SECONDS = Histogram("emotion_stage_duration_seconds", "Time spent per processing stage", ["stage"])
+MONGO_COMMAND_SECONDS = Histogram("mongo_command_duration_seconds", "MongoDB command latency", ["command", "outcome"])
+CACHE_LOOKUPS = Counter("emotion_cache_lookups_total", "Emotion result cache lookups", ["result"])
+LLM_ERRORS = Counter("llm_errors_total", "Failed LLM calls", ["kind"])
+RATE_LIMIT_REJECTIONS = Counter("rate_limit_rejections_total", "Requests rejected by the rate limiter", ["principal"])
+
+# Time one stage into STAGE_SECONDS (and a trace span when tracing is on)
+@contextmanager
+def stage(name):
+    with ExitStack() as stack:
+        if _tracer is not None:
+            stack.enter_context(_tracer.start_as_current_span(name, attributes={"request_id": request_id_var.get()}))
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            STAGE_SECONDS.observe(time.perf_counter() - started, stage=name)
+
+# Server span around a whole request (no-op without tracing)
+@contextmanager
+def request_span(method, path):
+    with ExitStack() as stack:
+        if _tracer is not None:
+            stack.enter_context(_tracer.start_as_current_span(f"{method} {path}", attributes={"request_id": request_id_var.get()}))
+        yield
@@ -0,0 +1,70 @@
+# Background worker for bulk jobs queued through POST /api/v1/jobs.
+# Run with:  python -m src.workers.job_worker
+# Starts JOB_WORKER_PROCESSES processes, each working JOB_WORKER_CONCURRENCY items at a time.
+import os
+import socket
+import asyncio
+import multiprocessing
+from fastapi import HTTPException
+from dotenv import load_dotenv, find_dotenv
+from src.api.dependencies.database import get_db, close_db
+from src.services.emotion_service import analyzed_emotion_from_image
+from src.services.image_service import validate_image
+from src.services.job_service import lease_next_item, complete_item, fail_item, JOB_MAX_ATTEMPTS
+from src.services.record_service import store_emotion_record, flush_records
+from src.utils.logger import logger
+load_dotenv(find_dotenv())
+JOB_WORKER_PROCESSES = int(os.environ.get("JOB_WORKER_PROCESSES", 2))
+JOB_WORKER_CONCURRENCY = int(os.environ.get("JOB_WORKER_CONCURRENCY", 4))   # Items in progress per process
+JOB_POLL_SECONDS = float(os.environ.get("JOB_POLL_SECONDS", 1))             # Idle wait when the queue is empty
+
+async def process_item(db, item):
+    if item["attempts"] > JOB_MAX_ATTEMPTS:   # lease kept expiring (e.g. worker crashes): give up
+        return await fail_item(db, item, "Exceeded maximum attempts", permanent=True)
+    try:
+        image_bytes = bytes(item["data"])
+        image_info = await validate_image(image_bytes)
+        emotion_data = await analyzed_emotion_from_image(image_bytes, item["filename"], item.get("content_type"), db, image_info)
+        record = await store_emotion_record(db, item["user_id"], item["filename"], emotion_data)
+        await complete_item(db, item, record.model_dump())
+    except HTTPException as e:
+        detail = e.detail.get("message") if isinstance(e.detail, dict) else str(e.detail)
+        # 4xx (bad image, ...) will never succeed; 5xx (LLM timeout, backend down) may on retry
+        await fail_item(db, item, detail, permanent=e.status_code < 500)
+    except Exception as e:
+        logger.error(f"Job item {item['job_id']}#{item['index']} crashed: {e}")
+        await fail_item(db, item, str(e))
+
+async def worker_loop(db, worker_id: str):
+    while True:
+        item = await lease_next_item(db, worker_id)
+        if item is None:
+            await asyncio.sleep(JOB_POLL_SECONDS)
+            continue
+        await process_item(db, item)
+
+async def run_worker(worker_id: str):
+    db = await get_db()
+    logger.info(f"Job worker {worker_id} started with concurrency {JOB_WORKER_CONCURRENCY}")
+    try:
+        await asyncio.gather(*(worker_loop(db, f"{worker_id}:{i}") for i in range(JOB_WORKER_CONCURRENCY)))
+    finally:
+        await flush_records()
+        await close_db()
+
+def _process_main(index: int):
+    asyncio.run(run_worker(f"{socket.gethostname()}:{os.getpid()}:{index}"))
+
+def main():
+    processes = [multiprocessing.Process(target=_process_main, args=(i,), daemon=False) for i in range(JOB_WORKER_PROCESSES)]
+    for p in processes:
+        p.start()
+    try:
+        for p in processes:
+            p.join()
+    except KeyboardInterrupt:
+        for p in processes:
+            p.terminate()
+
+if __name__ == "__main__":
+    main()
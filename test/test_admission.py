@@ -0,0 +1,117 @@
+import asyncio
+import pytest
+
+from src.services.admission import AdmissionController, CircuitOpenError
+
+
+class ProviderDown(Exception):
+    pass
+
+class BadRequest(Exception):
+    pass
+
+def make_controller(**kwargs):
+    options = {"breaker_failures": 3, "cooldown_seconds": 0.05, "max_retries": 0}
+    options.update(kwargs)
+    return AdmissionController("test", lambda e: isinstance(e, ProviderDown), lambda e: False, **options)
+
+async def fail(error):
+    raise error
+
+async def ok():
+    return "ok"
+
+async def wait_then(event, outcome):
+    await event.wait()
+    if isinstance(outcome, Exception):
+        raise outcome
+    return outcome
+
+async def open_circuit(controller):
+    for _ in range(controller.breaker_failures):
+        with pytest.raises(ProviderDown):
+            await controller.call(lambda: fail(ProviderDown()))
+    assert controller.state == "open"
+
+
+# -----------------------
+# TEST CASES
+# -----------------------
+@pytest.mark.asyncio
+async def test_circuit_opens_after_consecutive_failures():
+    controller = make_controller()
+    await open_circuit(controller)
+
+    calls = []
+    with pytest.raises(CircuitOpenError):
+        await controller.call(lambda: calls.append(1) or ok())
+    assert calls == []   # rejected without calling the provider
+
+@pytest.mark.asyncio
+async def test_non_retryable_errors_do_not_count():
+    controller = make_controller()
+    for _ in range(5):
+        with pytest.raises(BadRequest):
+            await controller.call(lambda: fail(BadRequest()))
+    assert controller.state == "closed"
+
+@pytest.mark.asyncio
+async def test_probe_after_cooldown_closes_or_reopens():
+    controller = make_controller()
+    await open_circuit(controller)
+    await asyncio.sleep(0.06)
+
+    with pytest.raises(ProviderDown):
+        await controller.call(lambda: fail(ProviderDown()))   # failed probe
+    assert controller.state == "open"
+    with pytest.raises(CircuitOpenError):
+        await controller.call(ok)   # new cooldown
+
+    await asyncio.sleep(0.06)
+    assert await controller.call(ok) == "ok"
+    assert controller.state == "closed"
+
+@pytest.mark.asyncio
+async def test_only_one_probe_at_a_time():
+    controller = make_controller()
+    await open_circuit(controller)
+    await asyncio.sleep(0.06)
+
+    release = asyncio.Event()
+    probe = asyncio.create_task(controller.call(lambda: wait_then(release, "ok")))
+    await asyncio.sleep(0)
+    assert controller.state == "half_open"
+    with pytest.raises(CircuitOpenError):
+        await controller.call(ok)
+
+    release.set()
+    assert await probe == "ok"
+    assert controller.state == "closed"
+
+@pytest.mark.asyncio
+async def test_stale_call_finishing_mid_probe_does_not_change_state():
+    controller = make_controller(breaker_failures=1)
+    stale_release, probe_release = asyncio.Event(), asyncio.Event()
+    # Admitted while closed, still running when the circuit opens and the probe starts
+    stale_error = asyncio.create_task(controller.call(lambda: wait_then(stale_release, BadRequest())))
+    stale_failure = asyncio.create_task(controller.call(lambda: wait_then(stale_release, ProviderDown())))
+    stale_success = asyncio.create_task(controller.call(lambda: wait_then(stale_release, "ok")))
+    await asyncio.sleep(0)
+    await open_circuit(controller)
+    await asyncio.sleep(0.06)
+    probe = asyncio.create_task(controller.call(lambda: wait_then(probe_release, "ok")))
+    await asyncio.sleep(0)
+    assert controller.state == "half_open"
+
+    stale_release.set()
+    results = await asyncio.gather(stale_error, stale_failure, stale_success, return_exceptions=True)
+    assert isinstance(results[0], BadRequest)
+    assert isinstance(results[1], ProviderDown)
+    assert results[2] == "ok"
+    assert controller.state == "half_open"   # neither closed, reopened nor handed to a second probe
+    with pytest.raises(CircuitOpenError):
+        await controller.call(ok)
+
+    probe_release.set()
+    assert await probe == "ok"
+    assert controller.state == "closed"
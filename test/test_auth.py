@@ -5,6 +5,7 @@ from pymongo import AsyncMongoClient
 from dotenv import load_dotenv,find_dotenv
 from src.api.routers import auth
 from src.api.dependencies.database import get_db
+from src.api.dependencies.auth import get_current_user, user_cache, invalidate_user
 from src.models.user import UserCreate,UserResponse
 from fastapi.security import OAuth2PasswordRequestForm
 import os
@@ -103,4 +104,33 @@ async def test_login_wrong_username():
     form = OAuth2PasswordRequestForm(username="not_eve", password="testpw", scope="")
     with pytest.raises(Exception) :
         await login(form_data=form, db=db)
-    
+
+@pytest.mark.asyncio
+async def test_current_user_is_cached_and_revoked_on_version_bump():
+    db = await override_get_db()
+    user = await register(user=UserCreate(username="frank", password="secret123", role="user"), db=db)
+    form = OAuth2PasswordRequestForm(username="frank", password="secret123", scope="")
+    token = (await login(form_data=form, db=db))["access_token"]
+
+    invalidate_user(user.user_id)
+    hits = user_cache.hits
+    first = await get_current_user(token=token, db=db)
+    second = await get_current_user(token=token, db=db)   # served from the cache
+    assert first.user_id == second.user_id == user.user_id
+    assert first.hashed_password is None
+    assert user_cache.hits == hits + 1
+
+    # Role change: token_version is bumped and the cache entry dropped -> the old token is rejected
+    await db.users.update_one({"user_id": user.user_id}, {"$set": {"role": "admin"}, "$inc": {"token_version": 1}})
+    invalidate_user(user.user_id)
+    with pytest.raises(Exception):
+        await get_current_user(token=token, db=db)
+
+@pytest.mark.asyncio
+async def test_concurrent_registrations_get_unique_ids():
+    import asyncio
+    db = await override_get_db()
+    users = [UserCreate(username=f"user{i}", password="secret123", role="user") for i in range(5)]
+    results = await asyncio.gather(*(register(user=u, db=db) for u in users))
+    user_ids = [r.user_id for r in results]
+    assert len(set(user_ids)) == len(user_ids)
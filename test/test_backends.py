@@ -0,0 +1,95 @@
+import pytest
+from fastapi import HTTPException
+
+from src.services import emotion_service
+from src.services.backends.base import EmotionBackend, BackendUnavailable
+from src.services.backends.onnx_local import OnnxEmotionBackend
+
+
+# ---- Fake backend: answers with a fixed prediction, or raises ----
+class FakeBackend(EmotionBackend):
+    def __init__(self, name, emotion="happy", confidence=0.9, error=None, available=True):
+        self.name = name
+        self.prediction = {"emotion": emotion, "confidence": confidence, "scores": None}
+        self.error = error
+        self.available = available
+        self.calls = 0
+
+    @property
+    def version(self):
+        return f"fake:{self.name}"
+
+    def is_available(self):
+        return self.available
+
+    async def classify(self, image_bytes, mime_type):
+        self.calls += 1
+        if self.error:
+            raise self.error
+        return dict(self.prediction)
+
+@pytest.fixture
+def backends(monkeypatch):
+    def install(mode, remote, local):
+        monkeypatch.setattr(emotion_service, "EMOTION_BACKEND_MODE", mode)
+        monkeypatch.setattr(emotion_service, "remote_backend", remote)
+        monkeypatch.setattr(emotion_service, "local_backend", local)
+    return install
+
+
+# -----------------------
+# TEST CASES
+# -----------------------
+@pytest.mark.asyncio
+async def test_remote_only_never_uses_local(backends):
+    remote, local = FakeBackend("gemini", "sad"), FakeBackend("local")
+    backends("remote-only", remote, local)
+    result = await emotion_service.classify_image(b"img", "image/jpeg")
+    assert (result["emotion"], result["backend"]) == ("sad", "gemini")
+    assert local.calls == 0
+
+@pytest.mark.asyncio
+async def test_local_only_unavailable_is_503(backends):
+    backends("local-only", FakeBackend("gemini"), FakeBackend("local", error=BackendUnavailable("no model")))
+    with pytest.raises(HTTPException) as exc:
+        await emotion_service.classify_image(b"img", "image/jpeg")
+    assert exc.value.status_code == 503
+
+@pytest.mark.asyncio
+async def test_local_first_keeps_confident_local_answer(backends):
+    remote, local = FakeBackend("gemini"), FakeBackend("local", "angry", confidence=0.95)
+    backends("local-first", remote, local)
+    result = await emotion_service.classify_image(b"img", "image/jpeg")
+    assert (result["emotion"], result["backend"]) == ("angry", "local")
+    assert remote.calls == 0
+
+@pytest.mark.asyncio
+async def test_local_first_asks_remote_when_unsure(backends):
+    remote, local = FakeBackend("gemini", "sad"), FakeBackend("local", "angry", confidence=0.1)
+    backends("local-first", remote, local)
+    result = await emotion_service.classify_image(b"img", "image/jpeg")
+    assert result["backend"] == "gemini"
+
+    remote.error = RuntimeError("provider down")
+    result = await emotion_service.classify_image(b"img", "image/jpeg")
+    assert result["backend"] == "local"   # low-confidence local answer beats no answer
+
+@pytest.mark.asyncio
+async def test_remote_fallback_uses_local_on_error(backends):
+    remote, local = FakeBackend("gemini", error=RuntimeError("provider down")), FakeBackend("local", "fearful")
+    backends("remote-fallback", remote, local)
+    result = await emotion_service.classify_image(b"img", "image/jpeg")
+    assert (result["emotion"], result["backend"]) == ("fearful", "local")
+
+    local.available = False
+    with pytest.raises(RuntimeError):
+        await emotion_service.classify_image(b"img", "image/jpeg")
+
+@pytest.mark.asyncio
+async def test_corrupt_model_is_unavailable_not_an_error(tmp_path):
+    model = tmp_path / "broken.onnx"
+    model.write_bytes(b"not a model")
+    backend = OnnxEmotionBackend(str(model))
+    assert backend.is_available() is False
+    with pytest.raises(BackendUnavailable):
+        await backend.classify(b"img", "image/jpeg")
@@ -3,6 +3,8 @@ from fastapi import FastAPI
 from fastapi.testclient import TestClient
 from io import BytesIO
 from datetime import datetime
+import gzip
+import json
 
 
 from dotenv import load_dotenv, find_dotenv
@@ -12,6 +14,7 @@ from pymongo import AsyncMongoClient
 
 from src.api.routers import emotion
 from src.api.dependencies import database, auth
+from src.utils.errors import service_unavailable
 
 
 # -----------------------
@@ -338,3 +341,129 @@ async def test_delete_emotion_record_by_admin():
     delete_resp = client.delete(f"/emotions/{emotion_id}")
     assert  delete_resp.status_code == 204
 
+
+@pytest.mark.asyncio
+async def test_upload_batch_with_invalid_file():
+    files = [
+        ("files", ("happy.jpg", open("images/happy.jpg", "rb"), "image/jpeg")),
+        ("files", ("notes.txt", BytesIO(b"not an image"), "text/plain")),
+        ("files", ("sad.jpg", open("images/sad.jpg", "rb"), "image/jpeg")),
+    ]
+    response = client.post("/emotions", files=files)
+    assert response.status_code == 201
+    data = response.json()
+
+    assert len(data) == 3
+    assert data[0]["filename"] == "happy.jpg" and data[0]["emotion"]  # results keep input order
+    assert data[1]["filename"] == "notes.txt" and data[1]["status_code"] == 422
+    assert data[2]["filename"] == "sad.jpg" and data[2]["emotion"]
+
+@pytest.mark.asyncio
+async def test_upload_same_image_hits_cache():
+    with open("images/happy1.jpg", "rb") as f:
+        first = client.post("/emotions", files=[("files", ("happy1.jpg", f, "image/jpeg"))])
+    with open("images/happy1.jpg", "rb") as f:
+        second = client.post("/emotions", files=[("files", ("happy1.jpg", f, "image/jpeg"))])
+    assert first.status_code == 201 and second.status_code == 201
+
+    assert second.json()[0]["cache_hit"] is True   # served without an LLM call
+    assert second.json()[0]["emotion"] == first.json()[0]["emotion"]
+
+@pytest.mark.asyncio
+async def test_get_emotions_paginated():
+    for _ in range(2):
+        with open("images/happy.jpg", "rb") as f:
+            response = client.post("/emotions", files=[("files", ("happy.jpg", f, "image/jpeg"))])
+        assert response.status_code == 201
+
+    first = client.get("/emotions", params={"limit": 1})
+    assert first.status_code == 200
+    assert len(first.json()) == 1
+    cursor = first.headers["X-Next-Cursor"]
+
+    second = client.get("/emotions", params={"limit": 1, "cursor": cursor})
+    assert second.status_code == 200
+    assert second.json()[0]["id"] != first.json()[0]["id"]   # pages do not overlap
+
+@pytest.mark.asyncio
+async def test_get_emotions_projection_and_filter():
+    resp = client.get("/emotions", params={"fields": "emotion,filename", "filename_prefix": "happy"})
+    assert resp.status_code == 200
+    for record in resp.json():
+        assert set(record) == {"id", "emotion", "filename"}
+        assert record["filename"].startswith("happy")
+
+@pytest.mark.asyncio
+async def test_export_emotions_ndjson_and_csv():
+    with open("images/happy.jpg", "rb") as f:
+        response = client.post("/emotions", files=[("files", ("happy.jpg", f, "image/jpeg"))])
+    assert response.status_code == 201
+
+    resp = client.get("/emotions/export")
+    assert resp.status_code == 200
+    lines = [json.loads(line) for line in resp.text.splitlines()]
+    assert len(lines) >= 1
+    assert all(line["user_id"] == "U123" for line in lines)   # same RBAC as GET /emotions
+
+    resp = client.get("/emotions/export", params={"format": "csv", "gzip": "true"})
+    assert resp.status_code == 200
+    rows = gzip.decompress(resp.content).decode().splitlines()
+    assert rows[0].startswith("id,user_id,filename,emotion")
+    assert len(rows) == len(lines) + 1
+
+@pytest.mark.asyncio
+async def test_emotion_stats():
+    with open("images/happy.jpg", "rb") as f:
+        response = client.post("/emotions", files=[("files", ("happy.jpg", f, "image/jpeg"))])
+    assert response.status_code == 201
+
+    resp = client.get("/emotions/stats")
+    assert resp.status_code == 200
+    data = resp.json()
+    assert data["source"] == "rollup"
+    assert set(data["by_user"]) == {"U123"}   # users only see their own counts
+    assert data["total"] == sum(row["count"] for row in data["buckets"])
+
+    # A range that does not start at midnight falls back to aggregating the records
+    resp = client.get("/emotions/stats", params={"created_from": "2020-01-01T12:30:00Z", "bucket": "hour"})
+    assert resp.status_code == 200
+    assert resp.json()["source"] == "aggregation"
+
+    resp = client.get("/emotions/stats", params={"user_id": "U999"})
+    assert resp.status_code == 403
+
+@pytest.mark.asyncio
+async def test_bulk_update_and_delete():
+    ids = []
+    for _ in range(2):
+        with open("images/happy.jpg", "rb") as f:
+            response = client.post("/emotions", files=[("files", ("happy.jpg", f, "image/jpeg"))])
+        assert response.status_code == 201
+        ids.append(response.json()[0]["id"])
+
+    resp = client.post("/emotions/bulk/update", json={"items": [{"id": i, "emotion": "sad"} for i in ids] + [{"id": "missing", "emotion": "sad"}]})
+    assert resp.status_code == 200
+    assert resp.json()["matched"] == 2
+    assert resp.json()["not_found"] == ["missing"]
+    assert client.get(f"/emotions/{ids[0]}").json()["emotion"] == "sad"
+
+    resp = client.post("/emotions/bulk/delete", json={"ids": ids})
+    assert resp.status_code == 200
+    assert resp.json()["deleted"] == 2
+    assert client.get(f"/emotions/{ids[1]}").status_code == 404
+
+@pytest.mark.asyncio
+async def test_upload_all_failed_with_provider_outage(monkeypatch):
+    async def provider_down(*args, **kwargs):
+        service_unavailable("LLM provider error 503, please retry later")
+    monkeypatch.setattr(emotion, "analyzed_emotion_from_image", provider_down)
+    files = [
+        ("files", ("happy.jpg", open("images/happy.jpg", "rb"), "image/jpeg")),
+        ("files", ("notes.jpg", BytesIO(b"not an image"), "image/jpeg")),
+    ]
+    resp = client.post("/emotions", files=files)
+    assert resp.status_code == 503   # an outage is retryable, not bad input
+    assert [item["status_code"] for item in resp.json()] == [503, 422]
+
+    resp = client.post("/emotions", files=[("files", ("notes.jpg", BytesIO(b"not an image"), "image/jpeg"))])
+    assert resp.status_code == 422
@@ -0,0 +1,124 @@
+import io
+import struct
+import zlib
+import pytest
+from fastapi import HTTPException
+from PIL import Image
+
+from src.services import image_service
+from src.services.image_service import _downscale_and_encode, _prepare_for_llm, _strip_metadata, EXIF_ORIENTATION_TAG
+from src.services.image_service import validate_image
+
+
+def make_image(width, height, fmt="JPEG", orientation=None, gps=False):
+    image = Image.new("RGB", (width, height), (200, 40, 40))
+    image.paste((40, 40, 200), (0, 0, width // 2, height))   # left half blue, so rotation is visible
+    exif = Image.Exif()
+    if orientation:
+        exif[EXIF_ORIENTATION_TAG] = orientation
+    if gps:
+        exif[0x8825] = {1: "N", 2: (48.0, 51.0, 29.0)}   # GPSInfo
+    out = io.BytesIO()
+    image.save(out, format=fmt, exif=exif.tobytes() if len(exif) else b"")
+    return out.getvalue()
+
+def png_chunk(chunk_type, data):
+    return struct.pack(">I", len(data)) + chunk_type + data + struct.pack(">I", zlib.crc32(chunk_type + data))
+
+# Signature, IHDR and an empty IDAT: declares any canvas size without carrying pixel data
+def png_header(width, height):
+    ihdr = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    return b"\x89PNG\r\n\x1a\n" + png_chunk(b"IHDR", ihdr) + png_chunk(b"IDAT", b"")
+
+async def rejection(data):
+    with pytest.raises(HTTPException) as exc:
+        await validate_image(data)
+    assert exc.value.status_code == 422
+    return exc.value.detail["message"]
+
+def decode(data):
+    image = Image.open(io.BytesIO(data))
+    image.load()
+    return image
+
+
+# -----------------------
+# TEST CASES
+# -----------------------
+@pytest.mark.asyncio
+async def test_downscale_caps_longest_edge():
+    image = decode(_downscale_and_encode(make_image(3000, 1500), 1024, "JPEG", 85))
+    assert image.format == "JPEG"
+    assert image.size == (1024, 512)
+
+    image = decode(_downscale_and_encode(make_image(300, 200), 1024, "WEBP", 85))
+    assert image.format == "WEBP"
+    assert image.size == (300, 200)   # never upscaled
+
+@pytest.mark.asyncio
+async def test_downscale_applies_exif_orientation():
+    # Orientation 6: stored landscape, displayed rotated 90° clockwise
+    image = decode(_downscale_and_encode(make_image(400, 200, orientation=6), 1024, "JPEG", 90))
+    assert image.size == (200, 400)
+    assert image.getpixel((100, 10))[2] > 150   # blue left half is now on top
+
+@pytest.mark.asyncio
+async def test_downscale_output_has_no_exif():
+    image = decode(_downscale_and_encode(make_image(400, 200, orientation=6, gps=True), 1024, "JPEG", 85))
+    assert len(image.getexif()) == 0
+    assert "exif" not in image.info
+
+@pytest.mark.asyncio
+async def test_strip_metadata_keeps_pixels_and_drops_exif():
+    for fmt in ("JPEG", "PNG"):
+        original = make_image(64, 32, fmt=fmt, gps=True)
+        stripped = _strip_metadata(original, fmt)
+        assert len(stripped) < len(original)
+        assert len(decode(stripped).getexif()) == 0
+        assert decode(stripped).tobytes() == decode(original).tobytes()
+
+    with pytest.raises(ValueError):
+        _strip_metadata(make_image(64, 32)[:40], "JPEG")
+
+@pytest.mark.asyncio
+async def test_prepare_sends_smaller_candidate(monkeypatch):
+    monkeypatch.setattr(image_service, "LLM_IMAGE_FORMAT", "JPEG")
+    small_png = make_image(64, 32, fmt="PNG", gps=True)
+    data, mime_type = _prepare_for_llm(small_png, "PNG", "image/png", keep_original=True)
+    assert mime_type == "image/png"   # flat PNG beats a JPEG re-encode
+    assert len(data) < len(small_png) and len(decode(data).getexif()) == 0
+
+    data, mime_type = _prepare_for_llm(small_png, "PNG", "image/png", keep_original=False)
+    assert mime_type == "image/jpeg"
+
+@pytest.mark.asyncio
+async def test_validate_reads_header_only():
+    info = await validate_image(make_image(400, 200, orientation=6))
+    assert (info.format, info.mime_type, info.width, info.height, info.orientation) == ("JPEG", "image/jpeg", 400, 200, 6)
+    info = await validate_image(png_header(640, 480))   # no pixel data needed
+    assert (info.format, info.width, info.height) == ("PNG", 640, 480)
+
+@pytest.mark.asyncio
+async def test_validate_rejects_unknown_magic_bytes():
+    gif = io.BytesIO()
+    Image.new("RGB", (8, 8)).save(gif, format="GIF")
+    assert (await rejection(gif.getvalue())).startswith("Invalid image format")
+    assert (await rejection(b"not an image, despite the .jpg name")).startswith("Invalid image format")
+
+@pytest.mark.asyncio
+async def test_validate_rejects_body_not_matching_magic_bytes():
+    assert await rejection(b"\x89PNG\r\n\x1a\n" + make_image(8, 8)[8:]) == "Invalid image file"
+
+@pytest.mark.asyncio
+async def test_validate_rejects_truncated_headers():
+    assert await rejection(make_image(64, 32)[:40]) == "Invalid image file"
+    assert await rejection(png_header(64, 32)[:20]) == "Invalid image file"
+
+@pytest.mark.asyncio
+async def test_validate_enforces_dimension_and_pixel_limits(monkeypatch):
+    monkeypatch.setattr(image_service, "max_dimension", 1000)
+    monkeypatch.setattr(image_service, "max_pixels", 500_000)
+    assert "exceed 1000px limit" in await rejection(png_header(1001, 10))
+    assert "exceed 1000px limit" in await rejection(png_header(10, 20_000))
+    assert "500000 pixel limit" in await rejection(png_header(1000, 501))
+    assert (await validate_image(png_header(1000, 500))).width == 1000
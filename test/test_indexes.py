@@ -0,0 +1,63 @@
+import pytest
+
+from src.api.dependencies.database import ensure_indexes, INDEXES
+from src.services.id_service import dedupe_user_ids
+
+
+# ---- Fake database: aggregate answers with fixed groups, create_indexes records index names ----
+class FakeCursor:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for row in self.rows:
+            yield row
+
+class FakeCollection:
+    def __init__(self, groups):
+        self.groups = groups
+        self.built = []
+
+    async def aggregate(self, pipeline):
+        return FakeCursor(self.groups)
+
+    async def create_indexes(self, indexes):
+        self.built.extend(index.document["name"] for index in indexes)
+
+class FakeDB:
+    def __init__(self, duplicate_groups=()):
+        self.collections = {}
+        self.duplicate_groups = list(duplicate_groups)
+
+    def __getitem__(self, name):
+        groups = self.duplicate_groups if name == "users" else []
+        return self.collections.setdefault(name, FakeCollection(groups))
+
+
+# -----------------------
+# TEST CASES
+# -----------------------
+@pytest.mark.asyncio
+async def test_duplicates_block_unique_index_but_not_the_rest():
+    db = FakeDB([{"_id": "U_003", "ids": [1, 2], "count": 2}])
+    failed = await ensure_indexes(db)
+    assert len(failed) == 1
+    assert failed[0].startswith("users.user_id_unique: duplicate user_id values exist (e.g. U_003)")
+    assert "scripts.dedupe_user_ids" in failed[0]
+    assert db["users"].built == ["username_unique"]
+    assert db["emotions"].built == [index.document["name"] for index in INDEXES["emotions"]]
+
+@pytest.mark.asyncio
+async def test_clean_users_build_every_index():
+    db = FakeDB()
+    assert await ensure_indexes(db) == []
+    assert db["users"].built == ["username_unique", "user_id_unique"]
+
+@pytest.mark.asyncio
+async def test_dedupe_dry_run_changes_nothing():
+    db = FakeDB([{"_id": "U_003", "ids": [7, 5, 9], "count": 3}])
+    moved = await dedupe_user_ids(db, dry_run=True)
+    assert moved == [("U_003", None, 7), ("U_003", None, 9)]   # the earliest document keeps the id
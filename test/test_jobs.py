@@ -0,0 +1,90 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from dotenv import load_dotenv, find_dotenv
+import os
+from pymongo import AsyncMongoClient
+
+from src.api.routers import jobs
+from src.api.dependencies import database, auth
+
+# ---- Simple DB Setup ----
+async def override_get_db():
+    load_dotenv(find_dotenv())                # Load environment variables from .env file
+    MongoDB_url=os.environ.get("MONGODB_URI")
+    client = AsyncMongoClient(MongoDB_url) 
+    db = client["test_emotion_db"]
+    return db
+
+# -----------------------
+# Fake dependencies
+# -----------------------
+async def override_user():
+    return type("User", (), {"username": "testuser", "role": "user", "user_id": "U123"})
+
+async def override_other_user():
+    return type("User", (), {"username": "other", "role": "user", "user_id": "U456"})
+
+# -----------------------
+# Test App
+# -----------------------
+app = FastAPI()
+app.include_router(jobs.router, prefix="/jobs")
+app.dependency_overrides[database.get_db] = override_get_db
+app.dependency_overrides[auth.get_current_user] = override_user
+client = TestClient(app)
+
+
+@pytest.mark.asyncio
+async def test_submit_job_no_files():
+    resp = client.post("/jobs")
+    assert resp.status_code == 404
+
+@pytest.mark.asyncio
+async def test_submit_job_returns_202_and_status():
+    files = [
+        ("files", ("happy.jpg", open("images/happy.jpg", "rb"), "image/jpeg")),
+        ("files", ("sad.jpg", open("images/sad.jpg", "rb"), "image/jpeg")),
+    ]
+    resp = client.post("/jobs", files=files)
+    assert resp.status_code == 202
+    job = resp.json()
+    assert job["total"] == 2
+    assert job["status"] == "queued"
+
+    status = client.get(f"/jobs/{job['job_id']}")
+    assert status.status_code == 200
+    data = status.json()
+    assert data["job_id"] == job["job_id"]
+    assert [item["filename"] for item in data["items"]] == ["happy.jpg", "sad.jpg"]
+    assert data["done"] + data["failed"] + data["pending"] == 2
+
+@pytest.mark.asyncio
+async def test_user_cannot_see_other_users_job():
+    with open("images/happy.jpg", "rb") as f:
+        resp = client.post("/jobs", files=[("files", ("happy.jpg", f, "image/jpeg"))])
+    job_id = resp.json()["job_id"]
+
+    app.dependency_overrides[auth.get_current_user] = override_other_user
+    status = client.get(f"/jobs/{job_id}")
+    assert status.status_code == 404
+    app.dependency_overrides[auth.get_current_user] = override_user
+
+@pytest.mark.asyncio
+async def test_submit_job_invalid_webhook():
+    with open("images/happy.jpg", "rb") as f:
+        resp = client.post("/jobs", files=[("files", ("happy.jpg", f, "image/jpeg"))], data={"webhook_url": "ftp://example.com"})
+    assert resp.status_code == 422
+
+@pytest.mark.asyncio
+async def test_submit_job_internal_webhook():
+    for url in ["http://169.254.169.254/latest/meta-data", "http://localhost:27017", "http://10.0.0.5/hook"]:
+        with open("images/happy.jpg", "rb") as f:
+            resp = client.post("/jobs", files=[("files", ("happy.jpg", f, "image/jpeg"))], data={"webhook_url": url})
+        assert resp.status_code == 422
+
+@pytest.mark.asyncio
+async def test_submit_job_invalid_image():
+    resp = client.post("/jobs", files=[("files", ("notes.jpg", b"not an image", "image/jpeg"))])
+    assert resp.status_code == 422
+    assert "notes.jpg" in resp.json()["detail"]["message"]
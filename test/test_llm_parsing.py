@@ -0,0 +1,43 @@
+import pytest
+
+from src.services.backends.gemini import parse_prediction, parse_batch_predictions, MalformedPrediction
+from src.services.llm_batcher import MalformedBatchResponse
+
+
+# -----------------------
+# TEST CASES
+# -----------------------
+@pytest.mark.asyncio
+async def test_parse_fenced_json():
+    text = '```json\n{"emotion": "Happy", "scores": {"happy": 0.6, "sad": 0.2}}\n```'
+    prediction = parse_prediction(text)
+    assert prediction["emotion"] == "happy"
+    assert prediction["scores"] == pytest.approx({"happy": 0.75, "sad": 0.25})   # renormalized
+    assert prediction["confidence"] == pytest.approx(0.75)
+
+@pytest.mark.asyncio
+async def test_parse_bare_emotion_word():
+    assert parse_prediction(" Sad.") == {"emotion": "sad", "confidence": None, "scores": None}
+
+@pytest.mark.asyncio
+async def test_parse_prose_wrapped_json():
+    prediction = parse_prediction('Here you go: {"emotion": "angry"} hope that helps')
+    assert prediction["emotion"] == "angry"
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("text", ['{"emotion": "happy",', "no json here", "", None, '{"emotion": "bored"}'])
+async def test_parse_unusable_reply(text):
+    with pytest.raises(MalformedPrediction):
+        parse_prediction(text)
+
+@pytest.mark.asyncio
+async def test_parse_batch():
+    text = '```json\n[{"emotion": "happy"}, {"emotion": "sad", "scores": {"sad": 0.9, "happy": 0.1}}]\n```'
+    predictions = parse_batch_predictions(text, 2)
+    assert [p["emotion"] for p in predictions] == ["happy", "sad"]
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("text", ['[{"emotion": "happy"}]', "[", None, '{"emotion": "happy"}', '[{"emotion": "happy"}, {"emotion": "bored"}]'])
+async def test_parse_batch_unusable_reply(text):
+    with pytest.raises(MalformedBatchResponse):
+        parse_batch_predictions(text, 2)
@@ -0,0 +1,30 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from src.main import app
+
+client = TestClient(app)
+
+
+# -----------------------
+# TEST CASES
+# -----------------------
+@pytest.mark.asyncio
+async def test_request_id_is_echoed():
+    resp = client.get("/health", headers={"X-Request-ID": "test-req-1"})
+    assert resp.status_code == 200
+    assert resp.headers["X-Request-ID"] == "test-req-1"
+
+    resp = client.get("/health", headers={"X-Request-ID": "not a valid id!"})
+    assert resp.headers["X-Request-ID"] != "not a valid id!"   # replaced by a generated one
+
+@pytest.mark.asyncio
+async def test_metrics_endpoint_prometheus_format():
+    client.get("/health")
+    resp = client.get("/metrics")
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("text/plain")
+    body = resp.text
+    assert "# TYPE http_request_duration_seconds histogram" in body
+    assert 'http_requests_total{method="GET",handler="health",status="200"}' in body
+    assert "# TYPE emotion_stage_duration_seconds histogram" in body
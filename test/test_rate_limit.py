@@ -0,0 +1,105 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from src.api.middleware import RateLimitMiddleware
+from src.api.dependencies.auth import create_access_token
+from src.services import rate_limiter
+from src.services.rate_limiter import RateLimiter, MemoryBucketStore
+
+CAPACITY = 4        # user bucket size, independent of RATE_LIMIT_REQUESTS
+WINDOW = 60         # seconds to refill a full bucket
+UPLOAD_COST = 3
+
+
+# ---- Fixed clock: MemoryBucketStore only moves forward when the test says so ----
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+# -----------------------
+# Test App (in-process bucket store instead of Mongo)
+# -----------------------
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(rate_limiter, "time", clock)
+    monkeypatch.setitem(rate_limiter.ROLE_CAPACITY, "user", CAPACITY)
+    monkeypatch.setattr(rate_limiter, "REQUEST_COSTS", [("POST", "/api/v1/emotions", UPLOAD_COST)])
+    return clock
+
+@pytest.fixture
+def client(clock):
+    app = FastAPI()
+    app.add_middleware(RateLimitMiddleware, limiter=RateLimiter(MemoryBucketStore(), window_seconds=WINDOW))
+
+    @app.get("/api/v1/emotions")
+    async def read():
+        return {"ok": True}
+
+    @app.post("/api/v1/emotions")
+    async def upload():
+        return {"ok": True}
+
+    return TestClient(app)
+
+def auth_header(user_id, role="user"):
+    token = create_access_token({"user_id": user_id, "username": user_id, "role": role})
+    return {"Authorization": f"Bearer {token}"}
+
+
+# -----------------------
+# TEST CASES
+# -----------------------
+@pytest.mark.asyncio
+async def test_rate_limit_headers_and_429(client):
+    headers = auth_header("U_RL1")
+    resp = client.get("/api/v1/emotions", headers=headers)
+    assert resp.status_code == 200
+    assert resp.headers["RateLimit-Limit"] == str(CAPACITY)
+    assert resp.headers["RateLimit-Remaining"] == str(CAPACITY - 1)
+    assert resp.headers["RateLimit-Policy"] == f"{CAPACITY};w={WINDOW}"
+
+    for _ in range(CAPACITY - 1):
+        assert client.get("/api/v1/emotions", headers=headers).status_code == 200
+    resp = client.get("/api/v1/emotions", headers=headers)
+    assert resp.status_code == 429
+    assert resp.headers["Retry-After"] == str(WINDOW // CAPACITY)   # one token refills every 15s
+
+    # Buckets are per user: someone else is unaffected
+    assert client.get("/api/v1/emotions", headers=auth_header("U_RL2")).status_code == 200
+
+@pytest.mark.asyncio
+async def test_bucket_refills_with_time(client, clock):
+    headers = auth_header("U_RL3")
+    for _ in range(CAPACITY):
+        client.get("/api/v1/emotions", headers=headers)
+    assert client.get("/api/v1/emotions", headers=headers).status_code == 429
+
+    clock.advance(WINDOW / CAPACITY - 1)
+    assert client.get("/api/v1/emotions", headers=headers).status_code == 429
+    clock.advance(1)
+    resp = client.get("/api/v1/emotions", headers=headers)
+    assert resp.status_code == 200
+    assert resp.headers["RateLimit-Remaining"] == "0"
+
+    clock.advance(WINDOW * 10)   # never refills past capacity
+    assert client.get("/api/v1/emotions", headers=headers).headers["RateLimit-Remaining"] == str(CAPACITY - 1)
+
+@pytest.mark.asyncio
+async def test_uploads_cost_more_than_reads(client):
+    headers = auth_header("U_RL4")
+    resp = client.post("/api/v1/emotions", headers=headers)
+    assert resp.status_code == 200
+    assert resp.headers["RateLimit-Remaining"] == str(CAPACITY - UPLOAD_COST)
+
+    resp = client.post("/api/v1/emotions", headers=headers)   # 1 token left, upload needs 3
+    assert resp.status_code == 429
+    assert client.get("/api/v1/emotions", headers=headers).status_code == 200   # a read still fits
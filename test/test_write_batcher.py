@@ -0,0 +1,91 @@
+import asyncio
+import pytest
+from pymongo.errors import BulkWriteError, WriteError, AutoReconnect
+
+from src.services.write_batcher import WriteBatcher
+
+
+# ---- Fake collection: records insert_many calls, optionally fails them ----
+class FakeCollection:
+    def __init__(self, error=None):
+        self.calls = []
+        self.error = error
+
+    async def insert_many(self, docs, ordered=True):
+        self.calls.append([doc["name"] for doc in docs])
+        if self.error:
+            raise self.error
+
+class FakeDB:
+    def __init__(self, collection):
+        self.collection = collection
+
+    def get_collection(self, name, write_concern=None):
+        return self.collection
+
+def make_batcher(max_size=100, max_wait_seconds=0.01):
+    inserted = []
+    async def on_inserted(db, docs):
+        inserted.extend(doc["name"] for doc in docs)
+    return WriteBatcher("emotions", max_size, max_wait_seconds, on_inserted=on_inserted), inserted
+
+
+# -----------------------
+# TEST CASES
+# -----------------------
+@pytest.mark.asyncio
+async def test_flush_by_size():
+    collection = FakeCollection()
+    batcher, inserted = make_batcher(max_size=3, max_wait_seconds=60)
+    db = FakeDB(collection)
+    ids = await asyncio.wait_for(asyncio.gather(*(batcher.insert(db, {"name": n}) for n in "abc")), 1)
+    assert len(set(ids)) == 3
+    assert collection.calls == [["a", "b", "c"]]
+    assert inserted == ["a", "b", "c"]
+
+@pytest.mark.asyncio
+async def test_flush_by_time():
+    collection = FakeCollection()
+    batcher, inserted = make_batcher(max_size=100, max_wait_seconds=0.02)
+    db = FakeDB(collection)
+    await asyncio.gather(batcher.insert(db, {"name": "a"}), batcher.insert(db, {"name": "b"}))
+    assert collection.calls == [["a", "b"]]
+    assert batcher.stats == {"batches": 1, "documents": 2, "failed": 0}
+
+@pytest.mark.asyncio
+async def test_partial_failure_only_fails_errored_documents():
+    error = BulkWriteError({"writeErrors": [{"index": 1, "code": 11000, "errmsg": "duplicate key"}], "writeConcernErrors": []})
+    batcher, inserted = make_batcher()
+    db = FakeDB(FakeCollection(error))
+    results = await asyncio.gather(*(batcher.insert(db, {"name": n}) for n in "abc"), return_exceptions=True)
+    assert isinstance(results[1], WriteError)
+    assert not isinstance(results[0], Exception) and not isinstance(results[2], Exception)
+    assert inserted == ["a", "c"]
+
+@pytest.mark.asyncio
+async def test_write_concern_error_does_not_fail_written_documents():
+    error = BulkWriteError({"writeErrors": [], "writeConcernErrors": [{"code": 64, "errmsg": "waiting for replication timed out"}]})
+    batcher, inserted = make_batcher()
+    db = FakeDB(FakeCollection(error))
+    results = await asyncio.gather(*(batcher.insert(db, {"name": n}) for n in "ab"), return_exceptions=True)
+    assert not any(isinstance(r, Exception) for r in results)
+    assert inserted == ["a", "b"]
+
+@pytest.mark.asyncio
+async def test_connection_error_fails_whole_batch():
+    batcher, inserted = make_batcher()
+    db = FakeDB(FakeCollection(AutoReconnect("connection reset")))
+    results = await asyncio.gather(*(batcher.insert(db, {"name": n}) for n in "ab"), return_exceptions=True)
+    assert all(isinstance(r, AutoReconnect) for r in results)
+    assert inserted == []
+    assert batcher.stats["failed"] == 2
+
+@pytest.mark.asyncio
+async def test_drain_writes_pending_documents():
+    collection = FakeCollection()
+    batcher, inserted = make_batcher(max_size=100, max_wait_seconds=60)
+    pending = asyncio.ensure_future(batcher.insert(FakeDB(collection), {"name": "a"}))
+    await asyncio.sleep(0)
+    await batcher.drain()
+    assert await pending
+    assert inserted == ["a"]